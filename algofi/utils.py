@@ -1,7 +1,14 @@
 import os
 import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from random import randint
 from enum import Enum
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
+from types import MappingProxyType
 from base64 import b64decode, b64encode
 from algosdk.transaction import LogicSigTransaction, assign_group_id
 from algosdk import encoding, account, mnemonic
@@ -135,40 +142,505 @@ def get_state_bytes(state, key):
     return state.get(key.decode(), {"bytes": ""})["bytes"]
 
 
-def format_state(state):
+# base64 encoded state key to formatted key, seeded with every contract string and filled in as keys are seen
+FORMATTED_STATE_KEYS = {
+    b64encode(value.encode()).decode(): value
+    for strings in (manager_strings, market_strings)
+    for name, value in vars(strings).items()
+    if not name.startswith("__") and isinstance(value, str)
+}
+# bound on learned keys, state of arbitrary applications may be formatted
+MAX_FORMATTED_STATE_KEYS = 65536
+
+
+def decode_utf8(raw):
+    """Returns raw decoded as utf-8, or None if it is not valid utf-8
+
+    :param raw: bytes to decode
+    :type raw: bytes
+    :return: decoded string
+    :rtype: string
+    """
+    # ascii is always valid utf-8, only other bytes need a checked decode
+    if raw.isascii():
+        return raw.decode("ascii")
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def format_state_key(key):
+    """Returns the formatted form of a base64 encoded state key: a utf-8 string, or bytes if the key is not utf-8
+
+    :param key: base64 encoded state key
+    :type key: string
+    :return: formatted key
+    :rtype: string or bytes
+    """
+    formatted_key = FORMATTED_STATE_KEYS.get(key, None)
+    if formatted_key is None:
+        raw = b64decode(key)
+        formatted_key = decode_utf8(raw)
+        if formatted_key is None:
+            formatted_key = raw
+        if len(FORMATTED_STATE_KEYS) < MAX_FORMATTED_STATE_KEYS:
+            FORMATTED_STATE_KEYS[key] = formatted_key
+    return formatted_key
+
+
+def encode_state_key(formatted_key):
+    """Returns the base64 encoded form of a formatted state key
+
+    :param formatted_key: formatted key
+    :type formatted_key: string or bytes
+    :return: base64 encoded state key
+    :rtype: string
+    """
+    if isinstance(formatted_key, str):
+        formatted_key = formatted_key.encode()
+    return b64encode(formatted_key).decode()
+
+
+@lru_cache(maxsize=256)
+def encode_state_keys(formatted_keys):
+    """Returns the set of base64 encoded forms of a tuple of formatted state keys
+
+    :param formatted_keys: formatted keys
+    :type formatted_keys: tuple
+    :return: base64 encoded state keys
+    :rtype: frozenset
+    """
+    return frozenset(map(encode_state_key, formatted_keys))
+
+
+def format_state(state, fields=None):
     """Returns state dict formatted to human-readable strings
 
     :param state: dict of state returned by read_local_state or read_global_state
     :type state: dict
+    :param fields: formatted keys to include, defaults to None (all keys). Other items are not decoded.
+    :type fields: iterable, optional
     :return: dict of state with keys + values formatted from bytes to utf-8 strings
     :rtype: dict
     """
+    if fields is not None:
+        encoded_keys = encode_state_keys(tuple(fields))
+        state = [item for item in state if item["key"] in encoded_keys]
     formatted = {}
     for item in state:
-        key = item["key"]
         value = item["value"]
-        try:
-            formatted_key = b64decode(key).decode("utf-8")
-        except:
-            formatted_key = b64decode(key)
         if value["type"] == 1:
-            # byte string
-            try:
-                formatted_value = b64decode(value["bytes"]).decode("utf-8")
-            except:
-                formatted_value = value["bytes"]
-            formatted[formatted_key] = formatted_value
+            # byte string, kept base64 encoded if it is not utf-8
+            formatted_value = decode_utf8(b64decode(value["bytes"]))
+            formatted[format_state_key(item["key"])] = (
+                formatted_value if formatted_value is not None else value["bytes"]
+            )
         else:
             # integer
-            formatted[formatted_key] = value["uint"]
+            formatted[format_state_key(item["key"])] = value["uint"]
     return formatted
 
 
-def read_local_state(indexer_client, address, app_id, block=None):
-    """Returns dict of local state for address for application with id app_id
+def get_local_states(account_info, fields=None):
+    """Returns dict of formatted local state by app id from an account info payload
+
+    :param account_info: account info as returned by the indexer ("account" field) or algod
+    :type account_info: dict
+    :param fields: formatted keys to include, defaults to None (all keys)
+    :type fields: iterable, optional
+    :return: dict of local state by app id
+    :rtype: dict
+    """
+    return {
+        local_state["id"]: format_state(local_state.get("key-value", []), fields)
+        for local_state in account_info.get("apps-local-state", [])
+    }
+
+
+class StateBackend(ABC):
+    """Interface for reading live and historical application state. Any backend can be passed to
+    read_global_state, read_local_state and get_global_state_field in place of an indexer client. Backends
+    must implement read_global_state, read_account and read_round.
+    """
+
+    @abstractmethod
+    def read_global_state(self, app_id, block=None):
+        """Returns dict of global state for application with the given app_id
+
+        :param app_id: id of the application
+        :type app_id: int
+        :param block: block at which to query historical data
+        :type block: int, optional
+        :return: dict of global state for application with id app_id
+        :rtype: dict
+        """
+
+    @abstractmethod
+    def read_account(self, address, block=None):
+        """Returns the account info of address, including its apps-local-state
+
+        :param address: address of account
+        :type address: string
+        :param block: block at which to get the historical account info
+        :type block: int, optional
+        :return: account info
+        :rtype: dict
+        """
+
+    def read_local_state(self, address, app_id, block=None):
+        """Returns dict of local state for address for application with id app_id
+
+        :param address: address of account for which to get state
+        :type address: string
+        :param app_id: id of the application
+        :type app_id: int
+        :param block: block at which to get the historical local state
+        :type block: int, optional
+        :return: dict of local state of address for application with id app_id
+        :rtype: dict
+        """
+        for local_state in self.read_account(address, block=block).get(
+            "apps-local-state", []
+        ):
+            if local_state["id"] == app_id:
+                return format_state(local_state.get("key-value", []))
+        return {}
+
+    def read_local_states(self, address, block=None):
+        """Returns dict of local state by app id for every application address is opted into, from a single
+        account read
+
+        :param address: address of account for which to get state
+        :type address: string
+        :param block: block at which to get the historical local state
+        :type block: int, optional
+        :return: dict of local state by app id
+        :rtype: dict
+        """
+        return get_local_states(self.read_account(address, block=block))
+
+    @abstractmethod
+    def read_round(self):
+        """Returns the latest round the backend serves live reads at
+
+        :return: round
+        :rtype: int
+        """
+
+
+class IndexerStateBackend(StateBackend):
+    def __init__(self, indexer_client, historical_indexer_client=None):
+        """Constructor method for a state backend reading from the indexer. Historical (block) reads go to the
+        historical indexer when one is given.
+
+        :param indexer_client: indexer client
+        :type indexer_client: :class:`IndexerClient`
+        :param historical_indexer_client: indexer client for historical reads, defaults to indexer_client
+        :type historical_indexer_client: :class:`IndexerClient`, optional
+        """
+        self.indexer = indexer_client
+        self.historical_indexer = (
+            historical_indexer_client
+            if historical_indexer_client is not None
+            else indexer_client
+        )
+
+    def get_indexer(self, block=None):
+        """Returns the indexer client used for reads at block
+
+        :param block: block at which to query historical data
+        :type block: int, optional
+        :return: indexer client
+        :rtype: :class:`IndexerClient`
+        """
+        return self.historical_indexer if block else self.indexer
+
+    def read_global_state(self, app_id, block=None):
+        return read_global_state(self.get_indexer(block), app_id, block=block)
+
+    def read_account(self, address, block=None):
+        try:
+            return (
+                self.get_indexer(block)
+                .account_info(address, round_num=block)
+                .get("account", {})
+            )
+        except:
+            raise Exception("Account does not exist.")
+
+    def read_local_state(self, address, app_id, block=None):
+        return read_local_state(self.get_indexer(block), address, app_id, block=block)
+
+    def read_round(self):
+        return self.indexer.health()["round"]
+
+
+def get_state_backend(
+    indexer_client, historical_indexer_client=None, state_backend=None
+):
+    """Returns state_backend, or an :class:`IndexerStateBackend` reading from the indexer clients when it is None
 
     :param indexer_client: indexer client
     :type indexer_client: :class:`IndexerClient`
+    :param historical_indexer_client: indexer client for historical reads, defaults to indexer_client
+    :type historical_indexer_client: :class:`IndexerClient`, optional
+    :param state_backend: backend to use, defaults to None (read from the indexer clients)
+    :type state_backend: :class:`StateBackend`, optional
+    :return: state backend
+    :rtype: :class:`StateBackend`
+    """
+    if state_backend is not None:
+        return state_backend
+    return IndexerStateBackend(indexer_client, historical_indexer_client)
+
+
+class AlgodStateBackend(StateBackend):
+    def __init__(self, algod_client, historical_backend=None):
+        """Constructor method for a state backend reading current round state from algod, which does not lag
+        behind the network like the indexer. Historical (block) reads are delegated to historical_backend.
+
+        :param algod_client: algod client
+        :type algod_client: :class:`AlgodClient`
+        :param historical_backend: backend for historical reads, typically an :class:`IndexerStateBackend`
+        :type historical_backend: :class:`StateBackend`, optional
+        """
+        self.algod = algod_client
+        self.historical_backend = historical_backend
+
+    def get_historical_backend(self):
+        """Returns the backend used for historical reads
+
+        :return: historical backend
+        :rtype: :class:`StateBackend`
+        """
+        if self.historical_backend is None:
+            raise Exception("Historical reads require a historical backend")
+        return self.historical_backend
+
+    def read_global_state(self, app_id, block=None):
+        if block:
+            return self.get_historical_backend().read_global_state(app_id, block=block)
+        try:
+            application_info = self.algod.application_info(app_id)
+        except AlgodHTTPError:
+            raise Exception("Application does not exist.")
+        return format_state(application_info["params"].get("global-state", []))
+
+    def read_account(self, address, block=None):
+        if block:
+            return self.get_historical_backend().read_account(address, block=block)
+        try:
+            return self.algod.account_info(address)
+        except AlgodHTTPError:
+            raise Exception("Account does not exist.")
+
+    def read_local_state(self, address, app_id, block=None):
+        if block:
+            return self.get_historical_backend().read_local_state(
+                address, app_id, block=block
+            )
+        try:
+            local_state = self.algod.account_application_info(address, app_id)
+        except AlgodHTTPError as e:
+            # algod returns 404 for accounts which are not opted into the application
+            if e.code == 404:
+                return {}
+            raise Exception("Account does not exist.")
+        return format_state(local_state.get("app-local-state", {}).get("key-value", []))
+
+    def read_round(self):
+        return self.algod.status()["last-round"]
+
+
+DEFAULT_STATE_CACHE_SIZE = 1024
+DEFAULT_STATE_CACHE_TTL = 2.0
+
+
+class CachedStateBackend(StateBackend):
+    def __init__(
+        self,
+        backend,
+        max_size=DEFAULT_STATE_CACHE_SIZE,
+        ttl=DEFAULT_STATE_CACHE_TTL,
+        cache_historical=True,
+        clock=monotonic,
+    ):
+        """Constructor method for a bounded LRU cache in front of another state backend. Live reads are
+        cached for ttl seconds, or until invalidated. Historical (block) reads never change, so they are
+        kept until evicted when cache_historical is set. Reads return a shallow copy of the cached dict, the
+        nested lists and dicts (e.g. apps-local-state) are shared with the cache and must not be mutated.
+
+        :param backend: backend to read through to
+        :type backend: :class:`StateBackend`
+        :param max_size: maximum number of cached entries, defaults to DEFAULT_STATE_CACHE_SIZE
+        :type max_size: int, optional
+        :param ttl: seconds a live read stays valid, None to keep it until invalidated, defaults to DEFAULT_STATE_CACHE_TTL
+        :type ttl: float, optional
+        :param cache_historical: cache historical reads without expiry, defaults to True
+        :type cache_historical: bool, optional
+        :param clock: function returning the current time in seconds, defaults to time.monotonic
+        :type clock: function, optional
+        """
+        self.backend = backend
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_historical = cache_historical
+        self.clock = clock
+
+        self.lock = Lock()
+        self.entries = OrderedDict()
+        self.round = None
+        # incremented by every invalidation, so that live reads in flight during one are not cached
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_stats(self):
+        """Returns cache counters
+
+        :return: dict with hits, misses, evictions and size
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+            }
+
+    def get_round(self):
+        """Returns the latest round passed to advance_round
+
+        :return: round, or None if the round has not been set
+        :rtype: int
+        """
+        return self.round
+
+    def _read(self, key, block, read):
+        """Returns the cached value for key, calling read on a miss"""
+        now = self.clock()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+            generation = self.generation
+
+        value = read()
+
+        if block:
+            if not self.cache_historical:
+                return value
+            expires_at = None
+        elif self.ttl is None:
+            expires_at = None
+        elif self.ttl > 0:
+            expires_at = now + self.ttl
+        else:
+            return value
+        with self.lock:
+            if not block and self.generation != generation:
+                # invalidated while reading, the value may predate the change that caused it
+                return dict(value)
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return dict(value)
+
+    def read_global_state(self, app_id, block=None):
+        return self._read(
+            ("global", app_id, block),
+            block,
+            lambda: self.backend.read_global_state(app_id, block=block),
+        )
+
+    def read_account(self, address, block=None):
+        return self._read(
+            ("account", address, block),
+            block,
+            lambda: self.backend.read_account(address, block=block),
+        )
+
+    def read_local_state(self, address, app_id, block=None):
+        return self._read(
+            ("local", address, app_id, block),
+            block,
+            lambda: self.backend.read_local_state(address, app_id, block=block),
+        )
+
+    def read_round(self):
+        return self.backend.read_round()
+
+    def _invalidate(self, predicate):
+        """Drops every live entry for which predicate(key, value) is True"""
+        with self.lock:
+            self.generation += 1
+            for key in [
+                key
+                for key, (_, value) in self.entries.items()
+                if key[-1] is None and predicate(key, value)
+            ]:
+                del self.entries[key]
+
+    def invalidate_app(self, app_id):
+        """Drops cached live global and local state of an application, including the account info of every
+        account opted into it, whose apps-local-state holds that local state
+
+        :param app_id: id of the application
+        :type app_id: int
+        """
+        self._invalidate(
+            lambda key, value: (key[0] == "global" and key[1] == app_id)
+            or (key[0] == "local" and key[2] == app_id)
+            or (
+                key[0] == "account"
+                and any(
+                    local_state["id"] == app_id
+                    for local_state in value.get("apps-local-state", [])
+                )
+            )
+        )
+
+    def invalidate_address(self, address):
+        """Drops cached live account info and local state of an address
+
+        :param address: address of account
+        :type address: string
+        """
+        self._invalidate(lambda key, value: key[0] != "global" and key[1] == address)
+
+    def invalidate_all(self):
+        """Drops every cached live read. Historical reads are kept."""
+        self._invalidate(lambda key, value: True)
+
+    def advance_round(self, round, invalidate=True):
+        """Records that the network has reached round. Live reads may be stale once the round advances, so they
+        are dropped unless the caller has already invalidated what changed.
+
+        :param round: latest round
+        :type round: int
+        :param invalidate: drop every cached live read if the round advanced, defaults to True
+        :type invalidate: bool, optional
+        """
+        if self.round is not None and round <= self.round:
+            return
+        self.round = round
+        if invalidate:
+            self.invalidate_all()
+
+
+def read_local_state(indexer_client, address, app_id, block=None):
+    """Returns dict of local state for address for application with id app_id
+
+    :param indexer_client: indexer client or state backend
+    :type indexer_client: :class:`IndexerClient` or :class:`StateBackend`
     :param address: address of account for which to get state
     :type address: string
     :param app_id: id of the application
@@ -178,6 +650,8 @@ def read_local_state(indexer_client, address, app_id, block=None):
     :return: dict of local state of address for application with id app_id
     :rtype: dict
     """
+    if isinstance(indexer_client, StateBackend):
+        return indexer_client.read_local_state(address, app_id, block=block)
 
     try:
         results = indexer_client.account_info(address, round_num=block).get(
@@ -194,11 +668,37 @@ def read_local_state(indexer_client, address, app_id, block=None):
     return {}
 
 
+def read_local_states(indexer_client, address, block=None):
+    """Returns dict of local state by app id for every application address is opted into, from a single
+    account read
+
+    :param indexer_client: indexer client or state backend
+    :type indexer_client: :class:`IndexerClient` or :class:`StateBackend`
+    :param address: address of account for which to get state
+    :type address: string
+    :param block: block at which to get the historical local state
+    :type block: int, optional
+    :return: dict of local state by app id
+    :rtype: dict
+    """
+    if isinstance(indexer_client, StateBackend):
+        return indexer_client.read_local_states(address, block=block)
+
+    try:
+        results = indexer_client.account_info(address, round_num=block).get(
+            "account", {}
+        )
+    except:
+        raise Exception("Account does not exist.")
+
+    return get_local_states(results)
+
+
 def read_global_state(indexer_client, app_id, block=None):
     """Returns dict of global state for application with the given app_id
 
-    :param indexer_client: indexer client
-    :type indexer_client: :class:`IndexerClient`
+    :param indexer_client: indexer client or state backend
+    :type indexer_client: :class:`IndexerClient` or :class:`StateBackend`
     :param app_id: id of the application
     :type app_id: int
     :param block: block at which to query historical data
@@ -206,6 +706,8 @@ def read_global_state(indexer_client, app_id, block=None):
     :return: dict of global state for application with id app_id
     :rtype: dict
     """
+    if isinstance(indexer_client, StateBackend):
+        return indexer_client.read_global_state(app_id, block=block)
 
     try:
         application_info = indexer_client.applications(app_id, round_num=block).get(
@@ -220,8 +722,8 @@ def read_global_state(indexer_client, app_id, block=None):
 def get_global_state_field(indexer_client, app_id, field_name, block=None):
     """Returns field of global state for application with the given app_id
 
-    :param indexer_client: indexer client
-    :type indexer_client: :class:`IndexerClient`
+    :param indexer_client: indexer client or state backend
+    :type indexer_client: :class:`IndexerClient` or :class:`StateBackend`
     :param app_id: id of the application
     :type app_id: int
     :param block: block at which to query historical data
@@ -237,6 +739,216 @@ def get_global_state_field(indexer_client, app_id, field_name, block=None):
         raise Exception("Key not found")
 
 
+class ChainConfig:
+    def __init__(self, chain, config):
+        """Constructor method for an immutable view of the protocol configuration of a chain, in the format
+        of an entry of contracts.json. Symbol indexes are built once on construction.
+
+        :param chain: network name
+        :type chain: string e.g. 'testnet'
+        :param config: protocol configuration for the chain in the format of an entry of contracts.json
+        :type config: dict
+        """
+        symbol_info = {
+            symbol: MappingProxyType(dict(info))
+            for symbol, info in config["SYMBOL_INFO"].items()
+        }
+        set_field = super().__setattr__
+        set_field("chain", chain)
+        set_field("symbols", tuple(config["SYMBOLS"]))
+        set_field("manager_app_id", config["managerAppId"])
+        set_field("supported_market_count", config["supportedMarketCount"])
+        set_field("max_market_count", config["maxMarketCount"])
+        set_field("max_atomic_opt_in_market_count", config["maxAtomicOptInMarketCount"])
+        set_field("init_round", config["initRound"])
+        set_field("symbol_info", MappingProxyType(symbol_info))
+        set_field(
+            "market_app_ids",
+            MappingProxyType(
+                {symbol: info["marketAppId"] for symbol, info in symbol_info.items()}
+            ),
+        )
+        set_field(
+            "market_counters",
+            MappingProxyType(
+                {
+                    symbol: info["marketCounter"]
+                    for symbol, info in symbol_info.items()
+                    if "marketCounter" in info
+                }
+            ),
+        )
+        set_field(
+            "bank_asset_ids",
+            MappingProxyType(
+                {
+                    symbol: info["bankAssetId"]
+                    for symbol, info in symbol_info.items()
+                    if "bankAssetId" in info
+                }
+            ),
+        )
+        set_field(
+            "underlying_asset_ids",
+            MappingProxyType(
+                {
+                    symbol: info["underlyingAssetId"]
+                    for symbol, info in symbol_info.items()
+                    if "underlyingAssetId" in info
+                }
+            ),
+        )
+        set_field(
+            "symbols_by_market_app_id",
+            MappingProxyType(
+                {app_id: symbol for symbol, app_id in self.market_app_ids.items()}
+            ),
+        )
+        set_field(
+            "staking_contracts",
+            MappingProxyType(
+                {
+                    name: MappingProxyType(dict(info))
+                    for name, info in config.get("STAKING_CONTRACTS", {}).items()
+                }
+            ),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ChainConfig is immutable")
+
+    def get_ordered_symbols(self, max=False, max_atomic_opt_in=False):
+        """Returns list of supported symbols
+
+        :param max: max assets?
+        :type max: boolean
+        :param max_atomic_opt_in: max atomic opt in assets?
+        :type max_atomic_opt_in: boolean
+        :return: list of supported symbols
+        :rtype: list
+        """
+        if max:
+            supported_market_count = self.max_market_count
+        elif max_atomic_opt_in:
+            supported_market_count = self.max_atomic_opt_in_market_count
+        else:
+            supported_market_count = self.supported_market_count
+        return list(self.symbols[:supported_market_count])
+
+    def get_manager_app_id(self):
+        """Returns app id of manager
+
+        :return: manager app id
+        :rtype: int
+        """
+        return self.manager_app_id
+
+    def get_market_app_id(self, symbol):
+        """Returns market app id of symbol
+
+        :param symbol: symbol to get market data for
+        :type symbol: string e.g. 'ALGO'
+        :return: market app id
+        :rtype: int
+        """
+        return self.market_app_ids[symbol]
+
+    def get_market_counter(self, symbol):
+        """Returns market counter of symbol
+
+        :param symbol: symbol to get market data for
+        :type symbol: string e.g. 'ALGO'
+        :return: market counter
+        :rtype: int
+        """
+        return self.market_counters[symbol]
+
+    def get_bank_asset_id(self, symbol):
+        """Returns bank asset id of symbol
+
+        :param symbol: symbol to get market data for
+        :type symbol: string e.g. 'ALGO'
+        :return: bank asset id
+        :rtype: int
+        """
+        return self.bank_asset_ids[symbol]
+
+    def get_underlying_asset_id(self, symbol):
+        """Returns underlying asset id of symbol
+
+        :param symbol: symbol to get market data for
+        :type symbol: string e.g. 'ALGO'
+        :return: underlying asset id
+        :rtype: int
+        """
+        return self.underlying_asset_ids[symbol]
+
+    def get_symbol(self, market_app_id):
+        """Returns symbol of the market with app id market_app_id
+
+        :param market_app_id: market app id
+        :type market_app_id: int
+        :return: symbol
+        :rtype: string
+        """
+        return self.symbols_by_market_app_id[market_app_id]
+
+    def get_init_round(self):
+        """Returns init round of algofi protocol
+
+        :return: init round of algofi protocol
+        :rtype: int
+        """
+        return self.init_round
+
+    def get_staking_contracts(self):
+        """Returns dict of supported staking contracts by name
+
+        :return: dict of supported staking contracts
+        :rtype: dict
+        """
+        return {name: dict(info) for name, info in self.staking_contracts.items()}
+
+
+_chain_configs = {}
+_chain_configs_lock = Lock()
+
+
+def set_chain_config(chain_config):
+    """Registers a caller-supplied :class:`ChainConfig`, replacing the configuration loaded from contracts.json
+    for its chain. Registering every chain used before the first lookup avoids reading contracts.json entirely.
+
+    :param chain_config: chain configuration
+    :type chain_config: :class:`ChainConfig`
+    """
+    with _chain_configs_lock:
+        _chain_configs[chain_config.chain] = chain_config
+
+
+def get_chain_config(chain):
+    """Returns the memoized :class:`ChainConfig` for the specified chain. contracts.json is parsed at most once
+    per process, on the first lookup of a chain that has not been registered with set_chain_config.
+
+    :param chain: network to query data for
+    :type chain: string e.g. 'testnet'
+    :return: chain configuration
+    :rtype: :class:`ChainConfig`
+    """
+    chain_config = _chain_configs.get(chain, None)
+    if chain_config is None:
+        with _chain_configs_lock:
+            if chain not in _chain_configs:
+                with open(CONTRACTS_FPATH, "r") as contracts_file:
+                    json_file = json.load(contracts_file)
+                for name, config in json_file.items():
+                    if name not in _chain_configs:
+                        _chain_configs[name] = ChainConfig(name, config)
+            if chain not in _chain_configs:
+                raise Exception("Unsupported chain " + str(chain))
+            chain_config = _chain_configs[chain]
+    return chain_config
+
+
 def get_staking_contracts(chain):
     """Returns list of supported staking contracts for the specified chain. Pulled from hardcoded values in contracts.json.
 
@@ -245,10 +957,7 @@ def get_staking_contracts(chain):
     :return: list of supported staking contracts
     :rtype: list
     """
-    with open(CONTRACTS_FPATH, "r") as contracts_file:
-        json_file = json.load(contracts_file)[chain]
-        staking_contracts = json_file["STAKING_CONTRACTS"]
-        return staking_contracts
+    return get_chain_config(chain).get_staking_contracts()
 
 
 def get_ordered_symbols(chain, max=False, max_atomic_opt_in=False):
@@ -261,15 +970,9 @@ def get_ordered_symbols(chain, max=False, max_atomic_opt_in=False):
     :return: list of supported symbols for algofi's protocol on chain
     :rtype: list
     """
-    with open(CONTRACTS_FPATH, "r") as contracts_file:
-        json_file = json.load(contracts_file)[chain]
-        if max:
-            supported_market_count = json_file["maxMarketCount"]
-        elif max_atomic_opt_in:
-            supported_market_count = json_file["maxAtomicOptInMarketCount"]
-        else:
-            supported_market_count = json_file["supportedMarketCount"]
-        return json_file["SYMBOLS"][:supported_market_count]
+    return get_chain_config(chain).get_ordered_symbols(
+        max=max, max_atomic_opt_in=max_atomic_opt_in
+    )
 
 
 def get_manager_app_id(chain):
@@ -280,9 +983,7 @@ def get_manager_app_id(chain):
     :return: manager app id
     :rtype: int
     """
-    with open(CONTRACTS_FPATH, "r") as contracts_file:
-        json_file = json.load(contracts_file)[chain]
-        return json_file["managerAppId"]
+    return get_chain_config(chain).get_manager_app_id()
 
 
 def get_market_app_id(chain, symbol):
@@ -295,9 +996,7 @@ def get_market_app_id(chain, symbol):
     :return: market app id
     :rtype: int
     """
-    with open(CONTRACTS_FPATH, "r") as contracts_file:
-        json_file = json.load(contracts_file)[chain]
-        return json_file["SYMBOL_INFO"][symbol]["marketAppId"]
+    return get_chain_config(chain).get_market_app_id(symbol)
 
 
 def get_init_round(chain):
@@ -308,9 +1007,7 @@ def get_init_round(chain):
     :return: init round of algofi protocol on specified chain
     :rtype: string
     """
-    with open(CONTRACTS_FPATH, "r") as contracts_file:
-        json_file = json.load(contracts_file)[chain]
-        return json_file["initRound"]
+    return get_chain_config(chain).get_init_round()
 
 
 def prepare_payment_transaction(
@@ -355,13 +1052,19 @@ def get_new_account():
 
 
 class TransactionGroup:
-    def __init__(self, transactions):
+    def __init__(self, transactions, group_id=None):
         """Constructor method for :class:`TransactionGroup` class
 
         :param transactions: list of unsigned transactions
         :type transactions: list
+        :param group_id: group id already calculated for the transactions, defaults to None (calculate it)
+        :type group_id: bytes, optional
         """
-        transactions = assign_group_id(transactions)
+        if group_id is None:
+            transactions = assign_group_id(transactions)
+        else:
+            for txn in transactions:
+                txn.group = group_id
         self.transactions = transactions
         self.signed_transactions = [None for _ in self.transactions]
 
@@ -405,6 +1108,64 @@ class TransactionGroup:
         return {"txid": txid}
 
 
+def concurrent_map(function, items, max_workers=None):
+    """Returns the list of function applied to each item, evaluated over a bounded thread pool.
+    Results are returned in the order of items. Runs sequentially when max_workers is None or 1.
+
+    :param function: function of a single argument
+    :type function: callable
+    :param items: items to apply function to
+    :type items: iterable
+    :param max_workers: maximum number of worker threads, defaults to None (sequential)
+    :type max_workers: int, optional
+    :return: list of results
+    :rtype: list
+    """
+    items = list(items)
+    if not max_workers or max_workers <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(function, items))
+
+
+def concurrent_imap_unordered(function, items, max_workers=None):
+    """Yields (item, result) pairs of function applied to each item as they complete, evaluated over a bounded
+    thread pool. At most twice max_workers items are in flight, so items may be a lazy iterable of any length.
+    Runs sequentially, in order, when max_workers is None or 1.
+
+    :param function: function of a single argument
+    :type function: callable
+    :param items: items to apply function to
+    :type items: iterable
+    :param max_workers: maximum number of worker threads, defaults to None (sequential)
+    :type max_workers: int, optional
+    :return: generator of (item, result) tuples
+    :rtype: generator
+    """
+    if not max_workers or max_workers <= 1:
+        for item in items:
+            yield item, function(item)
+        return
+    items = iter(items)
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            while True:
+                for item in items:
+                    pending[executor.submit(function, item)] = item
+                    if len(pending) >= 2 * max_workers:
+                        break
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            # the consumer stopped early or a call failed, drop the queued work
+            for future in pending:
+                future.cancel()
+
+
 def get_accounts_opted_into_app(indexer, app_id):
     """Submits the signed transactions to network using the algod client
     :param indexer: indexer client
@@ -0,0 +1,118 @@
+from ..utils import format_state
+
+
+class AccountView:
+    def __init__(self, state_backend, address, account_info=None):
+        """Constructor method for an indexed view of one account read. Opt-in, balance and local state queries are
+        answered from the same read until :meth:`refresh` is called.
+
+        :param state_backend: backend to read the account from
+        :type state_backend: :class:`StateBackend`
+        :param address: address of the account
+        :type address: string
+        :param account_info: already read account info, defaults to None (read it)
+        :type account_info: dict, optional
+        """
+
+        self.state_backend = state_backend
+        self.address = address
+        if account_info is None:
+            self.refresh()
+        else:
+            self.load_account_info(account_info)
+
+    def refresh(self):
+        """Re-reads the account"""
+        try:
+            account_info = self.state_backend.read_account(self.address)
+        except:
+            raise Exception("Account does not exist with address " + self.address + ".")
+        self.load_account_info(account_info)
+
+    def load_account_info(self, account_info):
+        """Indexes an account info payload
+
+        :param account_info: account info as returned by the indexer ("account" field) or algod
+        :type account_info: dict
+        """
+        if "apps-local-state" not in account_info:
+            account_info["apps-local-state"] = []
+        if "assets" not in account_info:
+            account_info["assets"] = []
+        self.account_info = account_info
+        self.local_states = {
+            local_state["id"]: local_state
+            for local_state in account_info["apps-local-state"]
+        }
+        self.balances = {
+            asset["asset-id"]: asset["amount"] for asset in account_info["assets"]
+        }
+        self.asset_ids = frozenset(self.balances)
+        self.balances[1] = account_info["amount"]
+
+    def get_address(self):
+        """Returns the address of the account
+
+        :return: address
+        :rtype: string
+        """
+        return self.address
+
+    def get_account_info(self):
+        """Returns the account info payload
+
+        :return: account info
+        :rtype: dict
+        """
+        return self.account_info
+
+    def is_opted_into_app(self, app_id):
+        """Returns a boolean if the account is opted into an application with id app_id
+
+        :param app_id: id of the application
+        :type app_id: int
+        :return: boolean if account is opted into an application
+        :rtype: boolean
+        """
+        return app_id in self.local_states
+
+    def is_opted_into_asset(self, asset_id):
+        """Returns a boolean if the account is opted into an asset with id asset_id
+
+        :param asset_id: id of the asset
+        :type asset_id: int
+        :return: boolean if account is opted into an asset
+        :rtype: boolean
+        """
+        return asset_id in self.asset_ids
+
+    def get_balances(self):
+        """Returns a dictionary of balances by asset id, algo balance under asset id 1
+
+        :return: balances
+        :rtype: dict
+        """
+        return dict(self.balances)
+
+    def get_balance(self, asset_id=1):
+        """Returns the amount of asset with id asset_id held by the account
+
+        :param asset_id: id of the asset, defaults to 1 (algo)
+        :type asset_id: int, optional
+        :return: amount of asset
+        :rtype: int
+        """
+        return self.balances.get(asset_id, 0)
+
+    def get_local_state(self, app_id):
+        """Returns dict of local state of the account for application with id app_id
+
+        :param app_id: id of the application
+        :type app_id: int
+        :return: dict of local state, empty if the account is not opted in
+        :rtype: dict
+        """
+        local_state = self.local_states.get(app_id, None)
+        if local_state is None:
+            return {}
+        return format_state(local_state.get("key-value", []))
@@ -3,9 +3,15 @@ import base64
 from algosdk import encoding
 from algosdk.v2client.algod import AlgodClient
 from algosdk.v2client.indexer import IndexerClient
-from ..utils import read_local_state, read_global_state, get_global_state_field
+from ..utils import (
+    read_local_state,
+    read_global_state,
+    get_global_state_field,
+    get_state_backend,
+)
 from ..contract_strings import algofi_manager_strings as manager_strings
 from ..contract_strings import algofi_market_strings as market_strings
+from .metadata_cache import read_asset_params
 
 
 class Asset:
@@ -18,6 +24,10 @@ class Asset:
         oracle_app_id=None,
         oracle_price_field=None,
         oracle_price_scale_factor=None,
+        lazy=False,
+        metadata_cache=None,
+        state_backend=None,
+        price_epoch=None,
     ):
         """Constructor me.
 
@@ -35,35 +45,29 @@ class Asset:
         :type string
         :param oracle_price_scale_factor: price oracle scale factor to dollars
         :type int
+        :param lazy: defer asset info and price reads until first accessed, defaults to False
+        :type lazy: bool, optional
+        :param metadata_cache: cache of immutable asset params, defaults to None
+        :type metadata_cache: :class:`MetadataCache`, optional
+        :param state_backend: backend for live and historical state reads, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
+        :param price_epoch: epoch deciding when the oracle price is re-read, defaults to None (read on every conversion)
+        :type price_epoch: :class:`PriceEpoch`, optional
         """
 
         self.indexer = indexer_client
         self.historical_indexer = historical_indexer_client
+        self.state_backend = get_state_backend(
+            indexer_client, historical_indexer_client, state_backend
+        )
+        self.lazy = lazy
+        self.metadata_cache = metadata_cache
+        self.price_epoch = price_epoch
 
         # asset info
         self.underlying_asset_id = underlying_asset_id
         self.bank_asset_id = bank_asset_id
 
-        if underlying_asset_id != 1:
-            try:
-                underlying_asset_info = self.indexer.asset_info(
-                    underlying_asset_id
-                ).get("asset", {})
-                self.underlying_asset_info = underlying_asset_info["params"]
-            except:
-                raise Exception(
-                    "Asset with id " + str(underlying_asset_id) + " does not exist."
-                )
-        else:
-            self.underlying_asset_info = {"decimals": 6}
-
-        try:
-            bank_asset_info = self.indexer.asset_info(bank_asset_id).get("asset", {})
-        except:
-            raise Exception("Asset with id " + str(bank_asset_id) + " does not exist.")
-
-        self.bank_asset_info = bank_asset_info["params"]
-
         # oracle info
         if oracle_app_id != None:
             assert oracle_price_field != None
@@ -71,7 +75,37 @@ class Asset:
         self.oracle_app_id = oracle_app_id
         self.oracle_price_field = oracle_price_field
         self.oracle_price_scale_factor = oracle_price_scale_factor
-        self.oracle_raw_price = self.get_raw_price()
+
+        if not lazy:
+            self.underlying_asset_info = self._read_underlying_asset_info()
+            self.bank_asset_info = self._read_bank_asset_info()
+            self.oracle_raw_price = self.get_raw_price()
+
+    def __getattr__(self, name):
+        """Hydrates lazily loaded fields on first access. Only called for attributes
+        which have not been set yet.
+        """
+        if name == "underlying_asset_info":
+            self.underlying_asset_info = self._read_underlying_asset_info()
+        elif name == "bank_asset_info":
+            self.bank_asset_info = self._read_bank_asset_info()
+        elif name == "oracle_raw_price":
+            self.oracle_raw_price = self.get_raw_price()
+        else:
+            raise AttributeError(
+                "'%s' object has no attribute '%s'" % (type(self).__name__, name)
+            )
+        return self.__dict__[name]
+
+    def _read_underlying_asset_info(self):
+        if self.underlying_asset_id == 1:
+            return {"decimals": 6}
+        return read_asset_params(
+            self.indexer, self.underlying_asset_id, self.metadata_cache
+        )
+
+    def _read_bank_asset_info(self):
+        return read_asset_params(self.indexer, self.bank_asset_id, self.metadata_cache)
 
     def get_underlying_asset_id(self):
         """Returns underying asset id
@@ -129,33 +163,80 @@ class Asset:
         """
         return self.oracle_price_scale_factor
 
-    def get_raw_price(self, block=None, update=True):
+    def set_oracle_params(
+        self, oracle_app_id, oracle_price_field, oracle_price_scale_factor
+    ):
+        """Updates the oracle parameters of the asset without any network reads. The latest raw price is
+        discarded, and lazily re-read, only if the oracle app or price field changed.
+
+        :param oracle_app_id: price oracle app id
+        :type oracle_app_id: int
+        :param oracle_price_field: price oracle price field
+        :type oracle_price_field: string
+        :param oracle_price_scale_factor: price oracle scale factor to dollars
+        :type oracle_price_scale_factor: int
+        """
+        if (
+            oracle_app_id != self.oracle_app_id
+            or oracle_price_field != self.oracle_price_field
+        ):
+            self.__dict__.pop("oracle_raw_price", None)
+        self.oracle_app_id = oracle_app_id
+        self.oracle_price_field = oracle_price_field
+        self.oracle_price_scale_factor = oracle_price_scale_factor
+
+    def set_raw_price(self, raw_price):
+        """Stores an already read raw oracle price as the price of the current epoch
+
+        :param raw_price: raw oracle price
+        :type raw_price: int
+        """
+        self.oracle_raw_price = raw_price
+        self.oracle_price_epoch = (
+            self.price_epoch.get_epoch() if self.price_epoch is not None else None
+        )
+
+    def get_raw_price(self, block=None, update=None):
         """Returns the current raw oracle price if update.
-           Else returns the latest updated raw price
+           Else returns the latest updated raw price.
+           By default the price is re-read once per epoch of the price epoch, or on every call without one.
 
         :param block: block at which to get historical data
         :type block: int, optional
-        :param update: fetch updated prices if True
+        :param update: fetch updated prices if True, defaults to None (follow the price epoch)
         :type update: bool, optional
         :return: oracle price
         :rtype: int
         """
         if self.oracle_app_id == None:
             raise Exception("no oracle app id for asset")
-        if not update:
+        if update is False:
             return self.oracle_raw_price
         elif block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.oracle_app_id,
                 self.oracle_price_field,
                 block=block,
             )
-        else:
-            self.oracle_raw_price = get_global_state_field(
-                self.indexer, self.oracle_app_id, self.oracle_price_field
-            )
-            return self.oracle_raw_price
+        epoch = None
+        if self.price_epoch is not None:
+            epoch = self.price_epoch.get_epoch()
+            if (
+                update is None
+                and self.__dict__.get("oracle_price_epoch", None) == epoch
+                and "oracle_raw_price" in self.__dict__
+            ):
+                self.price_epoch.record_avoided_read()
+                return self.oracle_raw_price
+        # the epoch is taken before the read, a price read across an advance belongs to the older epoch
+        self.oracle_raw_price = get_global_state_field(
+            self.state_backend, self.oracle_app_id, self.oracle_price_field
+        )
+        self.oracle_price_epoch = epoch
+        if self.price_epoch is not None:
+            self.price_epoch.record_read()
+        return self.oracle_raw_price
 
     def get_underlying_decimals(self):
         """Returns decimals of asset
@@ -165,13 +246,13 @@ class Asset:
         """
         return self.underlying_asset_info["decimals"]
 
-    def get_price(self, block=None, update=True):
+    def get_price(self, block=None, update=None):
         """Returns the current oracle price if update.
            Else returns the latest updated price
 
         :param block: block at which to get historical data
         :type block: int, optional
-        :param update: fetch updated prices if True
+        :param update: fetch updated prices if True, defaults to None (follow the price epoch)
         :type update: bool, optional
         :return: oracle price
         :rtype: int
@@ -184,13 +265,15 @@ class Asset:
             / (self.get_oracle_price_scale_factor() * 1e3)
         )
 
-    def to_usd(self, amount, block=None, update=True):
+    def to_usd(self, amount, block=None, update=None):
         """Return the usd value of the underlying amount (base units)
 
         :param amount: integer amount of base underlying units
         :type amount: int
         :param block: block at which to get historical data
         :type block: int, optional
+        :param update: fetch updated prices if True, defaults to None (follow the price epoch)
+        :type update: bool, optional
         :return: usd value
         :rtype: float
         """
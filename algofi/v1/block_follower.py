@@ -0,0 +1,297 @@
+import json
+from algosdk import encoding
+from ..utils import concurrent_map, CachedStateBackend
+from .price_epoch import PRICE_POLICY_ROUND
+
+# transaction fields which reference accounts whose balances or local state may change
+ADDRESS_FIELDS = ("snd", "rcv", "close", "arcv", "asnd", "aclose")
+# application call on-completion values which opt the sender in or out of the application
+OPT_IN_ON_COMPLETE = 1
+CLOSE_OUT_ON_COMPLETE = 2
+CLEAR_STATE_ON_COMPLETE = 3
+
+
+def _to_address(value):
+    # json blocks encode addresses as strings, msgpack blocks as raw public keys
+    if isinstance(value, bytes) and len(value) == 32:
+        return encoding.encode_address(value)
+    return value
+
+
+def _iterate_transactions(block):
+    # top level and inner transactions of a block, in no particular order
+    signed_txns = list(block.get("txns", []))
+    while signed_txns:
+        signed_txn = signed_txns.pop()
+        yield signed_txn.get("txn", {})
+        signed_txns.extend(signed_txn.get("dt", {}).get("itx", []))
+
+
+def get_block_references(block):
+    """Returns the application ids called and the addresses referenced by the transactions of a block,
+    including inner transactions
+
+    :param block: block as returned under the "block" key of the algod block endpoint
+    :type block: dict
+    :return: tuple of the set of called app ids and the set of referenced addresses
+    :rtype: (set, set)
+    """
+    app_ids = set()
+    addresses = set()
+    for txn in _iterate_transactions(block):
+        for field in ADDRESS_FIELDS:
+            if field in txn:
+                addresses.add(_to_address(txn[field]))
+        if txn.get("type") == "appl":
+            # app creation has no apid, the created app cannot be an algofi app we know about
+            if txn.get("apid"):
+                app_ids.add(txn["apid"])
+            for address in txn.get("apat", []):
+                addresses.add(_to_address(address))
+    return app_ids, addresses
+
+
+def get_block_opt_ins(block):
+    """Returns the (app id, address) pairs of the application opt ins, close outs and clear states of a block.
+    A user which opts out of a manager and in again gets a new storage address.
+
+    :param block: block as returned under the "block" key of the algod block endpoint
+    :type block: dict
+    :return: set of (app id, sender address) tuples
+    :rtype: set
+    """
+    opt_ins = set()
+    for txn in _iterate_transactions(block):
+        if (
+            txn.get("type") == "appl"
+            and txn.get("apid")
+            and txn.get("apan")
+            in (
+                OPT_IN_ON_COMPLETE,
+                CLOSE_OUT_ON_COMPLETE,
+                CLEAR_STATE_ON_COMPLETE,
+            )
+        ):
+            opt_ins.add((txn["apid"], _to_address(txn["snd"])))
+    return opt_ins
+
+
+class BlockFollower:
+    def __init__(self, client, algod_client=None, state_backend=None, callback=None):
+        """Constructor method for a follower which keeps the state of a client current by inspecting each new
+        block. Only the managers, markets and oracle prices whose applications were called in a block are
+        refreshed, and only the cache entries of the applications and accounts referenced in it are invalidated.
+        The cached storage address of a user which opts into or out of an application is dropped.
+
+        :param client: client whose state to keep current
+        :type client: :class:`Client`
+        :param algod_client: client providing status_after_block and block_info, defaults to client.algod
+        :type algod_client: :class:`AlgodClient`, optional
+        :param state_backend: cache to invalidate, defaults to client.state_backend when it is a :class:`CachedStateBackend`
+        :type state_backend: :class:`CachedStateBackend`, optional
+        :param callback: function called with the update dict of every processed round, defaults to None
+        :type callback: function, optional
+        """
+        self.client = client
+        self.algod = algod_client if algod_client is not None else client.algod
+        if state_backend is None and isinstance(
+            client.state_backend, CachedStateBackend
+        ):
+            state_backend = client.state_backend
+        self.state_backend = state_backend
+        self.callback = callback
+        self.round = None
+
+    def get_round(self):
+        """Returns the last processed round
+
+        :return: round, or None if no round has been processed
+        :rtype: int
+        """
+        return self.round
+
+    def get_watched_apps(self):
+        """Returns the objects to refresh when an application is called. Managers and markets are refreshed
+        through update_global_state, assets through get_raw_price. Objects which have not been loaded yet are
+        skipped, they read current state when first accessed.
+
+        :return: dict of app id to list of (kind, object) tuples
+        :rtype: dict
+        """
+        watched = {}
+        registry = self.client.registry
+        with registry.lock:
+            managers = list(registry.managers.items())
+            markets = list(registry.markets.items())
+        for app_id, manager in managers:
+            if "rewards_program" in manager.__dict__:
+                watched.setdefault(app_id, []).append(("app", manager))
+        for app_id, market in markets:
+            # the asset is set whenever the market global state has been loaded
+            asset = market.__dict__.get("asset")
+            if asset is None:
+                continue
+            watched.setdefault(app_id, []).append(("app", market))
+            if asset.oracle_app_id is not None and "oracle_raw_price" in asset.__dict__:
+                watched.setdefault(asset.oracle_app_id, []).append(("oracle", asset))
+        return watched
+
+    def process_block(self, round, block):
+        """Invalidates and refreshes the state touched by block
+
+        :param round: round of the block
+        :type round: int
+        :param block: block as returned under the "block" key of the algod block endpoint
+        :type block: dict
+        :return: dict with the round, the touched algofi app ids, the referenced addresses and the number of refreshed objects
+        :rtype: dict
+        """
+        app_ids, addresses = get_block_references(block)
+        watched = self.get_watched_apps()
+        touched_app_ids = app_ids & set(watched)
+
+        if self.state_backend is not None:
+            for app_id in app_ids:
+                self.state_backend.invalidate_app(app_id)
+            for address in addresses:
+                self.state_backend.invalidate_address(address)
+            self.state_backend.advance_round(round, invalidate=False)
+        storage_address_cache = self.client.storage_address_cache
+        if storage_address_cache is not None:
+            for app_id, address in get_block_opt_ins(block):
+                storage_address_cache.invalidate(app_id, address)
+        price_epoch = self.client.get_price_epoch()
+        if price_epoch is not None and price_epoch.get_policy() == PRICE_POLICY_ROUND:
+            price_epoch.advance(round)
+
+        # an object watched under several apps is refreshed once per kind
+        refreshes = {}
+        for app_id in touched_app_ids:
+            for kind, obj in watched[app_id]:
+                refreshes[(kind, id(obj))] = (kind, obj)
+
+        def refresh(item):
+            kind, obj = item
+            if kind == "oracle":
+                obj.get_raw_price(update=True)
+            else:
+                obj.update_global_state()
+
+        concurrent_map(refresh, list(refreshes.values()), self.client.max_workers)
+
+        self.round = round
+        update = {
+            "round": round,
+            "app_ids": touched_app_ids,
+            "addresses": addresses,
+            "refreshed": len(refreshes),
+        }
+        if self.callback is not None:
+            self.callback(update)
+        return update
+
+    def poll(self, round=None):
+        """Waits for the round after round and processes every block up to the latest round
+
+        :param round: last processed round, defaults to the last round processed by this follower or the current round
+        :type round: int, optional
+        :return: list of update dicts, one per processed round
+        :rtype: list
+        """
+        if round is None:
+            round = self.round
+        if round is None:
+            round = self.algod.status()["last-round"]
+        if self.round is None or self.round < round:
+            self.round = round
+        last_round = self.algod.status_after_block(round_num=round)["last-round"]
+        updates = []
+        for next_round in range(round + 1, last_round + 1):
+            block = self.algod.block_info(round_num=next_round)["block"]
+            updates.append(self.process_block(next_round, block))
+        return updates
+
+    def follow(self, round=None, max_rounds=None):
+        """Processes new blocks as they are produced
+
+        :param round: last processed round, defaults to the current round
+        :type round: int, optional
+        :param max_rounds: stop after processing this many rounds, defaults to None (follow forever)
+        :type max_rounds: int, optional
+        """
+        processed = 0
+        while max_rounds is None or processed < max_rounds:
+            processed += len(self.poll(round=round))
+            round = None
+
+
+class BlockReplayClient:
+    def __init__(self, blocks):
+        """Constructor method for an algod stand-in serving recorded blocks, for replaying a block follower
+        deterministically
+
+        :param blocks: dict of round to block as returned under the "block" key of the algod block endpoint
+        :type blocks: dict
+        """
+        self.blocks = {int(round): block for round, block in blocks.items()}
+        self.rounds = sorted(self.blocks)
+        self.round = self.rounds[0] - 1 if self.rounds else 0
+
+    @classmethod
+    def record(cls, algod_client, first_round, last_round):
+        """Returns a replay client for the blocks first_round through last_round read from algod
+
+        :param algod_client: algod client
+        :type algod_client: :class:`AlgodClient`
+        :param first_round: first round to record
+        :type first_round: int
+        :param last_round: last round to record
+        :type last_round: int
+        :return: replay client
+        :rtype: :class:`BlockReplayClient`
+        """
+        return cls(
+            {
+                round: algod_client.block_info(round_num=round)["block"]
+                for round in range(first_round, last_round + 1)
+            }
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Returns a replay client for the blocks saved at path
+
+        :param path: path of a json file written by save
+        :type path: string
+        :return: replay client
+        :rtype: :class:`BlockReplayClient`
+        """
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        """Saves the recorded blocks as json
+
+        :param path: path of the json file
+        :type path: string
+        """
+        with open(path, "w") as f:
+            json.dump({str(round): self.blocks[round] for round in self.rounds}, f)
+
+    def status(self):
+        return {"last-round": self.round}
+
+    def status_after_block(self, block_num=None, round_num=None):
+        # each call releases the next recorded block, like a node producing one block per wait
+        round = round_num if round_num is not None else block_num
+        pending = [r for r in self.rounds if r > round]
+        if not pending:
+            raise Exception("No recorded blocks after round " + str(round))
+        self.round = max(self.round, pending[0])
+        return {"last-round": self.round}
+
+    def block_info(self, block=None, round_num=None, **kwargs):
+        round = round_num if round_num is not None else block
+        if round not in self.blocks:
+            raise Exception("No recorded block for round " + str(round))
+        return {"block": self.blocks[round]}
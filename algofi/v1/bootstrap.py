@@ -0,0 +1,128 @@
+from algosdk.v2client.indexer import IndexerClient
+from ..utils import format_state, concurrent_map, IndexerStateBackend
+from .metadata_cache import read_asset_params
+
+
+def bootstrap(
+    indexer_client: IndexerClient,
+    managers,
+    markets,
+    max_workers,
+    metadata_cache=None,
+    state_backend=None,
+):
+    """Hydrates lazily constructed managers and markets (including the market assets) by fanning
+    out every independent indexer read over a bounded thread pool. Reads are issued in two waves:
+    (1) application info for every manager and market, (2) asset info for every underlying and bank
+    asset and global state for every oracle, so startup latency is bounded by the slowest request of
+    each wave rather than the sum of all requests. Each application, asset and oracle is read once
+    even if it is shared by several objects. Global state is read through state_backend, asset params
+    from the indexer.
+
+    :param indexer_client: a :class:`IndexerClient` for interacting with the network
+    :type indexer_client: :class:`IndexerClient`
+    :param managers: list of :class:`Manager` objects constructed with lazy=True
+    :type managers: list
+    :param markets: list of :class:`Market` objects constructed with lazy=True
+    :type markets: list
+    :param max_workers: maximum number of concurrent indexer requests
+    :type max_workers: int
+    :param metadata_cache: cache of immutable asset params and creation rounds, defaults to None
+    :type metadata_cache: :class:`MetadataCache`, optional
+    :param state_backend: backend for global state reads, defaults to None (read from indexer_client)
+    :type state_backend: :class:`StateBackend`, optional
+    """
+
+    if state_backend is None:
+        state_backend = IndexerStateBackend(indexer_client)
+
+    def read_application(app_id):
+        """Returns the global state and creation round of an application, None if the backend does not
+        return the creation round"""
+        if isinstance(state_backend, IndexerStateBackend):
+            # the indexer returns the creation round with the global state
+            try:
+                application = (
+                    state_backend.get_indexer()
+                    .applications(app_id)
+                    .get("application", {})
+                )
+            except:
+                raise Exception("Application does not exist.")
+            return (
+                format_state(application["params"].get("global-state", [])),
+                application.get("created-at-round"),
+            )
+        return state_backend.read_global_state(app_id), None
+
+    def read_cached_asset_params(asset_id):
+        return read_asset_params(indexer_client, asset_id, metadata_cache)
+
+    # wave 1: manager and market applications
+    app_ids = list(
+        dict.fromkeys(
+            [manager.manager_app_id for manager in managers]
+            + [market.market_app_id for market in markets]
+        )
+    )
+    applications = dict(
+        zip(app_ids, concurrent_map(read_application, app_ids, max_workers))
+    )
+    for manager in managers:
+        manager.load_global_state(applications[manager.manager_app_id][0])
+    for market in markets:
+        global_state, created_at_round = applications[market.market_app_id]
+        if created_at_round is not None:
+            market.created_at_round = created_at_round
+            if metadata_cache is not None:
+                metadata_cache.set_created_at_round(
+                    market.market_app_id, created_at_round
+                )
+        elif metadata_cache is not None:
+            created_at_round = metadata_cache.get_created_at_round(market.market_app_id)
+            if created_at_round is not None:
+                market.created_at_round = created_at_round
+        # otherwise created_at_round is read from the indexer on first access
+        market.load_global_state(global_state)
+
+    # wave 2: asset params and oracle prices
+    assets = [market.asset for market in markets if market.asset]
+    asset_ids = list(
+        dict.fromkeys(
+            [
+                asset.underlying_asset_id
+                for asset in assets
+                if asset.underlying_asset_id != 1
+            ]
+            + [asset.bank_asset_id for asset in assets]
+        )
+    )
+    oracle_app_ids = list(
+        dict.fromkeys(
+            [asset.oracle_app_id for asset in assets if asset.oracle_app_id != None]
+        )
+    )
+    results = concurrent_map(
+        lambda request: request[0](request[1]),
+        [(read_cached_asset_params, asset_id) for asset_id in asset_ids]
+        + [(state_backend.read_global_state, app_id) for app_id in oracle_app_ids],
+        max_workers,
+    )
+    asset_params = dict(zip(asset_ids, results[: len(asset_ids)]))
+    oracle_states = dict(zip(oracle_app_ids, results[len(asset_ids) :]))
+    for asset in assets:
+        asset.underlying_asset_info = (
+            asset_params[asset.underlying_asset_id]
+            if asset.underlying_asset_id != 1
+            else {"decimals": 6}
+        )
+        asset.bank_asset_info = asset_params[asset.bank_asset_id]
+        if asset.oracle_app_id != None:
+            oracle_state = oracle_states[asset.oracle_app_id]
+            if asset.oracle_price_field not in oracle_state:
+                raise Exception("Key not found")
+            asset.set_raw_price(oracle_state[asset.oracle_price_field])
+
+    # hydrated objects behave as if they were constructed eagerly from here on
+    for obj in managers + markets + assets:
+        obj.lazy = False
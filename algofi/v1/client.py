@@ -1,5 +1,6 @@
 import json
 import base64
+from time import monotonic
 from algosdk import encoding
 from algosdk.v2client.algod import AlgodClient
 from algosdk.v2client.indexer import IndexerClient
@@ -7,12 +8,13 @@ from algosdk.error import AlgodHTTPError
 from ..utils import (
     read_local_state,
     read_global_state,
+    read_local_states,
+    concurrent_map,
+    concurrent_imap_unordered,
     wait_for_confirmation,
-    get_ordered_symbols,
-    get_manager_app_id,
-    get_market_app_id,
-    get_init_round,
-    get_staking_contracts,
+    get_chain_config,
+    get_state_backend,
+    CachedStateBackend,
 )
 from ..contract_strings import algofi_manager_strings as manager_strings
 from ..contract_strings import algofi_market_strings as market_strings
@@ -20,6 +22,17 @@ from ..contract_strings import algofi_market_strings as market_strings
 from .manager import Manager
 from .market import Market
 from .staking_contract import StakingContract
+from .registry import AppRegistry
+from .account_view import AccountView
+from .storage_address_cache import StorageAddressCache
+from .snapshot import (
+    take_snapshot,
+    DEFAULT_SNAPSHOT_MAX_AGE,
+    DEFAULT_SNAPSHOT_MAX_WORKERS,
+)
+from .position_table import PositionTable, require_numpy
+from .records import UserPosition, PriceMap
+from .bootstrap import bootstrap
 
 from .optin import prepare_manager_app_optin_transactions
 from .add_collateral import prepare_add_collateral_transactions
@@ -36,6 +49,9 @@ from .remove_collateral_underlying import (
 from .repay_borrow import prepare_repay_borrow_transactions
 from .supply_algos_to_vault import prepare_supply_algos_to_vault_transactions
 from .remove_algos_from_vault import prepare_remove_algos_from_vault_transactions
+
+# number of passes refresh_prices makes over the oracles before giving up when the round keeps advancing
+REFRESH_PRICES_MAX_ATTEMPTS = 3
 from .sync_vault import prepare_sync_vault_transactions
 from .send_governance_transaction import prepare_send_governance_transactions
 from .send_keyreg_online_transaction import prepare_send_keyreg_online_transactions
@@ -57,6 +73,14 @@ class Client:
         historical_indexer_client: IndexerClient,
         user_address,
         chain,
+        lazy=False,
+        max_workers=None,
+        chain_config=None,
+        metadata_cache=None,
+        state_backend=None,
+        storage_address_cache=None,
+        price_epoch=None,
+        snapshot_max_age=DEFAULT_SNAPSHOT_MAX_AGE,
     ):
         """Constructor method for the generic client.
 
@@ -70,6 +94,22 @@ class Client:
         :type user_address: string
         :param chain: network type
         :type chain: string
+        :param lazy: defer manager, market, staking contract and asset reads until a field is first accessed, defaults to False
+        :type lazy: bool, optional
+        :param max_workers: number of concurrent indexer requests used to load protocol state on construction, defaults to None (sequential)
+        :type max_workers: int, optional
+        :param chain_config: protocol configuration to use instead of the bundled contracts.json entry for chain, defaults to None
+        :type chain_config: :class:`ChainConfig`, optional
+        :param metadata_cache: persistent cache of immutable asset params and creation rounds, saved after construction, defaults to None
+        :type metadata_cache: :class:`MetadataCache`, optional
+        :param state_backend: backend for live and historical state reads, e.g. an :class:`AlgodStateBackend` to read current state from algod, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
+        :param storage_address_cache: cache of user to storage address, may be shared between clients, defaults to a new in memory :class:`StorageAddressCache`. Entries are dropped when an opt in is prepared or a :class:`BlockFollower` sees an opt in or close out, call :meth:`StorageAddressCache.invalidate` after closing out otherwise.
+        :type storage_address_cache: :class:`StorageAddressCache`, optional
+        :param price_epoch: price epoch shared by every asset, deciding when oracle prices are re-read, e.g. a :class:`PriceEpoch` starting an epoch per computation, defaults to None (read on every conversion)
+        :type price_epoch: :class:`PriceEpoch`, optional
+        :param snapshot_max_age: seconds after which the cached snapshot used by :meth:`get_health` and :meth:`get_healths` is taken again, None to keep it until :meth:`refresh_snapshot`, defaults to DEFAULT_SNAPSHOT_MAX_AGE
+        :type snapshot_max_age: float, optional
         """
 
         # constants
@@ -81,44 +121,99 @@ class Client:
         self.algod = algod_client
         self.indexer = indexer_client
         self.historical_indexer = historical_indexer_client
+        self.state_backend = get_state_backend(
+            indexer_client, historical_indexer_client, state_backend
+        )
         self.chain = chain
+        self.chain_config = (
+            chain_config if chain_config is not None else get_chain_config(chain)
+        )
+        self.lazy = lazy
+        self.max_workers = max_workers
+        self.metadata_cache = metadata_cache
+        self.storage_address_cache = (
+            storage_address_cache
+            if storage_address_cache is not None
+            else StorageAddressCache()
+        )
+        self.price_epoch = price_epoch
+        # protocol snapshot health queries are computed against, see refresh_snapshot
+        self.cached_snapshot = None
+        self.cached_snapshot_at = None
+        self.snapshot_max_age = snapshot_max_age
 
         # user info
         self.user_address = user_address
 
-        self.init_round = get_init_round(self.chain)
-        self.active_ordered_symbols = get_ordered_symbols(self.chain)
-        self.max_ordered_symbols = get_ordered_symbols(self.chain, max=True)
-        self.max_atomic_opt_in_ordered_symbols = get_ordered_symbols(
-            self.chain, max_atomic_opt_in=True
+        self.init_round = self.chain_config.get_init_round()
+        self.active_ordered_symbols = self.chain_config.get_ordered_symbols()
+        self.max_ordered_symbols = self.chain_config.get_ordered_symbols(max=True)
+        self.max_atomic_opt_in_ordered_symbols = self.chain_config.get_ordered_symbols(
+            max_atomic_opt_in=True
         )
 
-        # manager info
-        self.manager = Manager(
-            self.indexer, self.historical_indexer, get_manager_app_id(self.chain)
+        # objects are constructed without network reads when they are bootstrapped concurrently
+        concurrent_bootstrap = not self.lazy and self.max_workers is not None
+        deferred = self.lazy or concurrent_bootstrap
+
+        # one canonical manager / market per application, shared with the staking contracts
+        self.registry = AppRegistry(
+            self.indexer,
+            self.historical_indexer,
+            lazy=deferred,
+            metadata_cache=self.metadata_cache,
+            state_backend=self.state_backend,
+            storage_address_cache=self.storage_address_cache,
+            price_epoch=self.price_epoch,
         )
 
+        # manager info
+        self.manager = self.registry.get_manager(self.chain_config.get_manager_app_id())
+
         # market info
         self.markets = {
-            symbol: Market(
-                self.indexer,
-                self.historical_indexer,
-                get_market_app_id(self.chain, symbol),
+            symbol: self.registry.get_market(
+                self.chain_config.get_market_app_id(symbol)
             )
             for symbol in self.max_ordered_symbols
         }
 
         # staking contract info
-        self.staking_contract_info = get_staking_contracts(self.chain)
+        self.staking_contract_info = self.chain_config.get_staking_contracts()
         self.staking_contracts = {
             name: StakingContract(
-                self.indexer, self.historical_indexer, self.staking_contract_info[name]
+                self.indexer,
+                self.historical_indexer,
+                self.staking_contract_info[name],
+                registry=self.registry,
             )
             for name in self.staking_contract_info.keys()
         }
 
+        if concurrent_bootstrap:
+            bootstrap(
+                self.indexer,
+                list(self.registry.managers.values()),
+                list(self.registry.markets.values()),
+                self.max_workers,
+                metadata_cache=self.metadata_cache,
+                state_backend=self.state_backend,
+            )
+
+        if self.metadata_cache is not None:
+            self.metadata_cache.save()
+
     # HELPER FUNCTIONS
 
+    def update_global_state(self, block=None):
+        """Method to fetch the most recent global state of the manager, every market and every staking contract.
+        Each application is read once even if it is shared.
+
+        :param block: block at which to get historical data
+        :type block: int, optional
+        """
+        self.registry.refresh(block=block, max_workers=self.max_workers)
+
     def get_default_params(self):
         """Initializes the transactions parameters for the client."""
         params = self.algod.suggested_params()
@@ -128,6 +223,21 @@ class Client:
 
     # USER STATE GETTERS
 
+    def get_account_view(self, address=None):
+        """Returns an :class:`AccountView` answering opt-in, balance and local state queries for the user from one
+        account read. The view can be reused until refreshed.
+
+        :param address: address to get info for. If None will use address supplied when creating client
+        :type address: string
+        :return: account view
+        :rtype: :class:`AccountView`
+        """
+        if not address:
+            address = self.user_address
+        if not address:
+            raise Exception("user_address has not been specified")
+        return AccountView(self.state_backend, address)
+
     def get_user_info(self, address=None):
         """Returns a dictionary of information about the user
 
@@ -136,20 +246,7 @@ class Client:
         :return: A dict of information of the user
         :rtype: dict
         """
-        if not address:
-            address = self.user_address
-        if address:
-            try:
-                user_info = self.indexer.account_info(address).get("account", {})
-                if "apps-local-state" not in user_info:
-                    user_info["apps-local-state"] = []
-                if "assets" not in user_info:
-                    user_info["assets"] = []
-                return user_info
-            except:
-                raise Exception("Account does not exist with address " + address + ".")
-        else:
-            raise Exception("user_address has not been specified")
+        return self.get_account_view(address).get_account_info()
 
     def is_opted_into_app(self, app_id, address=None):
         """Returns a boolean if the user address is opted into an application with id app_id
@@ -161,10 +258,7 @@ class Client:
         :return: boolean if user is opted into an application
         :rtype: boolean
         """
-        if not address:
-            address = self.user_address
-        user_info = self.get_user_info(address)
-        return app_id in [x["id"] for x in user_info["apps-local-state"]]
+        return self.get_account_view(address).is_opted_into_app(app_id)
 
     def is_opted_into_asset(self, asset_id, address=None):
         """Returns a boolean if the user address is opted into an asset with id asset_id
@@ -176,11 +270,7 @@ class Client:
         :return: boolean if user is opted into an asset
         :rtype: boolean
         """
-        if not address:
-            address = self.user_address
-        user_info = self.get_user_info(address)
-        assets = user_info.get("assets", [])
-        return asset_id in [x["asset-id"] for x in assets]
+        return self.get_account_view(address).is_opted_into_asset(asset_id)
 
     def get_user_balances(self, address=None):
         """Returns a dictionary of user balances by asset id
@@ -190,12 +280,7 @@ class Client:
         :return: amount of asset
         :rtype: int
         """
-        if not address:
-            address = self.user_address
-        user_info = self.get_user_info(address)
-        balances = {asset["asset-id"]: asset["amount"] for asset in user_info["assets"]}
-        balances[1] = user_info["amount"]
-        return balances
+        return self.get_account_view(address).get_balances()
 
     def get_user_balance(self, asset_id=1, address=None):
         """Returns a amount of asset in user's balance with asset id asset_id
@@ -207,9 +292,42 @@ class Client:
         :return: amount of asset
         :rtype: int
         """
+        return self.get_account_view(address).get_balance(asset_id)
+
+    def get_user_position(self, address=None):
+        """Returns the lending market positions for a given address (must be opted in)
+
+        :param address: address to get info for. If None will use address supplied when creating client
+        :type address: string
+        :return: user position
+        :rtype: :class:`UserPosition`
+        """
         if not address:
             address = self.user_address
-        return self.get_user_balances(address).get(asset_id, 0)
+        manager_app_id = self.manager.get_manager_app_id()
+        storage_address = self.manager.get_storage_address(address)
+        # with a price epoch every market values the position against the same price vector
+        if self.price_epoch is not None:
+            self.price_epoch.begin_computation()
+        # one storage account read, shared by the manager and every market
+        storage_local_states = read_local_states(self.state_backend, storage_address)
+        symbols = tuple(self.active_ordered_symbols)
+        return UserPosition(
+            storage_address,
+            self.manager.get_storage_record(
+                storage_address, user_state=storage_local_states.get(manager_app_id, {})
+            ),
+            symbols,
+            tuple(
+                self.markets[symbol].get_position(
+                    storage_address,
+                    user_state=storage_local_states.get(
+                        self.markets[symbol].get_market_app_id(), {}
+                    ),
+                )
+                for symbol in symbols
+            ),
+        )
 
     def get_user_state(self, address=None):
         """Returns a dictionary with the lending market state for a given address (must be opted in)
@@ -219,38 +337,143 @@ class Client:
         :return: state
         :rtype: dict
         """
-        result = {}
-        if not address:
-            address = self.user_address
-        result["manager"] = self.manager.get_user_state(address)
-        storage_address = self.manager.get_storage_address(address)
-        for symbol in self.active_ordered_symbols:
-            result[symbol] = self.markets[symbol].get_storage_state(storage_address)
-        return result
+        return self.get_user_position(address).to_dict()
 
-    def get_storage_state(self, storage_address=None, block=None, include_manager=True):
-        """Returns a dictionary with the lending market state for a given storage address
+    def get_storage_position(
+        self, storage_address=None, block=None, include_manager=True
+    ):
+        """Returns the lending market positions for a given storage address
 
         :param storage_address: address to get info for. If None will use address supplied when creating client
         :type storage_address: string
-
-        :return: state
-        :rtype: dict
+        :param block: block at which to get historical data
+        :type block: int, optional
+        :param include_manager: include the manager local state, defaults to True
+        :type include_manager: bool, optional
+        :return: user position
+        :rtype: :class:`UserPosition`
         """
-        result = {}
         if not storage_address:
             storage_address = self.manager.get_storage_address(self.user_address)
+        storage_local_states = read_local_states(
+            self.state_backend, storage_address, block=block
+        )
+        if not block and self.price_epoch is not None:
+            self.price_epoch.begin_computation()
+        manager = None
         if include_manager:
-            result["manager"] = self.manager.get_storage_state(
-                storage_address, block=block
+            manager = self.manager.get_storage_record(
+                storage_address,
+                block=block,
+                user_state=storage_local_states.get(
+                    self.manager.get_manager_app_id(), {}
+                ),
             )
         supported_market_count = self.manager.get_supported_market_count(block=block)
-        active_markets = self.active_ordered_symbols[:supported_market_count]
-        for symbol in active_markets:
-            result[symbol] = self.markets[symbol].get_storage_state(
-                storage_address, block=block
+        symbols = tuple(self.active_ordered_symbols[:supported_market_count])
+        return UserPosition(
+            storage_address,
+            manager,
+            symbols,
+            tuple(
+                self.markets[symbol].get_position(
+                    storage_address,
+                    block=block,
+                    user_state=storage_local_states.get(
+                        self.markets[symbol].get_market_app_id(), {}
+                    ),
+                )
+                for symbol in symbols
+            ),
+        )
+
+    def get_storage_state(self, storage_address=None, block=None, include_manager=True):
+        """Returns a dictionary with the lending market state for a given storage address
+
+        :param storage_address: address to get info for. If None will use address supplied when creating client
+        :type storage_address: string
+
+        :return: state
+        :rtype: dict
+        """
+        return self.get_storage_position(
+            storage_address, block=block, include_manager=include_manager
+        ).to_dict()
+
+    def get_storage_positions(
+        self,
+        storage_addresses,
+        block=None,
+        include_manager=True,
+        max_workers=None,
+        snapshot=None,
+    ):
+        """Yields the lending market positions of many storage addresses as their accounts are read. One
+        :class:`ProtocolSnapshot` of the markets and prices is shared by all addresses, and every account is read
+        once, at the snapshot round, over a bounded worker pool.
+
+        :param storage_addresses: storage addresses to get info for, may be a lazy iterable
+        :type storage_addresses: iterable
+        :param block: block at which to get historical data, defaults to None (latest round of the historical indexer)
+        :type block: int, optional
+        :param include_manager: include the manager local state, defaults to True
+        :type include_manager: bool, optional
+        :param max_workers: maximum number of concurrent account reads, defaults to the client max_workers or DEFAULT_SNAPSHOT_MAX_WORKERS
+        :type max_workers: int, optional
+        :param snapshot: snapshot to compute positions against instead of taking one at block, defaults to None
+        :type snapshot: :class:`ProtocolSnapshot`, optional
+        :return: generator of (storage_address, :class:`UserPosition`) tuples, in completion order
+        :rtype: generator
+        """
+        if not max_workers:
+            max_workers = (
+                self.max_workers if self.max_workers else DEFAULT_SNAPSHOT_MAX_WORKERS
             )
-        return result
+        if snapshot is None:
+            snapshot = self.snapshot(round=block, max_workers=max_workers)
+        round = snapshot.get_round()
+
+        def read_position(storage_address):
+            account_info = self.state_backend.read_account(storage_address, block=round)
+            return snapshot.get_position(account_info, include_manager=include_manager)
+
+        return concurrent_imap_unordered(read_position, storage_addresses, max_workers)
+
+    def get_storage_states(
+        self,
+        storage_addresses,
+        block=None,
+        include_manager=True,
+        max_workers=None,
+        snapshot=None,
+    ):
+        """Yields the lending market state of many storage addresses as their accounts are read, in the format of
+        :meth:`get_storage_state`. See :meth:`get_storage_positions`.
+
+        :param storage_addresses: storage addresses to get info for, may be a lazy iterable
+        :type storage_addresses: iterable
+        :param block: block at which to get historical data, defaults to None (latest round of the historical indexer)
+        :type block: int, optional
+        :param include_manager: include the manager local state, defaults to True
+        :type include_manager: bool, optional
+        :param max_workers: maximum number of concurrent account reads, defaults to the client max_workers or DEFAULT_SNAPSHOT_MAX_WORKERS
+        :type max_workers: int, optional
+        :param snapshot: snapshot to compute positions against instead of taking one at block, defaults to None
+        :type snapshot: :class:`ProtocolSnapshot`, optional
+        :return: generator of (storage_address, state) tuples, in completion order
+        :rtype: generator
+        """
+        positions = self.get_storage_positions(
+            storage_addresses,
+            block=block,
+            include_manager=include_manager,
+            max_workers=max_workers,
+            snapshot=snapshot,
+        )
+        return (
+            (storage_address, position.to_dict())
+            for storage_address, position in positions
+        )
 
     def get_user_staking_contract_state(self, staking_contract_name, address=None):
         """Returns a dictionary with the staking contract state for the named staking contract and selected address
@@ -380,47 +603,193 @@ class Client:
         """
         return self.active_ordered_symbols
 
+    def refresh_prices(self, round=None, max_workers=None):
+        """Reads the price of every active asset in one pass and starts a new price epoch with them. Oracle apps
+        shared by several markets are read once and all oracles are read concurrently, live through the state
+        backend or pinned to round. Live reads bypass cached oracle state and are stamped with the round the
+        backend served them at: if the round advances during the pass the oracles are read again, up to
+        REFRESH_PRICES_MAX_ATTEMPTS passes.
+
+        :param round: historical round to read the prices at, defaults to None (live prices, stamped with the latest round of the state backend)
+        :type round: int, optional
+        :param max_workers: maximum number of concurrent oracle reads, defaults to the client max_workers or DEFAULT_SNAPSHOT_MAX_WORKERS
+        :type max_workers: int, optional
+        :return: raw and dollarized prices by symbol, stamped with the round
+        :rtype: :class:`PriceMap`
+        """
+        if not max_workers:
+            max_workers = (
+                self.max_workers if self.max_workers else DEFAULT_SNAPSHOT_MAX_WORKERS
+            )
+        assets = {
+            symbol: market.get_asset()
+            for symbol, market in self.get_active_markets().items()
+            if market.get_asset().get_oracle_app_id() is not None
+        }
+        oracle_app_ids = list(
+            dict.fromkeys(asset.get_oracle_app_id() for asset in assets.values())
+        )
+
+        def read_oracle_states(block):
+            if self.price_epoch is not None:
+                for _ in oracle_app_ids:
+                    self.price_epoch.record_read()
+            return dict(
+                zip(
+                    oracle_app_ids,
+                    concurrent_map(
+                        lambda app_id: read_global_state(
+                            self.state_backend, app_id, block=block
+                        ),
+                        oracle_app_ids,
+                        max_workers,
+                    ),
+                )
+            )
+
+        if round is not None:
+            oracle_states = read_oracle_states(round)
+        else:
+            for _ in range(REFRESH_PRICES_MAX_ATTEMPTS):
+                round = self.state_backend.read_round()
+                if isinstance(self.state_backend, CachedStateBackend):
+                    # a cached oracle state may have been read rounds before the stamp
+                    for app_id in oracle_app_ids:
+                        self.state_backend.invalidate_app(app_id)
+                oracle_states = read_oracle_states(None)
+                if self.state_backend.read_round() == round:
+                    break
+            else:
+                raise Exception(
+                    "Round advanced during each of "
+                    + str(REFRESH_PRICES_MAX_ATTEMPTS)
+                    + " price reads"
+                )
+
+        if self.price_epoch is not None:
+            self.price_epoch.advance(round)
+        raw_prices = {}
+        prices = {}
+        for symbol, asset in assets.items():
+            oracle_state = oracle_states[asset.get_oracle_app_id()]
+            if asset.get_oracle_price_field() not in oracle_state:
+                raise Exception("Key not found")
+            asset.set_raw_price(oracle_state[asset.get_oracle_price_field()])
+            raw_prices[symbol] = asset.get_raw_price(update=False)
+            prices[symbol] = asset.get_price(update=False)
+        if self.price_epoch is not None:
+            for _ in range(len(assets) - len(oracle_app_ids)):
+                self.price_epoch.record_avoided_read()
+        return PriceMap(round, raw_prices, prices)
+
     def get_raw_prices(self, update=True):
-        """Returns a dictionary of raw oracle prices of the active assets pulled from their oracles.
-           If update is False returns the latest updated raw prices
+        """Returns a dictionary of raw oracle prices of the active assets pulled from their oracles in one pass,
+        see :meth:`refresh_prices`. If update is False returns the latest updated raw prices
 
         :param update: fetch updated prices if True
         :type update: bool, optional
         :return: dictionary of int prices
         :rtype: dict
         """
+        if update:
+            return self.refresh_prices().get_raw_prices()
         return {
             symbol: market.get_asset().get_raw_price(update=update)
             for symbol, market in self.get_active_markets().items()
         }
 
     def get_prices(self, update=True):
-        """Returns a dictionary of dollarized float prices of the active assets pulled from their oracles.
-           If update is False returns the latest updated dollarized float prices
+        """Returns a dictionary of dollarized float prices of the active assets pulled from their oracles in one
+        pass, see :meth:`refresh_prices`. If update is False returns the latest updated dollarized float prices
 
         :param update: fetch updated prices if True
         :type update: bool, optional
         :return: dictionary of int prices
         :rtype: dict
         """
+        if update:
+            return self.refresh_prices().get_prices()
         return {
             symbol: market.get_asset().get_price(update=update)
             for symbol, market in self.get_active_markets().items()
         }
 
+    def snapshot(self, round=None, max_workers=None):
+        """Returns an immutable :class:`ProtocolSnapshot` of the manager state, the active markets' global state,
+        the oracle prices and the rewards program, fetched concurrently from the historical indexer and all
+        pinned to the same round. Getters, usd conversions and position computations then run against the
+        snapshot with no further network access.
+
+        :param round: round to pin the snapshot to, defaults to None (latest round of the historical indexer)
+        :type round: int, optional
+        :param max_workers: maximum number of concurrent indexer requests, defaults to the client max_workers
+        :type max_workers: int, optional
+        :return: protocol snapshot
+        :rtype: :class:`ProtocolSnapshot`
+        """
+        return take_snapshot(
+            self.historical_indexer,
+            self.manager,
+            self.get_active_markets(),
+            round=round,
+            max_workers=max_workers if max_workers else self.max_workers,
+        )
+
+    def refresh_snapshot(self, round=None, max_workers=None):
+        """Takes a :class:`ProtocolSnapshot` and keeps it as the cached snapshot used by :meth:`get_health` and
+        :meth:`get_healths`
+
+        :param round: round to pin the snapshot to, defaults to None (latest round of the historical indexer)
+        :type round: int, optional
+        :param max_workers: maximum number of concurrent indexer requests, defaults to the client max_workers
+        :type max_workers: int, optional
+        :return: protocol snapshot
+        :rtype: :class:`ProtocolSnapshot`
+        """
+        snapshot = self.snapshot(round=round, max_workers=max_workers)
+        self.cached_snapshot, self.cached_snapshot_at = snapshot, monotonic()
+        return snapshot
+
+    def get_price_epoch(self):
+        """Returns the price epoch shared by every asset
+
+        :return: price epoch, None if oracle prices are read on every conversion
+        :rtype: :class:`PriceEpoch`
+        """
+        return self.price_epoch
+
+    def get_cached_snapshot(self):
+        """Returns the cached snapshot, taking one on first use and once it is older than the snapshot max age
+
+        :return: protocol snapshot
+        :rtype: :class:`ProtocolSnapshot`
+        """
+        snapshot = self.cached_snapshot
+        if snapshot is None or (
+            self.snapshot_max_age is not None
+            and monotonic() - self.cached_snapshot_at > self.snapshot_max_age
+        ):
+            return self.refresh_snapshot()
+        return snapshot
+
     # INDEXER HELPERS
 
-    def get_storage_accounts(self, staking_contract_name=None, verbose=False):
-        """Returns a list of storage accounts for the given manager app id
+    def iterate_storage_accounts(self, staking_contract_name=None, block=None):
+        """Yields the account info, including apps-local-state, of every storage account for the given manager
+        app id, one indexer page at a time
 
-        :return: list of storage accounts
-        :rtype: list
+        :param staking_contract_name: name of staking contract to scan, defaults to None (the lending manager)
+        :type staking_contract_name: string, optional
+        :param block: block at which to read the accounts from the historical indexer, defaults to None (latest)
+        :type block: int, optional
+        :return: generator of account info dicts
+        :rtype: generator
         """
         next_page = ""
-        accounts = []
         user_address = base64.b64encode(
             bytes(manager_strings.user_address, "utf-8")
         ).decode("utf-8")
+        indexer_client = self.historical_indexer if block else self.indexer
 
         if staking_contract_name is None:
             app_id = list(self.get_active_markets().values())[0].get_market_app_id()
@@ -430,11 +799,14 @@ class Client:
             ).get_manager_app_id()
 
         while next_page is not None:
-            account_data = self.indexer.accounts(
-                limit=1000, next_page=next_page, application_id=app_id, exclude="assets"
+            account_data = indexer_client.accounts(
+                limit=1000,
+                next_page=next_page,
+                application_id=app_id,
+                round_num=block,
+                exclude="assets",
             )
             # filter on accounts with b'ua' in their local state for app_id
-            accounts_filtered = []
             for account in account_data["accounts"]:
                 user_local_state = account.get("apps-local-state", [])
                 for app_local_state in user_local_state:
@@ -443,20 +815,200 @@ class Client:
                         for field in fields:
                             key = field.get("key", None)
                             if key == user_address:
-                                accounts_filtered.append(account)
-            accounts.extend(
-                [
-                    (account if verbose else account["address"])
-                    for account in accounts_filtered
-                ]
-            )
+                                yield account
 
             if "next-token" in account_data:
                 next_page = account_data["next-token"]
             else:
                 next_page = None
 
-        return accounts
+    def get_storage_accounts(self, staking_contract_name=None, verbose=False):
+        """Returns a list of storage accounts for the given manager app id
+
+        :return: list of storage accounts
+        :rtype: list
+        """
+        return [
+            (account if verbose else account["address"])
+            for account in self.iterate_storage_accounts(
+                staking_contract_name=staking_contract_name
+            )
+        ]
+
+    def scan_storage_positions(
+        self, block=None, include_manager=True, max_workers=None, snapshot=None
+    ):
+        """Yields the lending market positions of every storage account in the protocol. Positions are computed
+        from the local state already contained in the indexer account pages against one shared
+        :class:`ProtocolSnapshot`, so no account is read twice. The account pages are read at the snapshot round,
+        so positions and market state come from the same round. Storage addresses seen during the scan are added
+        to the storage address cache.
+
+        :param block: block at which to scan, ignored if snapshot is given, defaults to None (latest round of the historical indexer)
+        :type block: int, optional
+        :param include_manager: include the manager local state, defaults to True
+        :type include_manager: bool, optional
+        :param max_workers: maximum number of concurrent indexer requests used to take the snapshot, defaults to the client max_workers
+        :type max_workers: int, optional
+        :param snapshot: snapshot to compute positions against and scan at instead of taking one at block, defaults to None
+        :type snapshot: :class:`ProtocolSnapshot`, optional
+        :return: generator of (storage_address, :class:`UserPosition`) tuples
+        :rtype: generator
+        """
+        if snapshot is None:
+            snapshot = self.snapshot(round=block, max_workers=max_workers)
+        manager_app_id = self.manager.get_manager_app_id()
+        for account in self.iterate_storage_accounts(block=snapshot.get_round()):
+            self.storage_address_cache.seed(manager_app_id, [account])
+            yield account["address"], snapshot.get_position(
+                account, include_manager=include_manager
+            )
+
+    def scan_storage_states(
+        self, block=None, include_manager=True, max_workers=None, snapshot=None
+    ):
+        """Yields the lending market state of every storage account in the protocol, in the format of
+        :meth:`get_storage_state`. See :meth:`scan_storage_positions`.
+
+        :param block: block at which to scan, ignored if snapshot is given, defaults to None (latest round of the historical indexer)
+        :type block: int, optional
+        :param include_manager: include the manager local state, defaults to True
+        :type include_manager: bool, optional
+        :param max_workers: maximum number of concurrent indexer requests used to take the snapshot, defaults to the client max_workers
+        :type max_workers: int, optional
+        :param snapshot: snapshot to compute positions against and scan at instead of taking one at block, defaults to None
+        :type snapshot: :class:`ProtocolSnapshot`, optional
+        :return: generator of (storage_address, state) tuples
+        :rtype: generator
+        """
+        for storage_address, position in self.scan_storage_positions(
+            block=block,
+            include_manager=include_manager,
+            max_workers=max_workers,
+            snapshot=snapshot,
+        ):
+            yield storage_address, position.to_dict()
+
+    def get_position_table(self, block=None, max_workers=None, snapshot=None):
+        """Returns a :class:`PositionTable` of every storage account in the protocol, built in one paginated scan
+        of the indexer account pages at the snapshot round. Requires numpy.
+
+        :param block: block at which to scan, ignored if snapshot is given, defaults to None (latest round of the historical indexer)
+        :type block: int, optional
+        :param max_workers: maximum number of concurrent indexer requests used to take the snapshot, defaults to the client max_workers
+        :type max_workers: int, optional
+        :param snapshot: snapshot to value positions against and scan at instead of taking one at block, defaults to None
+        :type snapshot: :class:`ProtocolSnapshot`, optional
+        :return: position table
+        :rtype: :class:`PositionTable`
+        """
+        require_numpy()
+        if snapshot is None:
+            snapshot = self.snapshot(round=block, max_workers=max_workers)
+        return PositionTable.from_accounts(
+            snapshot, self.iterate_storage_accounts(block=snapshot.get_round())
+        )
+
+    def get_health(self, storage_address=None, snapshot=None, account_info=None):
+        """Returns the borrow utilization, shortfall and seizable collateral markets of a storage account, valued
+        against the cached snapshot. The storage account is read once, live, unless account_info is given, no
+        market state or oracle price is read. When a snapshot is given the account is read at its round instead.
+
+        :param storage_address: storage address to get info for. If None will use the storage address of the user address supplied when creating client
+        :type storage_address: string, optional
+        :param snapshot: snapshot to value the account against and read it at, defaults to None (the cached snapshot, with a live read)
+        :type snapshot: :class:`ProtocolSnapshot`, optional
+        :param account_info: already read account info of the storage account, defaults to None (read it)
+        :type account_info: dict, optional
+        :return: account health
+        :rtype: :class:`AccountHealth`
+        """
+        block = None
+        if snapshot is None:
+            snapshot = self.get_cached_snapshot()
+        else:
+            block = snapshot.get_round()
+        if account_info is None:
+            if not storage_address:
+                storage_address = self.manager.get_storage_address(self.user_address)
+            account_info = self.state_backend.read_account(storage_address, block=block)
+        return snapshot.get_position(
+            account_info, include_manager=False
+        ).compute_health(round=snapshot.get_round())
+
+    def get_healths(self, storage_addresses=None, max_workers=None, snapshot=None):
+        """Yields the health of many storage accounts valued against one snapshot. With no storage addresses every
+        storage account in the protocol is scanned from the indexer account pages, with no per account reads.
+        Otherwise each account is read once over a bounded worker pool. Accounts are read live and valued
+        against the cached snapshot, when a snapshot is given they are read at its round instead.
+
+        :param storage_addresses: storage addresses to get info for, defaults to None (every storage account)
+        :type storage_addresses: iterable, optional
+        :param max_workers: maximum number of concurrent account reads, defaults to the client max_workers or DEFAULT_SNAPSHOT_MAX_WORKERS
+        :type max_workers: int, optional
+        :param snapshot: snapshot to value the accounts against and read them at, defaults to None (the cached snapshot, with live reads)
+        :type snapshot: :class:`ProtocolSnapshot`, optional
+        :return: generator of (storage_address, :class:`AccountHealth`) tuples
+        :rtype: generator
+        """
+        block = None
+        if snapshot is None:
+            snapshot = self.get_cached_snapshot()
+        else:
+            block = snapshot.get_round()
+        if storage_addresses is None:
+            manager_app_id = self.manager.get_manager_app_id()
+
+            def scan_positions():
+                for account in self.iterate_storage_accounts(block=block):
+                    self.storage_address_cache.seed(manager_app_id, [account])
+                    yield account["address"], snapshot.get_position(
+                        account, include_manager=False
+                    )
+
+            positions = scan_positions()
+        else:
+            if not max_workers:
+                max_workers = (
+                    self.max_workers
+                    if self.max_workers
+                    else DEFAULT_SNAPSHOT_MAX_WORKERS
+                )
+
+            def read_position(storage_address):
+                account_info = self.state_backend.read_account(
+                    storage_address, block=block
+                )
+                return snapshot.get_position(account_info, include_manager=False)
+
+            positions = concurrent_imap_unordered(
+                read_position, storage_addresses, max_workers
+            )
+        return (
+            (storage_address, position.compute_health(round=snapshot.get_round()))
+            for storage_address, position in positions
+        )
+
+    def seed_storage_address_cache(self, staking_contract_name=None):
+        """Scans the storage accounts of the manager (or of the named staking contract's manager) and caches the
+        storage address of every user, so later lookups need no indexer round trip
+
+        :param staking_contract_name: name of staking contract to scan, defaults to None (the lending manager)
+        :type staking_contract_name: string, optional
+        :return: number of storage addresses cached
+        :rtype: int
+        """
+        manager = (
+            self.manager
+            if staking_contract_name is None
+            else self.get_staking_contract(staking_contract_name).get_manager()
+        )
+        storage_accounts = self.get_storage_accounts(
+            staking_contract_name=staking_contract_name, verbose=True
+        )
+        return self.storage_address_cache.seed(
+            manager.get_manager_app_id(), storage_accounts
+        )
 
     # TRANSACTION HELPERS
 
@@ -505,6 +1057,10 @@ class Client:
         """
         if not address:
             address = self.user_address
+        # the user opts in with a new storage address, any cached one is from an earlier opt in
+        self.storage_address_cache.invalidate(
+            self.manager.get_manager_app_id(), address
+        )
         return prepare_manager_app_optin_transactions(
             self.manager.get_manager_app_id(),
             self.get_max_atomic_opt_in_market_app_ids(),
@@ -832,6 +1388,9 @@ class Client:
         if not address:
             address = self.user_address
         staking_contract = self.get_staking_contract(staking_contract_name)
+        self.storage_address_cache.invalidate(
+            staking_contract.get_manager_app_id(), address
+        )
         return prepare_staking_contract_optin_transactions(
             staking_contract.get_manager_app_id(),
             staking_contract.get_market_app_id(),
@@ -1182,7 +1741,16 @@ class Client:
 
 
 class AlgofiTestnetClient(Client):
-    def __init__(self, algod_client=None, indexer_client=None, user_address=None):
+    def __init__(
+        self,
+        algod_client=None,
+        indexer_client=None,
+        user_address=None,
+        lazy=False,
+        max_workers=None,
+        state_backend=None,
+        price_epoch=None,
+    ):
         """Constructor method for the testnet generic client.
 
         :param algod_client: a :class:`AlgodClient` for interacting with the network
@@ -1191,6 +1759,14 @@ class AlgofiTestnetClient(Client):
         :type indexer_client: :class:`IndexerClient`
         :param user_address: address of the user
         :type user_address: string
+        :param lazy: defer network reads until fields are first accessed, defaults to False
+        :type lazy: bool, optional
+        :param max_workers: number of concurrent indexer requests used on construction, defaults to None (sequential)
+        :type max_workers: int, optional
+        :param state_backend: backend for live and historical state reads, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
+        :param price_epoch: price epoch deciding when oracle prices are re-read, defaults to None (read on every conversion)
+        :type price_epoch: :class:`PriceEpoch`, optional
         """
         historical_indexer_client = IndexerClient(
             "",
@@ -1215,11 +1791,24 @@ class AlgofiTestnetClient(Client):
             historical_indexer_client=historical_indexer_client,
             user_address=user_address,
             chain="testnet",
+            lazy=lazy,
+            max_workers=max_workers,
+            state_backend=state_backend,
+            price_epoch=price_epoch,
         )
 
 
 class AlgofiMainnetClient(Client):
-    def __init__(self, algod_client=None, indexer_client=None, user_address=None):
+    def __init__(
+        self,
+        algod_client=None,
+        indexer_client=None,
+        user_address=None,
+        lazy=False,
+        max_workers=None,
+        state_backend=None,
+        price_epoch=None,
+    ):
         """Constructor method for the mainnet generic client.
 
         :param algod_client: a :class:`AlgodClient` for interacting with the network
@@ -1228,6 +1817,14 @@ class AlgofiMainnetClient(Client):
         :type indexer_client: :class:`IndexerClient`
         :param user_address: address of the user
         :type user_address: string
+        :param lazy: defer network reads until fields are first accessed, defaults to False
+        :type lazy: bool, optional
+        :param max_workers: number of concurrent indexer requests used on construction, defaults to None (sequential)
+        :type max_workers: int, optional
+        :param state_backend: backend for live and historical state reads, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
+        :param price_epoch: price epoch deciding when oracle prices are re-read, defaults to None (read on every conversion)
+        :type price_epoch: :class:`PriceEpoch`, optional
         """
         historical_indexer_client = IndexerClient(
             "", "https://indexer.algoexplorerapi.io/", headers={"User-Agent": "algosdk"}
@@ -1248,4 +1845,8 @@ class AlgofiMainnetClient(Client):
             historical_indexer_client=historical_indexer_client,
             user_address=user_address,
             chain="mainnet",
+            lazy=lazy,
+            max_workers=max_workers,
+            state_backend=state_backend,
+            price_epoch=price_epoch,
         )
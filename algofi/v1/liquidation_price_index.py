@@ -0,0 +1,205 @@
+from .position_table import require_numpy
+
+# numpy is an optional dependency, install with `pip install algofi-py-sdk[numpy]`
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class LiquidationPriceIndex:
+    def __init__(self, table):
+        """Constructor method for an index of the oracle price at which each account of a :class:`PositionTable`
+        becomes, or stops being, liquidatable, holding the other oracle prices fixed. The borrow in excess of the
+        max borrow of an account is linear in each oracle price, so it crosses zero at one threshold per oracle.
+        Thresholds are kept in sorted arrays per oracle and the accounts crossing when an oracle moves are found
+        by binary search. The index is built against the snapshot of table at construction and is stale once
+        :meth:`PositionTable.set_snapshot` revalues the table, build a new index then. Requires numpy.
+
+        :param table: position table, valued with the collateral factors and bank to underlying exchange rates of its snapshot
+        :type table: :class:`PositionTable`
+        """
+        require_numpy()
+        self.table = table
+        snapshot = table.snapshot
+        symbols = table.get_symbols()
+        assets = [snapshot.get_asset(symbol) for symbol in symbols]
+        self.oracle_app_ids = list(
+            dict.fromkeys(asset.get_oracle_app_id() for asset in assets)
+        )
+        self.raw_prices = {}
+        for asset in assets:
+            self.raw_prices[asset.get_oracle_app_id()] = asset.get_raw_price()
+
+        # usd value of one underlying base unit per unit of raw oracle price, the dollarized price being
+        # raw price * 10 ** decimals / (scale factor * 1e3), defined for oracles reporting a zero price too
+        usd_per_raw_unit = np.array(
+            [1 / (asset.get_oracle_price_scale_factor() * 1e3) for asset in assets],
+            dtype=np.float64,
+        )
+        # usd of borrow minus usd of max borrow per unit of usd price, per account and market
+        net_exposure = (
+            table.borrow_underlying
+            - table.active_collateral_underlying * table.collateral_factors
+        ) * usd_per_raw_unit
+
+        # only accounts with borrows can be liquidated
+        self.rows = np.flatnonzero(table.borrow_underlying.sum(axis=1) > 0)
+        self.slopes = {}
+        for oracle_app_id in self.oracle_app_ids:
+            columns = [
+                index
+                for index, asset in enumerate(assets)
+                if asset.get_oracle_app_id() == oracle_app_id
+            ]
+            self.slopes[oracle_app_id] = net_exposure[self.rows][:, columns].sum(axis=1)
+        self.excess = np.zeros(len(self.rows), dtype=np.float64)
+        for oracle_app_id in self.oracle_app_ids:
+            self.excess += self.slopes[oracle_app_id] * self.raw_prices[oracle_app_id]
+
+        # sorted thresholds per oracle, rebuilt when another oracle has moved
+        self.thresholds = {}
+
+    def _get_thresholds(self, oracle_app_id):
+        if oracle_app_id not in self.thresholds:
+            slope = self.slopes[oracle_app_id]
+            rest = self.excess - slope * self.raw_prices[oracle_app_id]
+            thresholds = {}
+            # "up": liquidatable above the threshold, "down": liquidatable below it
+            for direction, mask in (("up", slope > 0), ("down", slope < 0)):
+                indexes = np.flatnonzero(mask)
+                values = -rest[indexes] / slope[indexes]
+                order = np.argsort(values, kind="stable")
+                thresholds[direction] = (values[order], indexes[order])
+            self.thresholds[oracle_app_id] = thresholds
+        return self.thresholds[oracle_app_id]
+
+    def get_oracle_app_ids(self):
+        """Returns the indexed oracle app ids
+
+        :return: oracle app ids
+        :rtype: list
+        """
+        return self.oracle_app_ids
+
+    def get_raw_prices(self):
+        """Returns the raw oracle prices the thresholds are computed against
+
+        :return: dictionary of int prices by oracle app id
+        :rtype: dict
+        """
+        return dict(self.raw_prices)
+
+    def get_thresholds(self, oracle_app_id):
+        """Returns the sorted raw prices of oracle_app_id at which accounts become liquidatable
+
+        :param oracle_app_id: oracle app id
+        :type oracle_app_id: int
+        :return: dict with "up" and "down" lists of (raw price, storage address), liquidatable above and below the price
+        :rtype: dict
+        """
+        addresses = self.table.get_storage_addresses()
+        return {
+            direction: [
+                (float(value), addresses[self.rows[index]])
+                for value, index in zip(values, indexes)
+            ]
+            for direction, (values, indexes) in self._get_thresholds(
+                oracle_app_id
+            ).items()
+        }
+
+    def get_crossings(self, oracle_app_id, old_raw_price, new_raw_price):
+        """Returns the accounts whose liquidation threshold for oracle_app_id lies between old_raw_price and
+        new_raw_price, in O(log n) plus the number of accounts returned. The other oracle prices are those of
+        :meth:`get_raw_prices`.
+
+        :param oracle_app_id: oracle app id
+        :type oracle_app_id: int
+        :param old_raw_price: raw oracle price before the move
+        :type old_raw_price: int
+        :param new_raw_price: raw oracle price after the move
+        :type new_raw_price: int
+        :return: dict with lists of storage addresses "liquidatable", which become liquidatable, and "recovered", which stop being liquidatable
+        :rtype: dict
+        """
+        thresholds = self._get_thresholds(oracle_app_id)
+        up_values, up_indexes = thresholds["up"]
+        down_values, down_indexes = thresholds["down"]
+        if new_raw_price >= old_raw_price:
+            # excess > 0 is strict, above a threshold t means price > t
+            liquidatable = up_indexes[
+                np.searchsorted(up_values, old_raw_price, "left") : np.searchsorted(
+                    up_values, new_raw_price, "left"
+                )
+            ]
+            recovered = down_indexes[
+                np.searchsorted(down_values, old_raw_price, "right") : np.searchsorted(
+                    down_values, new_raw_price, "right"
+                )
+            ]
+        else:
+            liquidatable = down_indexes[
+                np.searchsorted(down_values, new_raw_price, "right") : np.searchsorted(
+                    down_values, old_raw_price, "right"
+                )
+            ]
+            recovered = up_indexes[
+                np.searchsorted(up_values, new_raw_price, "left") : np.searchsorted(
+                    up_values, old_raw_price, "left"
+                )
+            ]
+        addresses = self.table.get_storage_addresses()
+        return {
+            "liquidatable": [addresses[self.rows[index]] for index in liquidatable],
+            "recovered": [addresses[self.rows[index]] for index in recovered],
+        }
+
+    def set_raw_price(self, oracle_app_id, raw_price):
+        """Moves one oracle price without querying crossings. The thresholds of the other oracles are rebuilt when
+        next queried.
+
+        :param oracle_app_id: oracle app id
+        :type oracle_app_id: int
+        :param raw_price: raw oracle price
+        :type raw_price: int
+        """
+        old_raw_price = self.raw_prices[oracle_app_id]
+        if raw_price == old_raw_price:
+            return
+        self.excess += self.slopes[oracle_app_id] * (raw_price - old_raw_price)
+        self.raw_prices[oracle_app_id] = raw_price
+        # the thresholds of the moved oracle do not depend on its own price
+        self.thresholds = {
+            app_id: thresholds
+            for app_id, thresholds in self.thresholds.items()
+            if app_id == oracle_app_id
+        }
+
+    def move(self, oracle_app_id, raw_price):
+        """Moves one oracle price and returns the accounts crossing a liquidation threshold, see
+        :meth:`get_crossings`
+
+        :param oracle_app_id: oracle app id
+        :type oracle_app_id: int
+        :param raw_price: new raw oracle price
+        :type raw_price: int
+        :return: dict with lists of storage addresses "liquidatable" and "recovered"
+        :rtype: dict
+        """
+        crossings = self.get_crossings(
+            oracle_app_id, self.raw_prices[oracle_app_id], raw_price
+        )
+        self.set_raw_price(oracle_app_id, raw_price)
+        return crossings
+
+    def get_liquidatable(self):
+        """Returns every account liquidatable at the current raw prices
+
+        :return: list of storage addresses
+        :rtype: list
+        """
+        addresses = self.table.get_storage_addresses()
+        return [
+            addresses[self.rows[index]] for index in np.flatnonzero(self.excess > 0)
+        ]
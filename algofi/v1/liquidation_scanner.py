@@ -0,0 +1,415 @@
+import heapq
+from threading import Lock
+from ..utils import concurrent_map, PARAMETER_SCALE_FACTOR
+from ..contract_strings import algofi_market_strings as market_strings
+from .records import AccountHealth, compute_borrow_utilization
+
+
+class LiquidationScanner:
+    def __init__(self, client, snapshot=None, positions=None):
+        """Constructor method for a scanner which keeps every borrowing storage account in a priority queue ordered
+        by borrow utilization. Accounts are loaded once, then revalued incrementally: a price change only revalues
+        the accounts exposed to that asset, an account change only that account.
+
+        :param client: client to read accounts and prices with
+        :type client: :class:`Client`
+        :param snapshot: snapshot of the market state and prices to value positions against, defaults to None (take one)
+        :type snapshot: :class:`ProtocolSnapshot`, optional
+        :param positions: (storage_address, :class:`UserPosition`) tuples computed against snapshot, defaults to None (scan every storage account)
+        :type positions: iterable, optional
+        """
+
+        self.client = client
+        self.lock = Lock()
+        if snapshot is None:
+            snapshot = client.snapshot()
+        if positions is None:
+            positions = client.scan_storage_positions(
+                include_manager=False, snapshot=snapshot
+            )
+        self.positions = {}
+        # tracked accounts whose last read failed, read again on the next process_update
+        self.unread = set()
+        self.set_snapshot(snapshot, positions=positions)
+
+    def set_snapshot(self, snapshot, positions=None):
+        """Revalues every account against the market state and prices of snapshot and rebuilds the queue
+
+        :param snapshot: snapshot to value positions against
+        :type snapshot: :class:`ProtocolSnapshot`
+        :param positions: (storage_address, :class:`UserPosition`) tuples computed against snapshot, defaults to None (recompute the loaded positions)
+        :type positions: iterable, optional
+        """
+        symbols = snapshot.get_active_symbols()
+        markets = {symbol: snapshot.get_market(symbol) for symbol in symbols}
+        if positions is None:
+            positions = [
+                (storage_address, self._recompute_position(snapshot, position))
+                for storage_address, position in self.positions.items()
+            ]
+        with self.lock:
+            self.snapshot = snapshot
+            self.oracle_symbols = {}
+            for symbol, market in markets.items():
+                self.oracle_symbols.setdefault(
+                    market.get_asset().get_oracle_app_id(), []
+                ).append(symbol)
+            self.prices = {
+                symbol: market.get_asset().get_price()
+                for symbol, market in markets.items()
+            }
+            self.decimal_scales = {
+                symbol: 10 ** market.get_asset().get_underlying_decimals()
+                for symbol, market in markets.items()
+            }
+            self.collateral_factors = {
+                symbol: market.get_collateral_factor() / PARAMETER_SCALE_FACTOR
+                for symbol, market in markets.items()
+            }
+            self.usd_per_unit = {
+                symbol: self.prices[symbol] / self.decimal_scales[symbol]
+                for symbol in symbols
+            }
+            self.positions = {}
+            self.exposures = {symbol: set() for symbol in symbols}
+            self.versions = {}
+            self.utilizations = {}
+            self.heap = []
+            for storage_address, position in positions:
+                self._set_position(storage_address, position)
+
+    def _recompute_position(self, snapshot, position):
+        # a market position keeps the raw balances, underlying and usd values follow the snapshot
+        user_states = {
+            symbol: {
+                market_strings.user_active_collateral: market_position.active_collateral_bank,
+                market_strings.user_borrow_shares: market_position.borrow_shares,
+            }
+            for symbol, market_position in zip(position.symbols, position.positions)
+        }
+        return type(position)(
+            position.storage_address,
+            position.manager,
+            snapshot.active_symbols,
+            tuple(
+                snapshot.get_market(symbol).compute_position(
+                    user_states.get(symbol, {})
+                )
+                for symbol in snapshot.active_symbols
+            ),
+        )
+
+    def _value(self, position):
+        max_borrow_usd = 0.0
+        borrow_usd = 0.0
+        for symbol, market_position in zip(position.symbols, position.positions):
+            usd_per_unit = self.usd_per_unit[symbol]
+            max_borrow_usd += (
+                market_position.active_collateral_underlying
+                * usd_per_unit
+                * self.collateral_factors[symbol]
+            )
+            borrow_usd += market_position.borrow_underlying * usd_per_unit
+        return max_borrow_usd, borrow_usd
+
+    def _push(self, storage_address):
+        # entries of earlier versions stay in the heap and are skipped when popped
+        max_borrow_usd, borrow_usd = self._value(self.positions[storage_address])
+        utilization = compute_borrow_utilization(borrow_usd, max_borrow_usd)
+        version = self.versions.get(storage_address, 0) + 1
+        self.versions[storage_address] = version
+        self.utilizations[storage_address] = utilization
+        heapq.heappush(self.heap, (-utilization, version, storage_address))
+
+    def _set_position(self, storage_address, position):
+        previous = self.positions.get(storage_address, None)
+        if previous is not None:
+            for symbol in previous.symbols:
+                self.exposures[symbol].discard(storage_address)
+        self.positions[storage_address] = position
+        if not any(
+            market_position.borrow_shares > 0 for market_position in position.positions
+        ):
+            # accounts without borrows cannot be liquidated, they are tracked but not queued
+            self.versions[storage_address] = self.versions.get(storage_address, 0) + 1
+            self.utilizations.pop(storage_address, None)
+            return
+        for symbol, market_position in zip(position.symbols, position.positions):
+            if (
+                market_position.active_collateral_bank > 0
+                or market_position.borrow_shares > 0
+            ):
+                self.exposures[symbol].add(storage_address)
+        self._push(storage_address)
+
+    def _compact(self):
+        # rebuild once stale entries outnumber queued accounts
+        if len(self.heap) > 2 * len(self.utilizations) + 64:
+            self.heap = [
+                (-utilization, self.versions[storage_address], storage_address)
+                for storage_address, utilization in self.utilizations.items()
+            ]
+            heapq.heapify(self.heap)
+
+    # GETTERS
+
+    def get_snapshot(self):
+        """Returns the snapshot positions are valued against
+
+        :return: protocol snapshot
+        :rtype: :class:`ProtocolSnapshot`
+        """
+        return self.snapshot
+
+    def get_prices(self):
+        """Returns the dollarized prices positions are valued at
+
+        :return: dictionary of float prices
+        :rtype: dict
+        """
+        return dict(self.prices)
+
+    def get_account_count(self):
+        """Returns the number of tracked storage accounts
+
+        :return: number of accounts
+        :rtype: int
+        """
+        return len(self.positions)
+
+    def get_queued_count(self):
+        """Returns the number of borrowing storage accounts in the queue
+
+        :return: number of accounts
+        :rtype: int
+        """
+        return len(self.utilizations)
+
+    def get_unread(self):
+        """Returns the tracked storage accounts whose last read failed, valued at their previous position
+
+        :return: storage addresses
+        :rtype: set
+        """
+        with self.lock:
+            return set(self.unread)
+
+    def _get_health(self, storage_address):
+        # callers hold the lock
+        position = self.positions[storage_address]
+        max_borrow_usd, borrow_usd = self._value(position)
+        collateral = sorted(
+            (
+                (
+                    market_position.active_collateral_underlying
+                    * self.usd_per_unit[symbol],
+                    symbol,
+                )
+                for symbol, market_position in zip(position.symbols, position.positions)
+                if market_position.active_collateral_bank > 0
+            ),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        return AccountHealth(
+            storage_address,
+            max_borrow_usd,
+            borrow_usd,
+            compute_borrow_utilization(borrow_usd, max_borrow_usd),
+            max(borrow_usd - max_borrow_usd, 0),
+            tuple(symbol for _, symbol in collateral),
+            tuple(
+                symbol
+                for symbol, market_position in zip(position.symbols, position.positions)
+                if market_position.borrow_shares > 0
+            ),
+            self.snapshot.get_round(),
+        )
+
+    def get_health(self, storage_address):
+        """Returns the health of a tracked storage account at the current prices
+
+        :param storage_address: storage address
+        :type storage_address: string
+        :return: account health
+        :rtype: :class:`AccountHealth`
+        """
+        with self.lock:
+            return self._get_health(storage_address)
+
+    def top_candidates(self, k):
+        """Returns the k storage accounts with the highest borrow utilization, highest first, in O(k log n)
+
+        :param k: number of accounts
+        :type k: int
+        :return: list of account health
+        :rtype: list
+        """
+        with self.lock:
+            entries = []
+            while self.heap and len(entries) < k:
+                entry = heapq.heappop(self.heap)
+                _, version, storage_address = entry
+                if self.versions.get(storage_address) != version:
+                    continue
+                if storage_address not in self.utilizations:
+                    continue
+                entries.append(entry)
+            for entry in entries:
+                heapq.heappush(self.heap, entry)
+            # valued under the same lock, so the order and the healths agree
+            return [
+                self._get_health(storage_address) for _, _, storage_address in entries
+            ]
+
+    def get_liquidatable(self, limit=None):
+        """Returns the storage accounts whose borrow exceeds their max borrow at the current prices, highest
+        borrow utilization first
+
+        :param limit: maximum number of accounts, defaults to None (all)
+        :type limit: int, optional
+        :return: list of account health
+        :rtype: list
+        """
+        k = 16
+        while True:
+            candidates = self.top_candidates(k if limit is None else min(k, limit))
+            liquidatable = [health for health in candidates if health.is_liquidatable()]
+            if (
+                len(liquidatable) < len(candidates)
+                or len(candidates) < k
+                or (limit is not None and len(candidates) >= limit)
+            ):
+                return liquidatable
+            k *= 2
+
+    # UPDATES
+
+    def update_prices(self, prices):
+        """Sets the dollarized price of one or more assets and revalues only the accounts exposed to an asset whose
+        price changed
+
+        :param prices: dictionary of float prices by symbol
+        :type prices: dict
+        :return: number of accounts revalued
+        :rtype: int
+        """
+        with self.lock:
+            affected = set()
+            for symbol, price in prices.items():
+                if symbol not in self.prices or self.prices[symbol] == price:
+                    continue
+                self.prices[symbol] = price
+                self.usd_per_unit[symbol] = price / self.decimal_scales[symbol]
+                affected |= self.exposures[symbol]
+            for storage_address in affected:
+                self._push(storage_address)
+            self._compact()
+            return len(affected)
+
+    def refresh_prices(self, max_workers=None):
+        """Reads every price in one pass, see :meth:`Client.refresh_prices`, and revalues the exposed accounts
+
+        :param max_workers: maximum number of concurrent oracle reads, defaults to the client max_workers
+        :type max_workers: int, optional
+        :return: number of accounts revalued
+        :rtype: int
+        """
+        price_map = self.client.refresh_prices(max_workers=max_workers)
+        return self.update_prices(price_map.get_prices())
+
+    def update_position(self, position):
+        """Replaces the position of one storage account, e.g. after it was read again
+
+        :param position: position computed against the scanner snapshot
+        :type position: :class:`UserPosition`
+        """
+        with self.lock:
+            self._set_position(position.storage_address, position)
+            self._compact()
+
+    def remove_account(self, storage_address):
+        """Stops tracking a storage account
+
+        :param storage_address: storage address
+        :type storage_address: string
+        """
+        with self.lock:
+            position = self.positions.pop(storage_address, None)
+            if position is None:
+                return
+            for symbol in position.symbols:
+                self.exposures[symbol].discard(storage_address)
+            self.versions.pop(storage_address, None)
+            self.utilizations.pop(storage_address, None)
+            self.unread.discard(storage_address)
+
+    def refresh_accounts(self, storage_addresses, max_workers=None):
+        """Reads the current state of storage accounts and updates their positions. An account whose read fails
+        keeps its previous position and is read again by the next :meth:`process_update`.
+
+        :param storage_addresses: storage addresses
+        :type storage_addresses: list
+        :param max_workers: maximum number of concurrent account reads, defaults to the client max_workers
+        :type max_workers: int, optional
+        :return: storage addresses which could not be read
+        :rtype: list
+        """
+        snapshot = self.snapshot
+
+        def read_position(storage_address):
+            try:
+                account_info = self.client.state_backend.read_account(storage_address)
+            except:
+                return storage_address, None
+            account_info.setdefault("address", storage_address)
+            return storage_address, snapshot.get_position(
+                account_info, include_manager=False
+            )
+
+        positions = concurrent_map(
+            read_position,
+            list(storage_addresses),
+            max_workers if max_workers else self.client.max_workers,
+        )
+        failed = []
+        for storage_address, position in positions:
+            if position is None:
+                failed.append(storage_address)
+                continue
+            self.update_position(position)
+            with self.lock:
+                self.unread.discard(storage_address)
+        if failed:
+            with self.lock:
+                self.unread.update(
+                    address for address in failed if address in self.positions
+                )
+        return failed
+
+    def process_update(self, update):
+        """Applies one :class:`BlockFollower` update, and can be passed as its callback. Prices of oracles called in
+        the round are taken from the client assets the follower just refreshed, tracked accounts referenced in the
+        round are read again, along with accounts whose last read failed. Accounts which opted in after the scan
+        are only picked up by :meth:`refresh_accounts` or a new scanner.
+
+        :param update: update dict of one processed round
+        :type update: dict
+        :return: number of accounts revalued for the price changes
+        :rtype: int
+        """
+        prices = {}
+        for app_id in update["app_ids"]:
+            for symbol in self.oracle_symbols.get(app_id, []):
+                prices[symbol] = (
+                    self.client.get_market(symbol).get_asset().get_price(update=False)
+                )
+        revalued = self.update_prices(prices) if prices else 0
+        with self.lock:
+            touched = [
+                address for address in update["addresses"] if address in self.positions
+            ]
+            touched.extend(self.unread.difference(touched))
+        if touched:
+            self.refresh_accounts(touched)
+        return revalued
@@ -0,0 +1,335 @@
+import base64
+from collections import OrderedDict
+from copy import copy
+from random import randint
+from threading import Lock
+import msgpack
+from algosdk import constants, encoding
+from algosdk.transaction import PaymentTxn
+from ..utils import TransactionGroup
+from .liquidate import prepare_liquidate_transactions
+
+# index of the repay transaction in a liquidate group, after the 12 init transactions and txn0, txn1
+LIQUIDATE_AMOUNT_TXN_INDEX = 14
+# rounds a built group stays valid for when no last valid round is given, as in algod suggested params
+DEFAULT_LIQUIDATION_VALIDITY_WINDOW = 1000
+DEFAULT_LIQUIDATION_TEMPLATE_CACHE_SIZE = 256
+
+
+class LiquidationTemplate:
+    def __init__(
+        self, target_storage_address, borrow_symbol, collateral_symbol, transactions
+    ):
+        """Constructor method for a pre-built liquidate group. Everything but the repay amount, the valid rounds,
+        the group id and the init transaction note is fixed when the template is built.
+
+        :param target_storage_address: storage address to liquidate
+        :type target_storage_address: string
+        :param borrow_symbol: symbol to repay
+        :type borrow_symbol: string
+        :param collateral_symbol: symbol to sieze collateral from
+        :type collateral_symbol: string
+        :param transactions: unsigned transactions of a liquidate group, as returned by :func:`prepare_liquidate_transactions`
+        :type transactions: list
+        """
+
+        self.target_storage_address = target_storage_address
+        self.borrow_symbol = borrow_symbol
+        self.collateral_symbol = collateral_symbol
+        self.transactions = [copy(txn) for txn in transactions]
+        for txn in self.transactions:
+            txn.group = None
+        # ALGO is repaid with a payment, every other asset with an asset transfer
+        if isinstance(self.transactions[LIQUIDATE_AMOUNT_TXN_INDEX], PaymentTxn):
+            self.amount_attribute, self.amount_key = "amt", "amt"
+        else:
+            self.amount_attribute, self.amount_key = "amount", "aamt"
+        # canonical msgpack fields of each transaction without the patched ones, so that the group id is
+        # calculated without encoding every address again
+        self.fields = []
+        for txn in self.transactions:
+            fields = msgpack.unpackb(
+                base64.b64decode(encoding.msgpack_encode(txn)), raw=False
+            )
+            for key in ("fv", "lv", "note", self.amount_key):
+                fields.pop(key, None)
+            self.fields.append(fields)
+
+    def get_key(self):
+        """Returns the (target storage address, borrow symbol, collateral symbol) the template liquidates
+
+        :return: template key
+        :rtype: tuple
+        """
+        return (self.target_storage_address, self.borrow_symbol, self.collateral_symbol)
+
+    def build(self, amount, first_valid_round, last_valid_round=None):
+        """Returns the liquidate group for amount, valid from first_valid_round. Makes no network reads.
+
+        :param amount: amount to repay
+        :type amount: int
+        :param first_valid_round: first round the group is valid in
+        :type first_valid_round: int
+        :param last_valid_round: last round the group is valid in, defaults to None (first_valid_round + DEFAULT_LIQUIDATION_VALIDITY_WINDOW)
+        :type last_valid_round: int, optional
+        :return: liquidate transaction group
+        :rtype: :class:`TransactionGroup`
+        """
+        if last_valid_round is None:
+            last_valid_round = first_valid_round + DEFAULT_LIQUIDATION_VALIDITY_WINDOW
+        # the init transaction note keeps otherwise identical groups distinct, as in get_init_txns
+        note = randint(0, 1000000).to_bytes(8, "big")
+        transactions = []
+        txids = []
+        for index, (template_txn, fields) in enumerate(
+            zip(self.transactions, self.fields)
+        ):
+            txn = copy(template_txn)
+            txn.first_valid_round = first_valid_round
+            txn.last_valid_round = last_valid_round
+            fields = dict(fields, fv=first_valid_round, lv=last_valid_round)
+            if index == 0:
+                txn.note = note
+                fields["note"] = note
+            elif index == LIQUIDATE_AMOUNT_TXN_INDEX:
+                setattr(txn, self.amount_attribute, amount)
+                # canonical msgpack omits zero values
+                if amount:
+                    fields[self.amount_key] = amount
+            transactions.append(txn)
+            txids.append(
+                encoding.checksum(
+                    constants.txid_prefix
+                    + msgpack.packb(dict(sorted(fields.items())), use_bin_type=True)
+                )
+            )
+        group_id = encoding.checksum(
+            constants.tgid_prefix + msgpack.packb({"txlist": txids}, use_bin_type=True)
+        )
+        return TransactionGroup(transactions, group_id=group_id)
+
+
+class LiquidationTemplateCache:
+    def __init__(
+        self, client, address=None, max_size=DEFAULT_LIQUIDATION_TEMPLATE_CACHE_SIZE
+    ):
+        """Constructor method for a cache of :class:`LiquidationTemplate`, pre-built for the accounts closest to
+        liquidation so that the group sent when one becomes liquidatable is patched instead of built. The
+        suggested params, the liquidator storage address and the market and oracle app ids are read once, call
+        :meth:`refresh` after the active markets change. Least recently used templates are evicted beyond
+        max_size.
+
+        :param client: client of the markets to liquidate in
+        :type client: :class:`Client`
+        :param address: address to send liquidate transaction groups from, defaults to the client user address
+        :type address: string, optional
+        :param max_size: maximum number of templates, defaults to DEFAULT_LIQUIDATION_TEMPLATE_CACHE_SIZE
+        :type max_size: int, optional
+        """
+
+        self.client = client
+        self.address = address if address else client.user_address
+        self.max_size = max_size
+        self.lock = Lock()
+        self.templates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.refresh()
+
+    def refresh(self):
+        """Reads the suggested params, the liquidator storage address and the active market and oracle app ids
+        again and drops every template built with the previous ones
+        """
+        params = self.client.get_default_params()
+        storage_address = self.client.manager.get_storage_address(self.address)
+        market_app_ids = self.client.get_active_market_app_ids()
+        oracle_app_ids = self.client.get_active_oracle_app_ids()
+        with self.lock:
+            self.params = params
+            self.storage_address = storage_address
+            self.market_app_ids = market_app_ids
+            self.oracle_app_ids = oracle_app_ids
+            self.templates.clear()
+
+    def _build_template(self, target_storage_address, borrow_symbol, collateral_symbol):
+        borrow_market = self.client.get_market(borrow_symbol)
+        collateral_market = self.client.get_market(collateral_symbol)
+        group = prepare_liquidate_transactions(
+            self.address,
+            self.params,
+            self.storage_address,
+            target_storage_address,
+            0,
+            self.client.manager.get_manager_app_id(),
+            borrow_market.get_market_app_id(),
+            borrow_market.get_market_address(),
+            collateral_market.get_market_app_id(),
+            self.market_app_ids,
+            self.oracle_app_ids,
+            collateral_market.get_asset().get_bank_asset_id(),
+            borrow_market.get_asset().get_underlying_asset_id()
+            if borrow_symbol != "ALGO"
+            else None,
+            liquidate_update_fee=3000 if collateral_symbol == "vALGO" else 1000,
+        )
+        return LiquidationTemplate(
+            target_storage_address,
+            borrow_symbol,
+            collateral_symbol,
+            group.transactions,
+        )
+
+    # GETTERS
+
+    def get_size(self):
+        """Returns the number of cached templates
+
+        :return: number of templates
+        :rtype: int
+        """
+        return len(self.templates)
+
+    def get_stats(self):
+        """Returns cache counters
+
+        :return: dict with size, hits and misses
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "size": len(self.templates),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def get_template(self, target_storage_address, borrow_symbol, collateral_symbol):
+        """Returns the cached template, None if it was not prepared or was evicted
+
+        :param target_storage_address: storage address to liquidate
+        :type target_storage_address: string
+        :param borrow_symbol: symbol to repay
+        :type borrow_symbol: string
+        :param collateral_symbol: symbol to sieze collateral from
+        :type collateral_symbol: string
+        :return: liquidate template
+        :rtype: :class:`LiquidationTemplate`
+        """
+        key = (target_storage_address, borrow_symbol, collateral_symbol)
+        with self.lock:
+            template = self.templates.get(key, None)
+            if template is not None:
+                self.templates.move_to_end(key)
+            return template
+
+    # PREPARATION
+
+    def prepare(self, target_storage_address, borrow_symbol, collateral_symbol):
+        """Builds and caches the template of one liquidation, unless it is cached
+
+        :param target_storage_address: storage address to liquidate
+        :type target_storage_address: string
+        :param borrow_symbol: symbol to repay
+        :type borrow_symbol: string
+        :param collateral_symbol: symbol to sieze collateral from
+        :type collateral_symbol: string
+        :return: liquidate template
+        :rtype: :class:`LiquidationTemplate`
+        """
+        template = self.get_template(
+            target_storage_address, borrow_symbol, collateral_symbol
+        )
+        if template is not None:
+            return template
+        template = self._build_template(
+            target_storage_address, borrow_symbol, collateral_symbol
+        )
+        with self.lock:
+            self.templates[template.get_key()] = template
+            while len(self.templates) > self.max_size:
+                self.templates.popitem(last=False)
+        return template
+
+    def prepare_candidates(self, healths, max_collateral_symbols=1):
+        """Prepares the templates of at-risk accounts, e.g. from :meth:`LiquidationScanner.top_candidates`: one per
+        borrowed symbol and each of the max_collateral_symbols largest collateral symbols of an account. Accounts
+        are prepared in the order given, so that the riskiest stay cached when max_size is reached.
+
+        :param healths: account health of the accounts to prepare, riskiest first
+        :type healths: list
+        :param max_collateral_symbols: number of collateral symbols per account, defaults to 1
+        :type max_collateral_symbols: int, optional
+        :return: number of templates prepared
+        :rtype: int
+        """
+        keys = [
+            (health.get_storage_address(), borrow_symbol, collateral_symbol)
+            for health in healths
+            for borrow_symbol in health.borrowed_symbols
+            for collateral_symbol in health.get_seizable_symbols()[
+                :max_collateral_symbols
+            ]
+        ]
+        # prepare the least risky first so the riskiest are the most recently used
+        for key in reversed(keys[: self.max_size]):
+            self.prepare(*key)
+        return min(len(keys), self.max_size)
+
+    def prepare_top(self, scanner, n, max_collateral_symbols=1):
+        """Prepares the templates of the n accounts with the highest borrow utilization of scanner, see
+        :meth:`prepare_candidates`
+
+        :param scanner: scanner of the accounts to liquidate
+        :type scanner: :class:`LiquidationScanner`
+        :param n: number of accounts
+        :type n: int
+        :param max_collateral_symbols: number of collateral symbols per account, defaults to 1
+        :type max_collateral_symbols: int, optional
+        :return: number of templates prepared
+        :rtype: int
+        """
+        return self.prepare_candidates(
+            scanner.top_candidates(n), max_collateral_symbols=max_collateral_symbols
+        )
+
+    # BUILD
+
+    def build(
+        self,
+        target_storage_address,
+        borrow_symbol,
+        amount,
+        collateral_symbol,
+        first_valid_round,
+        last_valid_round=None,
+    ):
+        """Returns a liquidate transaction group, patched from the cached template, or built into the cache on a
+        miss. Arguments are in the order of :meth:`Client.prepare_liquidate_transactions`.
+
+        :param target_storage_address: storage address to liquidate
+        :type target_storage_address: string
+        :param borrow_symbol: symbol to repay
+        :type borrow_symbol: string
+        :param amount: amount to repay
+        :type amount: int
+        :param collateral_symbol: symbol to sieze collateral from
+        :type collateral_symbol: string
+        :param first_valid_round: first round the group is valid in
+        :type first_valid_round: int
+        :param last_valid_round: last round the group is valid in, defaults to None (first_valid_round + DEFAULT_LIQUIDATION_VALIDITY_WINDOW)
+        :type last_valid_round: int, optional
+        :return: liquidate transaction group
+        :rtype: :class:`TransactionGroup`
+        """
+        template = self.get_template(
+            target_storage_address, borrow_symbol, collateral_symbol
+        )
+        with self.lock:
+            if template is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if template is None:
+            template = self.prepare(
+                target_storage_address, borrow_symbol, collateral_symbol
+            )
+        return template.build(amount, first_valid_round, last_valid_round)
@@ -7,11 +7,13 @@ from ..utils import (
     read_local_state,
     read_global_state,
     get_global_state_field,
+    get_state_backend,
     SCALE_FACTOR,
 )
 from ..contract_strings import algofi_manager_strings as manager_strings
 from ..contract_strings import algofi_market_strings as market_strings
 from .rewards_program import RewardsProgram
+from .records import ManagerStorageState
 
 
 class Manager:
@@ -20,6 +22,9 @@ class Manager:
         indexer_client: IndexerClient,
         historical_indexer_client: IndexerClient,
         manager_app_id,
+        lazy=False,
+        state_backend=None,
+        storage_address_cache=None,
     ):
         """Constructor method for manager object.
 
@@ -29,16 +34,40 @@ class Manager:
         :type historical_indexer_client: :class:`IndexerClient`
         :param manager_app_id: manager app id
         :type manager_app_id: int
+        :param lazy: defer the global state read until a field is first accessed, defaults to False
+        :type lazy: bool, optional
+        :param state_backend: backend for live and historical state reads, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
+        :param storage_address_cache: cache of user to storage address, defaults to None
+        :type storage_address_cache: :class:`StorageAddressCache`, optional
         """
 
         self.indexer = indexer_client
         self.historical_indexer = historical_indexer_client
+        self.state_backend = get_state_backend(
+            indexer_client, historical_indexer_client, state_backend
+        )
+        self.lazy = lazy
+        self.storage_address_cache = storage_address_cache
 
         self.manager_app_id = manager_app_id
         self.manager_address = logic.get_application_address(self.manager_app_id)
 
         # read market global state
-        self.update_global_state()
+        if not lazy:
+            self.update_global_state()
+
+    def __getattr__(self, name):
+        """Hydrates lazily loaded fields on first access. Only called for attributes
+        which have not been set yet.
+        """
+        if name in ["rewards_program", "supported_market_count"]:
+            self.update_global_state()
+        else:
+            raise AttributeError(
+                "'%s' object has no attribute '%s'" % (type(self).__name__, name)
+            )
+        return self.__dict__[name]
 
     def update_global_state(self, block=None):
         """Method to fetch most recent manager global state.
@@ -46,12 +75,22 @@ class Manager:
         :param block: block at which to get historical data
         :type block: int, optional
         """
-        indexer_client = self.historical_indexer if block else self.indexer
         manager_state = read_global_state(
-            indexer_client, self.manager_app_id, block=block
+            self.state_backend, self.manager_app_id, block=block
         )
+        self.load_global_state(manager_state)
+
+    def load_global_state(self, manager_state):
+        """Method to set manager fields from an already fetched manager global state.
+
+        :param manager_state: dict of manager global state as returned by read_global_state
+        :type manager_state: dict
+        """
         self.rewards_program = RewardsProgram(
-            self.indexer, self.historical_indexer, manager_state
+            self.indexer,
+            self.historical_indexer,
+            manager_state,
+            state_backend=self.state_backend,
         )
         self.supported_market_count = manager_state.get(
             manager_strings.supported_market_count, None
@@ -93,7 +132,7 @@ class Manager:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.manager_app_id,
                 manager_strings.supported_market_count,
                 block=block,
@@ -103,23 +142,40 @@ class Manager:
 
     # USER FUNCTIONS
 
-    def get_storage_address(self, address):
-        """Returns the storage address for the client user
+    def get_storage_address(self, address, user_state=None):
+        """Returns the storage address for the client user. Served from the storage address cache when present.
 
         :param address: address to get info for
         :type address: string
+        :param user_state: already read manager local state of address, defaults to None (read it)
+        :type user_state: dict, optional
         :return: storage account address for user
         :rtype: string
         """
-        user_manager_state = read_local_state(
-            self.indexer, address, self.manager_app_id
+        if self.storage_address_cache is not None:
+            storage_address = self.storage_address_cache.get(
+                self.manager_app_id, address
+            )
+            if storage_address is not None:
+                return storage_address
+        user_manager_state = (
+            user_state
+            if user_state is not None
+            else read_local_state(self.state_backend, address, self.manager_app_id)
         )
         raw_storage_address = user_manager_state.get(
             manager_strings.user_storage_address, None
         )
         if not raw_storage_address:
             raise Exception("No storage address found")
-        return encoding.encode_address(base64.b64decode(raw_storage_address.strip()))
+        storage_address = encoding.encode_address(
+            base64.b64decode(raw_storage_address.strip())
+        )
+        if self.storage_address_cache is not None:
+            self.storage_address_cache.set(
+                self.manager_app_id, address, storage_address
+            )
+        return storage_address
 
     def get_user_state(self, address, block=None):
         """Returns the market local state for address.
@@ -134,28 +190,42 @@ class Manager:
         storage_address = self.get_storage_address(address)
         return self.get_storage_state(storage_address, block=block)
 
-    def get_storage_state(self, storage_address, block=None):
+    def get_storage_record(self, storage_address, block=None, user_state=None):
+        """Returns the manager local state record for storage address.
+
+        :param storage_address: storage_address to get info for
+        :type storage_address: string
+        :param block: block at which to get historical data
+        :type block: int, optional
+        :param user_state: already read manager local state of storage_address, defaults to None (read it)
+        :type user_state: dict, optional
+        :return: manager local state for address
+        :rtype: :class:`ManagerStorageState`
+        """
+        if user_state is None:
+            user_state = read_local_state(
+                self.state_backend, storage_address, self.manager_app_id, block=block
+            )
+        return ManagerStorageState(
+            user_state.get(manager_strings.user_global_max_borrow_in_dollars, 0),
+            user_state.get(manager_strings.user_global_borrowed_in_dollars, 0),
+        )
+
+    def get_storage_state(self, storage_address, block=None, user_state=None):
         """Returns the market local state for storage address.
 
         :param storage_address: storage_address to get info for
         :type storage_address: string
         :param block: block at which to get historical data
         :type block: int, optional
+        :param user_state: already read manager local state of storage_address, defaults to None (read it)
+        :type user_state: dict, optional
         :return: market local state for address
         :rtype: dict
         """
-        result = {}
-        indexer_client = self.historical_indexer if block else self.indexer
-        user_state = read_local_state(
-            indexer_client, storage_address, self.manager_app_id, block=block
-        )
-        result["user_global_max_borrow_in_dollars"] = user_state.get(
-            manager_strings.user_global_max_borrow_in_dollars, 0
-        )
-        result["user_global_borrowed_in_dollars"] = user_state.get(
-            manager_strings.user_global_borrowed_in_dollars, 0
-        )
-        return result
+        return self.get_storage_record(
+            storage_address, block=block, user_state=user_state
+        ).to_dict()
 
     def get_user_unrealized_rewards(self, address, markets):
         """Returns projected unrealized rewards for a user address
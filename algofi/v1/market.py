@@ -7,12 +7,21 @@ from ..utils import (
     read_local_state,
     read_global_state,
     get_global_state_field,
+    get_state_backend,
     SCALE_FACTOR,
     PARAMETER_SCALE_FACTOR,
 )
 from ..contract_strings import algofi_manager_strings as manager_strings
 from ..contract_strings import algofi_market_strings as market_strings
 from .asset import Asset
+from .metadata_cache import read_asset_params, read_created_at_round
+from .snapshot import make_market_snapshot
+from .records import MarketState, MarketPosition
+
+# attributes populated by Market.update_global_state, market state fields are read through Market.state
+GLOBAL_STATE_ATTRIBUTES = frozenset(MarketState.__slots__) | frozenset(
+    ["state", "asset"]
+)
 
 
 class Market:
@@ -21,6 +30,10 @@ class Market:
         indexer_client: IndexerClient,
         historical_indexer_client: IndexerClient,
         market_app_id,
+        lazy=False,
+        metadata_cache=None,
+        state_backend=None,
+        price_epoch=None,
     ):
         """Constructor method for the market object.
 
@@ -30,19 +43,54 @@ class Market:
         :type historical_indexer_client: :class:`IndexerClient`
         :param market_app_id: market app id
         :type market_app_id: int
+        :param lazy: defer all network reads until a field is first accessed, defaults to False
+        :type lazy: bool, optional
+        :param metadata_cache: cache of immutable market and asset metadata, defaults to None
+        :type metadata_cache: :class:`MetadataCache`, optional
+        :param state_backend: backend for live and historical state reads, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
+        :param price_epoch: epoch deciding when the oracle price of the market asset is re-read, defaults to None (read on every conversion)
+        :type price_epoch: :class:`PriceEpoch`, optional
         """
 
         self.indexer = indexer_client
         self.historical_indexer = historical_indexer_client
+        self.state_backend = get_state_backend(
+            indexer_client, historical_indexer_client, state_backend
+        )
+        self.lazy = lazy
+        self.metadata_cache = metadata_cache
+        self.price_epoch = price_epoch
 
         self.market_app_id = market_app_id
         self.market_address = logic.get_application_address(self.market_app_id)
-        self.created_at_round = self.indexer.applications(self.market_app_id)[
-            "application"
-        ].get("created-at-round")
 
-        # read market global state
-        self.update_global_state()
+        if not lazy:
+            self.created_at_round = self._read_created_at_round()
+            # read market global state
+            self.update_global_state()
+
+    def __getattr__(self, name):
+        """Hydrates lazily loaded fields on first access. Only called for attributes
+        which have not been set yet.
+        """
+        if name == "created_at_round":
+            self.created_at_round = self._read_created_at_round()
+        elif name in GLOBAL_STATE_ATTRIBUTES:
+            if "state" not in self.__dict__:
+                self.update_global_state()
+            if name in MarketState.__slots__:
+                return getattr(self.state, name)
+        else:
+            raise AttributeError(
+                "'%s' object has no attribute '%s'" % (type(self).__name__, name)
+            )
+        return self.__dict__[name]
+
+    def _read_created_at_round(self):
+        return read_created_at_round(
+            self.indexer, self.market_app_id, self.metadata_cache
+        )
 
     def update_global_state(self, block=None):
         """Method to fetch most recent market global state.
@@ -50,80 +98,49 @@ class Market:
         :param block: block at which to get historical data
         :type block: int, optional
         """
-        indexer_client = self.historical_indexer if block else self.indexer
         market_state = read_global_state(
-            indexer_client, self.market_app_id, block=block
-        )
-        # market constants
-        self.market_counter = market_state[market_strings.manager_market_counter_var]
-
-        # market asset info
-        self.underlying_asset_id = market_state.get(market_strings.asset_id, None)
-        self.bank_asset_id = market_state.get(market_strings.bank_asset_id, None)
-
-        # market parameters
-        self.oracle_app_id = market_state.get(market_strings.oracle_app_id, None)
-        self.oracle_price_field = market_state.get(
-            market_strings.oracle_price_field, None
-        )
-        self.oracle_price_scale_factor = market_state.get(
-            market_strings.oracle_price_scale_factor, None
-        )
-        self.collateral_factor = market_state.get(
-            market_strings.collateral_factor, None
-        )
-        self.liquidation_incentive = market_state.get(
-            market_strings.liquidation_incentive, None
-        )
-        self.reserve_factor = market_state.get(market_strings.reserve_factor, None)
-        self.base_interest_rate = market_state.get(
-            market_strings.base_interest_rate, None
-        )
-        self.slope_1 = market_state.get(market_strings.slope_1, None)
-        self.slope_2 = market_state.get(market_strings.slope_2, None)
-        self.utilization_optimal = market_state.get(
-            market_strings.utilization_optimal, None
-        )
-        self.market_supply_cap_in_dollars = market_state.get(
-            market_strings.market_supply_cap_in_dollars, None
-        )
-        self.market_borrow_cap_in_dollars = market_state.get(
-            market_strings.market_borrow_cap_in_dollars, None
+            self.state_backend, self.market_app_id, block=block
         )
+        self.load_global_state(market_state)
 
-        # balance info
-        self.active_collateral = market_state.get(market_strings.active_collateral, 0)
-        self.bank_circulation = market_state.get(market_strings.bank_circulation, 0)
-        self.bank_to_underlying_exchange = market_state.get(
-            market_strings.bank_to_underlying_exchange, 0
-        )
-        self.underlying_borrowed = market_state.get(
-            market_strings.underlying_borrowed, 0
-        )
-        self.outstanding_borrow_shares = market_state.get(
-            market_strings.outstanding_borrow_shares, 0
-        )
-        self.underlying_cash = market_state.get(market_strings.underlying_cash, 0)
-        self.underlying_reserves = market_state.get(
-            market_strings.underlying_reserves, 0
-        )
-        self.total_borrow_interest_rate = market_state.get(
-            market_strings.total_borrow_interest_rate, 0
-        )
+    def load_global_state(self, market_state):
+        """Method to set market fields from an already fetched market global state.
 
-        self.asset = (
-            Asset(
+        :param market_state: dict of market global state as returned by read_global_state
+        :type market_state: dict
+        """
+        # market constants, parameters and balances are held in one compact record
+        self.state = MarketState.from_global_state(market_state)
+        state = self.state
+
+        # asset metadata is immutable, so the asset is only built once and its oracle parameters kept current
+        asset = self.__dict__.get("asset", None)
+        if not state.underlying_asset_id:
+            self.asset = None
+        elif (
+            asset is not None
+            and asset.get_underlying_asset_id() == state.underlying_asset_id
+            and asset.get_bank_asset_id() == state.bank_asset_id
+        ):
+            asset.set_oracle_params(
+                state.oracle_app_id,
+                state.oracle_price_field,
+                state.oracle_price_scale_factor,
+            )
+        else:
+            self.asset = Asset(
                 self.indexer,
                 self.historical_indexer,
-                self.underlying_asset_id,
-                self.bank_asset_id,
-                self.oracle_app_id,
-                self.oracle_price_field,
-                self.oracle_price_scale_factor,
+                state.underlying_asset_id,
+                state.bank_asset_id,
+                state.oracle_app_id,
+                state.oracle_price_field,
+                state.oracle_price_scale_factor,
+                lazy=self.lazy,
+                metadata_cache=self.metadata_cache,
+                state_backend=self.state_backend,
+                price_epoch=self.price_epoch,
             )
-            if self.underlying_asset_id
-            else None
-        )
 
     # GETTERS
 
@@ -143,13 +160,29 @@ class Market:
         """
         return self.market_address
 
+    def get_created_at_round(self):
+        """Returns the round at which the market application was created
+
+        :return: created at round
+        :rtype: int
+        """
+        return self.created_at_round
+
+    def get_state(self):
+        """Returns the market global state record
+
+        :return: market state
+        :rtype: :class:`MarketState`
+        """
+        return self.state
+
     def get_market_counter(self):
         """Returns the market counter for this market
 
         :return: market counter
         :rtype: int
         """
-        return self.market_counter
+        return self.state.market_counter
 
     def get_asset(self):
         """Returns asset object for this market
@@ -169,13 +202,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.active_collateral,
                 block=block,
             )
         else:
-            return self.active_collateral
+            return self.state.active_collateral
 
     def get_bank_circulation(self, block=None):
         """Returns bank_circulation for this market
@@ -187,13 +220,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.bank_circulation,
                 block=block,
             )
         else:
-            return self.bank_circulation
+            return self.state.bank_circulation
 
     def get_bank_to_underlying_exchange(self, block=None):
         """Returns bank_to_underlying_exchange for this market
@@ -205,13 +238,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.bank_to_underlying_exchange,
                 block=block,
             )
         else:
-            return self.bank_to_underlying_exchange
+            return self.state.bank_to_underlying_exchange
 
     def get_underlying_borrowed(self, block=None):
         """Returns underlying_borrowed for this market
@@ -223,13 +256,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.underlying_borrowed,
                 block=block,
             )
         else:
-            return self.underlying_borrowed
+            return self.state.underlying_borrowed
 
     def get_outstanding_borrow_shares(self, block=None):
         """Returns outstanding_borrow_shares for this market
@@ -241,13 +274,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.outstanding_borrow_shares,
                 block=block,
             )
         else:
-            return self.outstanding_borrow_shares
+            return self.state.outstanding_borrow_shares
 
     def get_underlying_cash(self, block=None):
         """Returns underlying_cash for this market
@@ -259,13 +292,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.underlying_cash,
                 block=block,
             )
         else:
-            return self.underlying_cash
+            return self.state.underlying_cash
 
     def get_underlying_reserves(self, block=None):
         """Returns underlying_reserves for this market
@@ -277,13 +310,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.underlying_reserves,
                 block=block,
             )
         else:
-            return self.underlying_reserves
+            return self.state.underlying_reserves
 
     def get_underlying_supplied(self, block=None):
         """Returns underlying supplied = underlying_cash + underlying_borrowed - underlying_reserves for this market.
@@ -300,7 +333,7 @@ class Market:
             underlying_supplied += -int(1e18)
         if block:
             data = read_global_state(
-                self.historical_indexer, self.market_app_id, block=block
+                self.state_backend, self.market_app_id, block=block
             )
             underlying_supplied += (
                 data[market_strings.underlying_cash]
@@ -309,9 +342,9 @@ class Market:
             )
         else:
             underlying_supplied += (
-                self.underlying_cash
-                + self.underlying_borrowed
-                - self.underlying_reserves
+                self.state.underlying_cash
+                + self.state.underlying_borrowed
+                - self.state.underlying_reserves
             )
         return underlying_supplied
 
@@ -325,13 +358,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.total_borrow_interest_rate,
                 block=block,
             )
         else:
-            return self.total_borrow_interest_rate
+            return self.state.total_borrow_interest_rate
 
     def get_collateral_factor(self, block=None):
         """Returns collateral_factor for this market
@@ -343,13 +376,13 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.collateral_factor,
                 block=block,
             )
         else:
-            return self.collateral_factor
+            return self.state.collateral_factor
 
     def get_liquidation_incentive(self, block=None):
         """Returns liquidation_incentive for this market
@@ -361,65 +394,110 @@ class Market:
         """
         if block:
             return get_global_state_field(
-                self.historical_indexer,
+                self.state_backend,
                 self.market_app_id,
                 market_strings.liquidation_incentive,
                 block=block,
             )
         else:
-            return self.liquidation_incentive
+            return self.state.liquidation_incentive
+
+    def get_snapshot(self, block=None):
+        """Returns an immutable :class:`MarketSnapshot` of the market global state and oracle price read at block.
+        The market object itself is not modified, so snapshots of many blocks can be taken concurrently.
+
+        :param block: block at which to get historical data, defaults to None (current state)
+        :type block: int, optional
+        :return: market snapshot
+        :rtype: :class:`MarketSnapshot`
+        """
+        market_state = read_global_state(
+            self.state_backend, self.market_app_id, block=block
+        )
+        underlying_asset_id = market_state.get(market_strings.asset_id, None)
+        if not underlying_asset_id:
+            raise Exception("Market is not active at block " + str(block))
+        oracle_state = read_global_state(
+            self.state_backend, market_state[market_strings.oracle_app_id], block=block
+        )
+        # asset decimals never change, they are served from the metadata cache when present
+        underlying_decimals = (
+            6
+            if underlying_asset_id == 1
+            else read_asset_params(
+                self.indexer, underlying_asset_id, self.metadata_cache
+            )["decimals"]
+        )
+        return make_market_snapshot(
+            self.market_app_id, market_state, oracle_state, underlying_decimals
+        )
 
     # USER FUNCTIONS
 
-    def get_storage_state(self, storage_address, block=None):
-        """Returns the market local state for address.
+    def get_position(self, storage_address, block=None, user_state=None):
+        """Returns the position of storage_address in the market. Historical (block) positions are computed from a
+        :class:`MarketSnapshot` of that block without modifying the market.
 
         :param storage_address: storage_address to get info for
         :type storage_address: string
         :param block: block at which to get historical data
         :type block: int, optional
-        :return: market local state for address
-        :rtype: dict
+        :param user_state: already read market local state of storage_address, defaults to None (read it)
+        :type user_state: dict, optional
+        :return: market position of storage_address
+        :rtype: :class:`MarketPosition`
         """
-        result = {}
-        asset = self.get_asset()
-        indexer_client = self.historical_indexer if block else self.indexer
-
         # load user local state
-        user_state = read_local_state(
-            indexer_client, storage_address, self.market_app_id, block=block
-        )
+        if user_state is None:
+            user_state = read_local_state(
+                self.state_backend, storage_address, self.market_app_id, block=block
+            )
 
-        # load global state variables
         if block:
-            self.update_global_state(block=block)
+            return self.get_snapshot(block=block).compute_position(user_state)
 
-        result["active_collateral_bank"] = user_state.get(
+        state = self.state
+        asset = self.get_asset()
+        active_collateral_bank = user_state.get(
             market_strings.user_active_collateral, 0
         )
-        result["active_collateral_underlying"] = int(
-            result["active_collateral_bank"]
-            * self.bank_to_underlying_exchange
-            / SCALE_FACTOR
-        )
-        result["active_collateral_usd"] = asset.to_usd(
-            result["active_collateral_underlying"]
-        )
-        result["active_collateral_max_borrow_usd"] = (
-            result["active_collateral_usd"]
-            * self.collateral_factor
-            / PARAMETER_SCALE_FACTOR
+        active_collateral_underlying = int(
+            active_collateral_bank * state.bank_to_underlying_exchange / SCALE_FACTOR
         )
-        result["borrow_shares"] = user_state.get(market_strings.user_borrow_shares, 0)
-        result["borrow_underlying"] = (
+        active_collateral_usd = asset.to_usd(active_collateral_underlying)
+        borrow_shares = user_state.get(market_strings.user_borrow_shares, 0)
+        borrow_underlying = (
             int(
-                self.underlying_borrowed
-                * result["borrow_shares"]
-                / self.outstanding_borrow_shares
+                state.underlying_borrowed
+                * borrow_shares
+                / state.outstanding_borrow_shares
             )
-            if self.outstanding_borrow_shares > 0
+            if state.outstanding_borrow_shares > 0
             else 0
         )
-        result["borrow_usd"] = asset.to_usd(result["borrow_underlying"])
+        return MarketPosition(
+            active_collateral_bank,
+            active_collateral_underlying,
+            active_collateral_usd,
+            active_collateral_usd * state.collateral_factor / PARAMETER_SCALE_FACTOR,
+            borrow_shares,
+            borrow_underlying,
+            asset.to_usd(borrow_underlying),
+        )
+
+    def get_storage_state(self, storage_address, block=None, user_state=None):
+        """Returns the market local state for address. Historical (block) positions are computed from a
+        :class:`MarketSnapshot` of that block without modifying the market.
 
-        return result
+        :param storage_address: storage_address to get info for
+        :type storage_address: string
+        :param block: block at which to get historical data
+        :type block: int, optional
+        :param user_state: already read market local state of storage_address, defaults to None (read it)
+        :type user_state: dict, optional
+        :return: market local state for address
+        :rtype: dict
+        """
+        return self.get_position(
+            storage_address, block=block, user_state=user_state
+        ).to_dict()
@@ -0,0 +1,199 @@
+import os
+import json
+from threading import Lock
+
+# bump when the layout of the cache file changes, older files are then ignored
+METADATA_CACHE_VERSION = 2
+# asset params fixed at creation, the manager, reserve, freeze and clawback addresses can be reconfigured
+IMMUTABLE_ASSET_PARAMS = frozenset(
+    [
+        "creator",
+        "decimals",
+        "default-frozen",
+        "metadata-hash",
+        "name",
+        "name-b64",
+        "total",
+        "unit-name",
+        "unit-name-b64",
+        "url",
+        "url-b64",
+    ]
+)
+DEFAULT_METADATA_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "algofi-py-sdk"
+)
+
+
+class MetadataCache:
+    def __init__(self, chain, path=None):
+        """Constructor method for a persistent on-disk cache of protocol metadata which never changes after
+        deployment (asset params and application creation rounds). Entries are keyed by asset or app id and
+        stored in one versioned json file per chain.
+
+        :param chain: network the cached metadata belongs to
+        :type chain: string e.g. 'testnet'
+        :param path: path of the cache file, defaults to ~/.cache/algofi-py-sdk/v1-<chain>-metadata.json
+        :type path: string, optional
+        """
+
+        self.chain = chain
+        self.path = (
+            path
+            if path
+            else os.path.join(
+                DEFAULT_METADATA_CACHE_DIR, "v1-" + chain + "-metadata.json"
+            )
+        )
+        self.lock = Lock()
+        self.dirty = False
+        self.assets = {}
+        self.applications = {}
+        self.load()
+
+    def load(self):
+        """Loads the cache file from disk. Missing, unreadable, mismatched version or chain files are ignored."""
+        try:
+            with open(self.path, "r") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != METADATA_CACHE_VERSION
+            or data.get("chain") != self.chain
+        ):
+            return
+        with self.lock:
+            self.assets.update(
+                {int(asset_id): params for asset_id, params in data["assets"].items()}
+            )
+            self.applications.update(
+                {int(app_id): info for app_id, info in data["applications"].items()}
+            )
+
+    def save(self):
+        """Writes the cache file to disk if any entry was added since the last load or save. The file is
+        replaced atomically so concurrent readers never see a partial write.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                "version": METADATA_CACHE_VERSION,
+                "chain": self.chain,
+                "assets": {
+                    str(asset_id): params for asset_id, params in self.assets.items()
+                },
+                "applications": {
+                    str(app_id): info for app_id, info in self.applications.items()
+                },
+            }
+            self.dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + "." + str(os.getpid()) + ".tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(data, cache_file)
+        os.replace(tmp_path, self.path)
+
+    def get_asset_params(self, asset_id):
+        """Returns cached immutable asset params or None
+
+        :param asset_id: asset id
+        :type asset_id: int
+        :return: asset params as returned by the indexer, without the mutable role addresses
+        :rtype: dict
+        """
+        return self.assets.get(asset_id, None)
+
+    def set_asset_params(self, asset_id, params):
+        """Caches the immutable fields of asset params, see IMMUTABLE_ASSET_PARAMS
+
+        :param asset_id: asset id
+        :type asset_id: int
+        :param params: asset params as returned by the indexer
+        :type params: dict
+        """
+        with self.lock:
+            self.assets[asset_id] = {
+                key: value
+                for key, value in params.items()
+                if key in IMMUTABLE_ASSET_PARAMS
+            }
+            self.dirty = True
+
+    def get_created_at_round(self, app_id):
+        """Returns cached creation round of application or None
+
+        :param app_id: application id
+        :type app_id: int
+        :return: created at round
+        :rtype: int
+        """
+        return self.applications.get(app_id, {}).get("created-at-round", None)
+
+    def set_created_at_round(self, app_id, created_at_round):
+        """Caches creation round of application
+
+        :param app_id: application id
+        :type app_id: int
+        :param created_at_round: created at round
+        :type created_at_round: int
+        """
+        with self.lock:
+            self.applications.setdefault(app_id, {})[
+                "created-at-round"
+            ] = created_at_round
+            self.dirty = True
+
+
+def read_asset_params(indexer_client, asset_id, metadata_cache=None):
+    """Returns the params of asset with id asset_id, served from metadata_cache when present. Params served from
+    the cache only hold the immutable fields, e.g. decimals, not the manager, reserve, freeze and clawback addresses.
+
+    :param indexer_client: indexer client
+    :type indexer_client: :class:`IndexerClient`
+    :param asset_id: asset id
+    :type asset_id: int
+    :param metadata_cache: cache of immutable protocol metadata, defaults to None
+    :type metadata_cache: :class:`MetadataCache`, optional
+    :return: asset params
+    :rtype: dict
+    """
+    if metadata_cache is not None:
+        params = metadata_cache.get_asset_params(asset_id)
+        if params is not None:
+            return params
+    try:
+        params = indexer_client.asset_info(asset_id).get("asset", {})["params"]
+    except:
+        raise Exception("Asset with id " + str(asset_id) + " does not exist.")
+    if metadata_cache is not None:
+        metadata_cache.set_asset_params(asset_id, params)
+    return params
+
+
+def read_created_at_round(indexer_client, app_id, metadata_cache=None):
+    """Returns the round at which application with id app_id was created, served from metadata_cache when present
+
+    :param indexer_client: indexer client
+    :type indexer_client: :class:`IndexerClient`
+    :param app_id: application id
+    :type app_id: int
+    :param metadata_cache: cache of immutable protocol metadata, defaults to None
+    :type metadata_cache: :class:`MetadataCache`, optional
+    :return: created at round
+    :rtype: int
+    """
+    if metadata_cache is not None:
+        created_at_round = metadata_cache.get_created_at_round(app_id)
+        if created_at_round is not None:
+            return created_at_round
+    created_at_round = indexer_client.applications(app_id)["application"].get(
+        "created-at-round"
+    )
+    if metadata_cache is not None and created_at_round is not None:
+        metadata_cache.set_created_at_round(app_id, created_at_round)
+    return created_at_round
@@ -0,0 +1,265 @@
+from ..utils import get_local_states, SCALE_FACTOR, PARAMETER_SCALE_FACTOR
+from ..contract_strings import algofi_market_strings as market_strings
+from .records import MarketPosition, UserPosition
+
+# the only market local state fields a position table reads
+POSITION_FIELDS = (
+    market_strings.user_active_collateral,
+    market_strings.user_borrow_shares,
+)
+
+# numpy is an optional dependency, install with `pip install algofi-py-sdk[numpy]`
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def require_numpy():
+    """Raises if numpy is not installed"""
+    if np is None:
+        raise Exception(
+            "PositionTable requires numpy, install it with pip install algofi-py-sdk[numpy]"
+        )
+
+
+class PositionTable:
+    def __init__(self, snapshot, storage_addresses, collateral_bank, borrow_shares):
+        """Constructor method for a columnar table of the positions of many storage accounts in every active market
+        of a :class:`ProtocolSnapshot`. Balances are stored as accounts x markets arrays and all usd values and
+        health ratios are computed for every account at once. Raw balances are kept exactly as uint64, like the
+        local state they are read from, and only the underlying amounts and usd values are floats.
+
+        :param snapshot: snapshot the positions are valued against
+        :type snapshot: :class:`ProtocolSnapshot`
+        :param storage_addresses: storage addresses, one per row
+        :type storage_addresses: list
+        :param collateral_bank: active collateral bank asset balances, shape accounts x markets
+        :type collateral_bank: :class:`numpy.ndarray` of uint64
+        :param borrow_shares: borrow shares, shape accounts x markets
+        :type borrow_shares: :class:`numpy.ndarray` of uint64
+        """
+        require_numpy()
+        self.storage_addresses = list(storage_addresses)
+        self.indexes = {
+            storage_address: index
+            for index, storage_address in enumerate(self.storage_addresses)
+        }
+        self.collateral_bank = np.asarray(collateral_bank, dtype=np.uint64)
+        self.borrow_shares = np.asarray(borrow_shares, dtype=np.uint64)
+        self.set_snapshot(snapshot)
+
+    @classmethod
+    def from_accounts(cls, snapshot, accounts):
+        """Returns a position table built from storage account payloads, e.g.
+        :meth:`Client.iterate_storage_accounts`, reading only the local state they already contain
+
+        :param snapshot: snapshot the positions are valued against
+        :type snapshot: :class:`ProtocolSnapshot`
+        :param accounts: account info dicts including apps-local-state
+        :type accounts: iterable
+        :return: position table
+        :rtype: :class:`PositionTable`
+        """
+        require_numpy()
+        market_app_ids = [
+            snapshot.get_market(symbol).get_market_app_id()
+            for symbol in snapshot.get_active_symbols()
+        ]
+        storage_addresses = []
+        rows = []
+        for account in accounts:
+            local_states = get_local_states(account, fields=POSITION_FIELDS)
+            row = []
+            for market_app_id in market_app_ids:
+                user_state = local_states.get(market_app_id, {})
+                row.append(user_state.get(market_strings.user_active_collateral, 0))
+                row.append(user_state.get(market_strings.user_borrow_shares, 0))
+            storage_addresses.append(account["address"])
+            rows.append(row)
+        balances = np.array(rows, dtype=np.uint64).reshape(
+            len(rows), 2 * len(market_app_ids)
+        )
+        return cls(snapshot, storage_addresses, balances[:, 0::2], balances[:, 1::2])
+
+    def set_snapshot(self, snapshot):
+        """Revalues the table against the market state and prices of snapshot. The active markets must be
+        unchanged.
+
+        :param snapshot: snapshot the positions are valued against
+        :type snapshot: :class:`ProtocolSnapshot`
+        """
+        symbols = snapshot.get_active_symbols()
+        if self.collateral_bank.shape[1] != len(symbols):
+            raise Exception("Snapshot active markets do not match position table")
+        markets = [snapshot.get_market(symbol) for symbol in symbols]
+        self.snapshot = snapshot
+        self.symbols = symbols
+
+        # market parameters, one entry per column
+        bank_to_underlying_exchange = np.array(
+            [market.get_bank_to_underlying_exchange() for market in markets],
+            dtype=object,
+        )
+        underlying_borrowed = np.array(
+            [market.get_underlying_borrowed() for market in markets], dtype=object
+        )
+        outstanding_borrow_shares = np.array(
+            [market.get_outstanding_borrow_shares() for market in markets],
+            dtype=object,
+        )
+        self.collateral_factors = (
+            np.array(
+                [market.get_collateral_factor() for market in markets],
+                dtype=np.float64,
+            )
+            / PARAMETER_SCALE_FACTOR
+        )
+        self.decimal_scales = np.array(
+            [10 ** market.get_asset().get_underlying_decimals() for market in markets],
+            dtype=np.float64,
+        )
+        self.prices = np.array(
+            [market.get_asset().get_price() for market in markets], dtype=np.float64
+        )
+
+        # underlying amounts only change with market state, usd values are recomputed per price vector. Products
+        # of balances and market state overflow uint64, they are divided as python ints and rounded to float once,
+        # as in MarketSnapshot.compute_position
+        self.active_collateral_underlying = np.trunc(
+            (
+                self.collateral_bank.astype(object)
+                * bank_to_underlying_exchange
+                / SCALE_FACTOR
+            ).astype(np.float64)
+        )
+        has_borrows = (outstanding_borrow_shares > 0).astype(bool)
+        self.borrow_underlying = np.zeros(self.borrow_shares.shape, dtype=np.float64)
+        self.borrow_underlying[:, has_borrows] = np.trunc(
+            (
+                self.borrow_shares[:, has_borrows].astype(object)
+                * underlying_borrowed[has_borrows]
+                / outstanding_borrow_shares[has_borrows]
+            ).astype(np.float64)
+        )
+
+    def get_storage_addresses(self):
+        """Returns the storage addresses, one per row
+
+        :return: storage addresses
+        :rtype: list
+        """
+        return self.storage_addresses
+
+    def get_symbols(self):
+        """Returns the market symbols, one per column
+
+        :return: symbols
+        :rtype: list
+        """
+        return self.symbols
+
+    def get_index(self, storage_address):
+        """Returns the row of storage_address
+
+        :param storage_address: storage address
+        :type storage_address: string
+        :return: row index
+        :rtype: int
+        """
+        return self.indexes[storage_address]
+
+    def get_prices(self):
+        """Returns the dollarized snapshot prices, one per column
+
+        :return: prices
+        :rtype: :class:`numpy.ndarray` of float64
+        """
+        return self.prices
+
+    def compute_usd(self, prices=None):
+        """Returns the usd value of every position
+
+        :param prices: dollarized prices, one per column, defaults to None (snapshot prices)
+        :type prices: :class:`numpy.ndarray`, optional
+        :return: dict of accounts x markets arrays active_collateral_usd, active_collateral_max_borrow_usd and borrow_usd
+        :rtype: dict
+        """
+        if prices is None:
+            prices = self.prices
+        usd_per_unit = np.asarray(prices, dtype=np.float64) / self.decimal_scales
+        active_collateral_usd = self.active_collateral_underlying * usd_per_unit
+        return {
+            "active_collateral_usd": active_collateral_usd,
+            "active_collateral_max_borrow_usd": active_collateral_usd
+            * self.collateral_factors,
+            "borrow_usd": self.borrow_underlying * usd_per_unit,
+        }
+
+    def get_user_position(self, storage_address, prices=None):
+        """Returns the positions of one storage account as a :class:`UserPosition` read from the table arrays.
+        The manager local state is not part of the table and is None.
+
+        :param storage_address: storage address
+        :type storage_address: string
+        :param prices: dollarized prices, one per column, defaults to None (snapshot prices)
+        :type prices: :class:`numpy.ndarray`, optional
+        :return: user position
+        :rtype: :class:`UserPosition`
+        """
+        if prices is None:
+            prices = self.prices
+        index = self.indexes[storage_address]
+        usd_per_unit = np.asarray(prices, dtype=np.float64) / self.decimal_scales
+        positions = []
+        for column in range(len(self.symbols)):
+            active_collateral_underlying = int(
+                self.active_collateral_underlying[index, column]
+            )
+            borrow_underlying = int(self.borrow_underlying[index, column])
+            active_collateral_usd = float(
+                active_collateral_underlying * usd_per_unit[column]
+            )
+            positions.append(
+                MarketPosition(
+                    int(self.collateral_bank[index, column]),
+                    active_collateral_underlying,
+                    active_collateral_usd,
+                    active_collateral_usd * float(self.collateral_factors[column]),
+                    int(self.borrow_shares[index, column]),
+                    borrow_underlying,
+                    float(borrow_underlying * usd_per_unit[column]),
+                )
+            )
+        return UserPosition(
+            storage_address, None, self.snapshot.active_symbols, tuple(positions)
+        )
+
+    def compute_health(self, prices=None):
+        """Returns the total max borrow, total borrow and borrow to max borrow ratio of every account. The ratio
+        is inf for accounts with borrows and no collateral, 0 for empty accounts and above 1 for accounts which can
+        be liquidated.
+
+        :param prices: dollarized prices, one per column, defaults to None (snapshot prices)
+        :type prices: :class:`numpy.ndarray`, optional
+        :return: dict of per account arrays max_borrow_usd, borrow_usd and borrow_ratio
+        :rtype: dict
+        """
+        if prices is None:
+            prices = self.prices
+        usd_per_unit = np.asarray(prices, dtype=np.float64) / self.decimal_scales
+        max_borrow_usd = self.active_collateral_underlying @ (
+            usd_per_unit * self.collateral_factors
+        )
+        borrow_usd = self.borrow_underlying @ usd_per_unit
+        borrow_ratio = np.divide(
+            borrow_usd,
+            max_borrow_usd,
+            out=np.where(borrow_usd > 0, np.inf, 0.0),
+            where=max_borrow_usd > 0,
+        )
+        return {
+            "max_borrow_usd": max_borrow_usd,
+            "borrow_usd": borrow_usd,
+            "borrow_ratio": borrow_ratio,
+        }
@@ -0,0 +1,123 @@
+from threading import Lock
+from time import monotonic
+
+# a new epoch is started by every top-level Client computation, e.g. get_user_state
+PRICE_POLICY_COMPUTATION = "computation"
+# a new epoch is started by begin_computation once the epoch is older than ttl seconds
+PRICE_POLICY_TTL = "ttl"
+# a new epoch is started once per round, by a BlockFollower calling advance(round)
+PRICE_POLICY_ROUND = "round"
+# a new epoch is only started by calling advance
+PRICE_POLICY_EXPLICIT = "explicit"
+
+PRICE_POLICIES = frozenset(
+    [
+        PRICE_POLICY_COMPUTATION,
+        PRICE_POLICY_TTL,
+        PRICE_POLICY_ROUND,
+        PRICE_POLICY_EXPLICIT,
+    ]
+)
+
+
+class PriceEpoch:
+    def __init__(self, policy=PRICE_POLICY_COMPUTATION, ttl=None, clock=monotonic):
+        """Constructor method for a price epoch shared by the assets of a client. An oracle price is read at most
+        once per epoch, every other :meth:`Asset.get_price` or :meth:`Asset.to_usd` in the same epoch reuses it, so
+        all conversions of one computation are made against the same price vector. The policy decides when a new
+        epoch starts.
+
+        :param policy: one of PRICE_POLICY_COMPUTATION, PRICE_POLICY_TTL, PRICE_POLICY_ROUND or PRICE_POLICY_EXPLICIT, defaults to PRICE_POLICY_COMPUTATION
+        :type policy: string, optional
+        :param ttl: maximum age of an epoch in seconds, required by PRICE_POLICY_TTL, defaults to None
+        :type ttl: float, optional
+        :param clock: function returning the current time in seconds, defaults to time.monotonic
+        :type clock: function, optional
+        """
+
+        if policy not in PRICE_POLICIES:
+            raise Exception("Unknown price policy " + str(policy))
+        if policy == PRICE_POLICY_TTL and ttl is None:
+            raise Exception("Price policy ttl requires a ttl")
+        self.policy = policy
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = Lock()
+        self.epoch = 0
+        self.round = None
+        self.started_at = clock()
+        self.oracle_reads = 0
+        self.oracle_reads_avoided = 0
+
+    def get_policy(self):
+        """Returns the price policy
+
+        :return: price policy
+        :rtype: string
+        """
+        return self.policy
+
+    def get_epoch(self):
+        """Returns the current epoch, prices read in an earlier epoch are stale
+
+        :return: epoch
+        :rtype: int
+        """
+        return self.epoch
+
+    def get_stats(self):
+        """Returns epoch counters
+
+        :return: dict with epoch, round, oracle_reads and oracle_reads_avoided
+        :rtype: dict
+        """
+        with self.lock:
+            return {
+                "epoch": self.epoch,
+                "round": self.round,
+                "oracle_reads": self.oracle_reads,
+                "oracle_reads_avoided": self.oracle_reads_avoided,
+            }
+
+    def advance(self, round=None):
+        """Starts a new epoch, every price is re-read on its next use. Advancing to the round of the current epoch
+        does nothing.
+
+        :param round: round the new epoch belongs to, defaults to None
+        :type round: int, optional
+        :return: True if a new epoch was started
+        :rtype: bool
+        """
+        with self.lock:
+            if round is not None and round == self.round:
+                return False
+            self.epoch += 1
+            self.round = round
+            self.started_at = self.clock()
+            return True
+
+    def begin_computation(self):
+        """Called by the client before a computation which converts amounts to usd. Starts a new epoch under
+        PRICE_POLICY_COMPUTATION, or under PRICE_POLICY_TTL when the current epoch is older than ttl.
+
+        :return: True if a new epoch was started
+        :rtype: bool
+        """
+        if self.policy == PRICE_POLICY_COMPUTATION:
+            return self.advance()
+        if (
+            self.policy == PRICE_POLICY_TTL
+            and self.clock() - self.started_at >= self.ttl
+        ):
+            return self.advance()
+        return False
+
+    def record_read(self):
+        """Counts an oracle price read"""
+        with self.lock:
+            self.oracle_reads += 1
+
+    def record_avoided_read(self):
+        """Counts a price served from the current epoch"""
+        with self.lock:
+            self.oracle_reads_avoided += 1
@@ -0,0 +1,349 @@
+from ..contract_strings import algofi_market_strings as market_strings
+
+
+def compute_borrow_utilization(borrow_usd, max_borrow_usd):
+    """Returns borrow_usd / max_borrow_usd, inf for borrows without collateral and 0 for empty accounts
+
+    :param borrow_usd: total borrow in usd
+    :type borrow_usd: float
+    :param max_borrow_usd: total max borrow in usd
+    :type max_borrow_usd: float
+    :return: borrow utilization
+    :rtype: float
+    """
+    if max_borrow_usd > 0:
+        return borrow_usd / max_borrow_usd
+    return float("inf") if borrow_usd > 0 else 0.0
+
+
+class Record:
+    """Base class for compact state records. Fields are stored in __slots__, in declaration order, instead of a
+    per instance dict.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        if len(values) != len(self.__slots__):
+            raise Exception(
+                type(self).__name__ + " takes " + str(len(self.__slots__)) + " fields"
+            )
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def to_dict(self):
+        """Returns the record as a dict of field name to value
+
+        :return: record fields
+        :rtype: dict
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        return (
+            type(self).__name__
+            + "("
+            + ", ".join(
+                name + "=" + repr(getattr(self, name)) for name in self.__slots__
+            )
+            + ")"
+        )
+
+
+class MarketState(Record):
+    """Market global state fields, as held by :class:`Market`"""
+
+    __slots__ = (
+        "market_counter",
+        "underlying_asset_id",
+        "bank_asset_id",
+        "oracle_app_id",
+        "oracle_price_field",
+        "oracle_price_scale_factor",
+        "collateral_factor",
+        "liquidation_incentive",
+        "reserve_factor",
+        "base_interest_rate",
+        "slope_1",
+        "slope_2",
+        "utilization_optimal",
+        "market_supply_cap_in_dollars",
+        "market_borrow_cap_in_dollars",
+        "active_collateral",
+        "bank_circulation",
+        "bank_to_underlying_exchange",
+        "underlying_borrowed",
+        "outstanding_borrow_shares",
+        "underlying_cash",
+        "underlying_reserves",
+        "total_borrow_interest_rate",
+    )
+
+    @classmethod
+    def from_global_state(cls, market_state):
+        """Returns the record of a market global state. Missing parameters are None and missing balances 0.
+
+        :param market_state: dict of market global state as returned by read_global_state
+        :type market_state: dict
+        :return: market state
+        :rtype: :class:`MarketState`
+        """
+        return cls(
+            market_state[market_strings.manager_market_counter_var],
+            market_state.get(market_strings.asset_id, None),
+            market_state.get(market_strings.bank_asset_id, None),
+            market_state.get(market_strings.oracle_app_id, None),
+            market_state.get(market_strings.oracle_price_field, None),
+            market_state.get(market_strings.oracle_price_scale_factor, None),
+            market_state.get(market_strings.collateral_factor, None),
+            market_state.get(market_strings.liquidation_incentive, None),
+            market_state.get(market_strings.reserve_factor, None),
+            market_state.get(market_strings.base_interest_rate, None),
+            market_state.get(market_strings.slope_1, None),
+            market_state.get(market_strings.slope_2, None),
+            market_state.get(market_strings.utilization_optimal, None),
+            market_state.get(market_strings.market_supply_cap_in_dollars, None),
+            market_state.get(market_strings.market_borrow_cap_in_dollars, None),
+            market_state.get(market_strings.active_collateral, 0),
+            market_state.get(market_strings.bank_circulation, 0),
+            market_state.get(market_strings.bank_to_underlying_exchange, 0),
+            market_state.get(market_strings.underlying_borrowed, 0),
+            market_state.get(market_strings.outstanding_borrow_shares, 0),
+            market_state.get(market_strings.underlying_cash, 0),
+            market_state.get(market_strings.underlying_reserves, 0),
+            market_state.get(market_strings.total_borrow_interest_rate, 0),
+        )
+
+
+class ManagerStorageState(Record):
+    """Manager local state of a storage account, to_dict is in the format of :meth:`Manager.get_storage_state`"""
+
+    __slots__ = (
+        "user_global_max_borrow_in_dollars",
+        "user_global_borrowed_in_dollars",
+    )
+
+
+class MarketPosition(Record):
+    """Position of a storage account in one market, to_dict is in the format of :meth:`Market.get_storage_state`"""
+
+    __slots__ = (
+        "active_collateral_bank",
+        "active_collateral_underlying",
+        "active_collateral_usd",
+        "active_collateral_max_borrow_usd",
+        "borrow_shares",
+        "borrow_underlying",
+        "borrow_usd",
+    )
+
+
+class UserPosition(Record):
+    """Positions of a storage account in every active market, to_dict is in the format of
+    :meth:`Client.get_storage_state`. symbols is a tuple which may be shared by many records, positions the
+    :class:`MarketPosition` of each symbol in the same order.
+    """
+
+    __slots__ = ("storage_address", "manager", "symbols", "positions")
+
+    def get_storage_address(self):
+        """Returns the storage address
+
+        :return: storage address
+        :rtype: string
+        """
+        return self.storage_address
+
+    def get_manager_storage_state(self):
+        """Returns the manager local state, None if it was not included
+
+        :return: manager storage state
+        :rtype: :class:`ManagerStorageState`
+        """
+        return self.manager
+
+    def get_symbols(self):
+        """Returns the market symbols
+
+        :return: symbols
+        :rtype: tuple
+        """
+        return self.symbols
+
+    def get_market_position(self, symbol):
+        """Returns the position in the market with the given symbol
+
+        :param symbol: market symbol
+        :type symbol: string
+        :return: market position
+        :rtype: :class:`MarketPosition`
+        """
+        return self.positions[self.symbols.index(symbol)]
+
+    def get_max_borrow_usd(self):
+        """Returns the total max borrow of the positions in usd
+
+        :return: max borrow in usd
+        :rtype: float
+        """
+        return sum(
+            position.active_collateral_max_borrow_usd for position in self.positions
+        )
+
+    def get_borrow_usd(self):
+        """Returns the total borrow of the positions in usd
+
+        :return: borrow in usd
+        :rtype: float
+        """
+        return sum(position.borrow_usd for position in self.positions)
+
+    def to_dict(self):
+        """Returns the positions in the format of :meth:`Client.get_storage_state`
+
+        :return: state
+        :rtype: dict
+        """
+        result = {}
+        if self.manager is not None:
+            result["manager"] = self.manager.to_dict()
+        for symbol, position in zip(self.symbols, self.positions):
+            result[symbol] = position.to_dict()
+        return result
+
+    def compute_health(self, round=None):
+        """Returns the health of the positions, valued at the prices they were computed with. Makes no network
+        reads.
+
+        :param round: round of the snapshot the positions were computed against, defaults to None (unknown)
+        :type round: int, optional
+        :return: account health
+        :rtype: :class:`AccountHealth`
+        """
+        max_borrow_usd = self.get_max_borrow_usd()
+        borrow_usd = self.get_borrow_usd()
+        collateral = sorted(
+            (
+                (position.active_collateral_usd, symbol)
+                for symbol, position in zip(self.symbols, self.positions)
+                if position.active_collateral_bank > 0
+            ),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        return AccountHealth(
+            self.storage_address,
+            max_borrow_usd,
+            borrow_usd,
+            compute_borrow_utilization(borrow_usd, max_borrow_usd),
+            max(borrow_usd - max_borrow_usd, 0),
+            tuple(symbol for _, symbol in collateral),
+            tuple(
+                symbol
+                for symbol, position in zip(self.symbols, self.positions)
+                if position.borrow_shares > 0
+            ),
+            round,
+        )
+
+
+class AccountHealth(Record):
+    """Health of a storage account. borrow_utilization is borrow_usd / max_borrow_usd, inf for borrows without
+    collateral and 0 for empty accounts, shortfall_usd the borrow in excess of max_borrow_usd. seizable_symbols
+    are the markets holding collateral, largest usd value first, and borrowed_symbols the markets with borrows.
+    round is the round of the snapshot whose market state and prices the account was valued against, None if unknown.
+    """
+
+    __slots__ = (
+        "storage_address",
+        "max_borrow_usd",
+        "borrow_usd",
+        "borrow_utilization",
+        "shortfall_usd",
+        "seizable_symbols",
+        "borrowed_symbols",
+        "round",
+    )
+
+    def get_storage_address(self):
+        """Returns the storage address
+
+        :return: storage address
+        :rtype: string
+        """
+        return self.storage_address
+
+    def get_round(self):
+        """Returns the round of the snapshot the account was valued against
+
+        :return: round, None if unknown
+        :rtype: int
+        """
+        return self.round
+
+    def get_borrow_utilization(self):
+        """Returns the borrow to max borrow ratio, above 1 when the account can be liquidated
+
+        :return: borrow utilization
+        :rtype: float
+        """
+        return self.borrow_utilization
+
+    def get_shortfall_usd(self):
+        """Returns the borrow in excess of the max borrow in usd, 0 for healthy accounts
+
+        :return: shortfall in usd
+        :rtype: float
+        """
+        return self.shortfall_usd
+
+    def get_seizable_symbols(self):
+        """Returns the markets holding collateral a liquidation can seize, largest usd value first
+
+        :return: symbols
+        :rtype: tuple
+        """
+        return self.seizable_symbols
+
+    def is_liquidatable(self):
+        """Returns True if the borrow exceeds the max borrow
+
+        :return: boolean if the account can be liquidated
+        :rtype: boolean
+        """
+        return self.shortfall_usd > 0
+
+
+class PriceMap(Record):
+    """Raw oracle prices and dollarized prices by symbol, all read at round"""
+
+    __slots__ = ("round", "raw_prices", "prices")
+
+    def get_round(self):
+        """Returns the round the prices were read at
+
+        :return: round
+        :rtype: int
+        """
+        return self.round
+
+    def get_raw_prices(self):
+        """Returns the raw oracle prices by symbol
+
+        :return: dictionary of int prices
+        :rtype: dict
+        """
+        return self.raw_prices
+
+    def get_prices(self):
+        """Returns the dollarized prices by symbol
+
+        :return: dictionary of float prices
+        :rtype: dict
+        """
+        return self.prices
@@ -0,0 +1,115 @@
+from threading import Lock
+from algosdk.v2client.indexer import IndexerClient
+from ..utils import concurrent_map, get_state_backend
+from .manager import Manager
+from .market import Market
+
+
+class AppRegistry:
+    def __init__(
+        self,
+        indexer_client: IndexerClient,
+        historical_indexer_client: IndexerClient,
+        lazy=False,
+        metadata_cache=None,
+        state_backend=None,
+        storage_address_cache=None,
+        price_epoch=None,
+    ):
+        """Constructor method for a registry which hands out one canonical :class:`Manager` or :class:`Market`
+        per application id, so objects which reference the same application share its state.
+
+        :param indexer_client: a :class:`IndexerClient` for interacting with the network
+        :type indexer_client: :class:`IndexerClient`
+        :param historical_indexer_client: a :class:`IndexerClient` for interacting with the network
+        :type historical_indexer_client: :class:`IndexerClient`
+        :param lazy: construct registered objects with lazy=True, defaults to False
+        :type lazy: bool, optional
+        :param metadata_cache: cache of immutable market and asset metadata, defaults to None
+        :type metadata_cache: :class:`MetadataCache`, optional
+        :param state_backend: backend shared by registered objects for live and historical state reads, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
+        :param storage_address_cache: cache of user to storage address shared by registered managers, defaults to None
+        :type storage_address_cache: :class:`StorageAddressCache`, optional
+        :param price_epoch: price epoch shared by the assets of registered markets, defaults to None
+        :type price_epoch: :class:`PriceEpoch`, optional
+        """
+
+        self.indexer = indexer_client
+        self.historical_indexer = historical_indexer_client
+        self.state_backend = get_state_backend(
+            indexer_client, historical_indexer_client, state_backend
+        )
+        self.lazy = lazy
+        self.metadata_cache = metadata_cache
+        self.storage_address_cache = storage_address_cache
+        self.price_epoch = price_epoch
+
+        self.lock = Lock()
+        self.managers = {}
+        self.markets = {}
+
+    def get_manager(self, manager_app_id):
+        """Returns the canonical manager for manager_app_id, constructing it on first request
+
+        :param manager_app_id: manager app id
+        :type manager_app_id: int
+        :return: manager
+        :rtype: :class:`Manager`
+        """
+        with self.lock:
+            if manager_app_id not in self.managers:
+                self.managers[manager_app_id] = Manager(
+                    self.indexer,
+                    self.historical_indexer,
+                    manager_app_id,
+                    lazy=self.lazy,
+                    state_backend=self.state_backend,
+                    storage_address_cache=self.storage_address_cache,
+                )
+            return self.managers[manager_app_id]
+
+    def get_market(self, market_app_id):
+        """Returns the canonical market for market_app_id, constructing it on first request
+
+        :param market_app_id: market app id
+        :type market_app_id: int
+        :return: market
+        :rtype: :class:`Market`
+        """
+        with self.lock:
+            if market_app_id not in self.markets:
+                self.markets[market_app_id] = Market(
+                    self.indexer,
+                    self.historical_indexer,
+                    market_app_id,
+                    lazy=self.lazy,
+                    metadata_cache=self.metadata_cache,
+                    state_backend=self.state_backend,
+                    price_epoch=self.price_epoch,
+                )
+            return self.markets[market_app_id]
+
+    def get_refresh_plan(self):
+        """Returns the list of registered managers and markets to update in one refresh cycle. Every
+        application appears exactly once.
+
+        :return: list of :class:`Manager` and :class:`Market` objects
+        :rtype: list
+        """
+        with self.lock:
+            return list(self.managers.values()) + list(self.markets.values())
+
+    def refresh(self, block=None, max_workers=None):
+        """Updates the global state of every registered manager and market, reading each application once
+
+        :param block: block at which to get historical data
+        :type block: int, optional
+        :param max_workers: maximum number of concurrent indexer requests, defaults to None (sequential)
+        :type max_workers: int, optional
+        """
+        concurrent_map(
+            lambda app: app.update_global_state(block=block),
+            self.get_refresh_plan(),
+            max_workers,
+        )
@@ -7,6 +7,7 @@ from algosdk.v2client.indexer import IndexerClient
 from ..utils import (
     read_local_state,
     read_global_state,
+    get_state_backend,
     SCALE_FACTOR,
     REWARDS_SCALE_FACTOR,
     PARAMETER_SCALE_FACTOR,
@@ -21,6 +22,7 @@ class RewardsProgram:
         indexer_client: IndexerClient,
         historical_indexer_client: IndexerClient,
         manager_state,
+        state_backend=None,
     ):
         """Constructor method for manager object.
 
@@ -30,10 +32,15 @@ class RewardsProgram:
         :type historical_indexer_client: :class:`IndexerClient`
         :param manager_state: dictionary of manager global state
         :type manager_state: dict
+        :param state_backend: backend for live and historical state reads, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
         """
 
         self.indexer = indexer_client
         self.historical_indexer = historical_indexer_client
+        self.state_backend = get_state_backend(
+            indexer_client, historical_indexer_client, state_backend
+        )
 
         self.latest_rewards_time = manager_state.get(
             manager_strings.latest_rewards_time, 0
@@ -144,10 +151,44 @@ class RewardsProgram:
         :rtype: (int, int)
         """
         # get raw user state
-        manager_state = read_global_state(self.indexer, manager.get_manager_app_id())
+        manager_state = read_global_state(
+            self.state_backend, manager.get_manager_app_id()
+        )
         manager_storage_state = read_local_state(
-            self.indexer, storage_address, manager.get_manager_app_id()
+            self.state_backend, storage_address, manager.get_manager_app_id()
         )
+        market_storage_states = [
+            market.get_storage_state(storage_address) for market in markets
+        ]
+        return self.compute_unrealized_rewards(
+            manager_state, manager_storage_state, markets, market_storage_states
+        )
+
+    def compute_unrealized_rewards(
+        self,
+        manager_state,
+        manager_storage_state,
+        markets,
+        market_storage_states,
+        timestamp=None,
+    ):
+        """Return the projected claimable rewards computed from already fetched state, without network reads
+        other than those made by the markets' assets when converting to usd.
+        Ordering of markets must be as seen in contracts.json.
+
+        :param manager_state: dict of manager global state
+        :type manager_state: dict
+        :param manager_storage_state: dict of manager local state of the storage address
+        :type manager_storage_state: dict
+        :param markets: list of :class:`Market` or :class:`MarketSnapshot` objects to get unrealized rewards for
+        :type markets: list
+        :param market_storage_states: list of market storage states of the storage address, one per market
+        :type market_storage_states: list
+        :param timestamp: unix time to project rewards to, defaults to None (now)
+        :type timestamp: int, optional
+        :return: tuple of primary and secondary unrealized rewards
+        :rtype: (int, int)
+        """
         on_current_program = (
             self.get_rewards_program_number()
             == manager_storage_state.get(manager_strings.user_rewards_program_number, 0)
@@ -196,14 +237,16 @@ class RewardsProgram:
                 total_weighted_tvl_usd += 0
 
         # calculate the projected rewards for the next coefficient
-        time_elapsed = int(time.time()) - self.get_latest_rewards_time()
+        if timestamp is None:
+            timestamp = int(time.time())
+        time_elapsed = timestamp - self.get_latest_rewards_time()
         rewards_issued = (
             time_elapsed * self.get_rewards_per_second()
             if self.get_rewards_amount() > 0
             else 0
         )
 
-        for market in markets:
+        for market, market_storage_state in zip(markets, market_storage_states):
             # get coefficients
             market_counter_prefix = (
                 market.get_market_counter().to_bytes(8, byteorder="big").decode("utf-8")
@@ -230,7 +273,6 @@ class RewardsProgram:
                 / (market_tvl[market])
             )
 
-            market_storage_state = market.get_storage_state(storage_address)
             user_tvl = (
                 market_storage_state["active_collateral_underlying"]
                 + market_storage_state["borrow_underlying"]
@@ -0,0 +1,703 @@
+from functools import partial
+from types import MappingProxyType
+from algosdk import logic
+from algosdk.v2client.indexer import IndexerClient
+from ..utils import (
+    read_global_state,
+    get_local_states,
+    concurrent_map,
+    SCALE_FACTOR,
+    PARAMETER_SCALE_FACTOR,
+)
+from ..contract_strings import algofi_manager_strings as manager_strings
+from ..contract_strings import algofi_market_strings as market_strings
+from .rewards_program import RewardsProgram
+from .records import ManagerStorageState, MarketPosition, UserPosition
+
+# number of concurrent indexer requests used to take a snapshot when none is configured
+DEFAULT_SNAPSHOT_MAX_WORKERS = 16
+# seconds after which the cached snapshot of a client is taken again, a dozen rounds or so
+DEFAULT_SNAPSHOT_MAX_AGE = 60
+
+
+class Immutable:
+    """Base class for records which cannot be modified after construction"""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(type(self).__name__ + " is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(type(self).__name__ + " is immutable")
+
+
+class AssetSnapshot(Immutable):
+    __slots__ = (
+        "underlying_asset_id",
+        "bank_asset_id",
+        "underlying_decimals",
+        "oracle_app_id",
+        "oracle_price_field",
+        "oracle_price_scale_factor",
+        "oracle_raw_price",
+    )
+
+    def __init__(
+        self,
+        underlying_asset_id,
+        bank_asset_id,
+        underlying_decimals,
+        oracle_app_id,
+        oracle_price_field,
+        oracle_price_scale_factor,
+        oracle_raw_price,
+    ):
+        """Constructor method for an immutable view of an asset and its oracle price at one round.
+
+        :param underlying_asset_id: underlying asset id
+        :type underlying_asset_id: int
+        :param bank_asset_id: bank asset id
+        :type bank_asset_id: int
+        :param underlying_decimals: decimals of the underlying asset
+        :type underlying_decimals: int
+        :param oracle_app_id: price oracle app id
+        :type oracle_app_id: int
+        :param oracle_price_field: price oracle price field
+        :type oracle_price_field: string
+        :param oracle_price_scale_factor: price oracle scale factor to dollars
+        :type oracle_price_scale_factor: int
+        :param oracle_raw_price: raw oracle price
+        :type oracle_raw_price: int
+        """
+        set_field = partial(object.__setattr__, self)
+        set_field("underlying_asset_id", underlying_asset_id)
+        set_field("bank_asset_id", bank_asset_id)
+        set_field("underlying_decimals", underlying_decimals)
+        set_field("oracle_app_id", oracle_app_id)
+        set_field("oracle_price_field", oracle_price_field)
+        set_field("oracle_price_scale_factor", oracle_price_scale_factor)
+        set_field("oracle_raw_price", oracle_raw_price)
+
+    def get_underlying_asset_id(self):
+        """Returns underying asset id
+
+        :return: underlying asset id
+        :rtype: int
+        """
+        return self.underlying_asset_id
+
+    def get_bank_asset_id(self):
+        """Returns bank asset id
+
+        :return: bank asset id
+        :rtype: int
+        """
+        return self.bank_asset_id
+
+    def get_oracle_app_id(self):
+        """Returns oracle app id
+
+        :return: oracle app id
+        :rtype: int
+        """
+        return self.oracle_app_id
+
+    def get_underlying_decimals(self):
+        """Returns decimals of asset
+
+        :return: decimals
+        :rtype: int
+        """
+        return self.underlying_decimals
+
+    def get_oracle_price_scale_factor(self):
+        """Returns oracle price scale factor
+
+        :return: oracle price scale factor
+        :rtype: int
+        """
+        return self.oracle_price_scale_factor
+
+    def get_raw_price(self):
+        """Returns the raw oracle price
+
+        :return: oracle price
+        :rtype: int
+        """
+        return self.oracle_raw_price
+
+    def get_price(self):
+        """Returns the dollarized oracle price
+
+        :return: oracle price
+        :rtype: float
+        """
+        return float(
+            (self.oracle_raw_price * 10**self.underlying_decimals)
+            / (self.oracle_price_scale_factor * 1e3)
+        )
+
+    def to_usd(self, amount):
+        """Return the usd value of the underlying amount (base units)
+
+        :param amount: integer amount of base underlying units
+        :type amount: int
+        :return: usd value
+        :rtype: float
+        """
+        return float(amount * self.get_price() / (10**self.underlying_decimals))
+
+    def get_scaled_amount(self, amount):
+        """Returns an integer representation of asset amount scaled by asset's decimals
+
+        :param amount: amount of asset
+        :type amount: float
+        :return: int amount of asset scaled by decimals
+        :rtype: int
+        """
+        return int(amount * 10**self.underlying_decimals)
+
+    def get_decimal_amount(self, amount):
+        """Returns an decimal representation of asset amount devided by asset's decimals
+
+        :param amount: amount of asset
+        :type amount: float
+        :return: amount of asset divided by decimals
+        :rtype: float
+        """
+        return amount / 10**self.underlying_decimals
+
+
+class MarketSnapshot(Immutable):
+    __slots__ = ("market_app_id", "market_address", "market_state", "asset")
+
+    def __init__(self, market_app_id, market_state, asset):
+        """Constructor method for an immutable view of a market's global state at one round.
+
+        :param market_app_id: market app id
+        :type market_app_id: int
+        :param market_state: dict of market global state
+        :type market_state: dict
+        :param asset: asset of the market at the same round
+        :type asset: :class:`AssetSnapshot`
+        """
+        set_field = partial(object.__setattr__, self)
+        set_field("market_app_id", market_app_id)
+        set_field("market_address", logic.get_application_address(market_app_id))
+        set_field("market_state", MappingProxyType(dict(market_state)))
+        set_field("asset", asset)
+
+    def get_market_app_id(self):
+        """Returns the app id for this market
+
+        :return: market app id
+        :rtype: int
+        """
+        return self.market_app_id
+
+    def get_market_address(self):
+        """Returns the address for this market
+
+        :return: market address
+        :rtype: string
+        """
+        return self.market_address
+
+    def get_market_state(self):
+        """Returns the read-only market global state
+
+        :return: market global state
+        :rtype: dict
+        """
+        return self.market_state
+
+    def get_market_counter(self):
+        """Returns the market counter for this market
+
+        :return: market counter
+        :rtype: int
+        """
+        return self.market_state[market_strings.manager_market_counter_var]
+
+    def get_asset(self):
+        """Returns asset snapshot for this market
+
+        :return: asset
+        :rtype: :class:`AssetSnapshot`
+        """
+        return self.asset
+
+    def get_active_collateral(self):
+        """Returns active_collateral for this market
+
+        :return: active_collateral
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.active_collateral, 0)
+
+    def get_bank_circulation(self):
+        """Returns bank_circulation for this market
+
+        :return: bank_circulation
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.bank_circulation, 0)
+
+    def get_bank_to_underlying_exchange(self):
+        """Returns bank_to_underlying_exchange for this market
+
+        :return: bank_to_underlying_exchange
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.bank_to_underlying_exchange, 0)
+
+    def get_underlying_borrowed(self):
+        """Returns underlying_borrowed for this market
+
+        :return: underlying_borrowed
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.underlying_borrowed, 0)
+
+    def get_outstanding_borrow_shares(self):
+        """Returns outstanding_borrow_shares for this market
+
+        :return: outstanding_borrow_shares
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.outstanding_borrow_shares, 0)
+
+    def get_underlying_cash(self):
+        """Returns underlying_cash for this market
+
+        :return: underlying_cash
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.underlying_cash, 0)
+
+    def get_underlying_reserves(self):
+        """Returns underlying_reserves for this market
+
+        :return: underlying_reserves
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.underlying_reserves, 0)
+
+    def get_underlying_supplied(self):
+        """Returns underlying supplied = underlying_cash + underlying_borrowed - underlying_reserves for this market.
+        The mainnet STBL market was seeded with 1tn STBL, so this must be subtracted from the calculation.
+
+        :return: underlying supplied
+        :rtype: int
+        """
+        underlying_supplied = 0
+        if self.market_app_id == 465814278:
+            underlying_supplied += -int(1e18)
+        return (
+            underlying_supplied
+            + self.get_underlying_cash()
+            + self.get_underlying_borrowed()
+            - self.get_underlying_reserves()
+        )
+
+    def get_total_borrow_interest_rate(self):
+        """Returns total_borrow_interest_rate for this market
+
+        :return: total_borrow_interest_rate
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.total_borrow_interest_rate, 0)
+
+    def get_collateral_factor(self):
+        """Returns collateral_factor for this market
+
+        :return: collateral_factor
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.collateral_factor, None)
+
+    def get_liquidation_incentive(self):
+        """Returns liquidation_incentive for this market
+
+        :return: liquidation_incentive
+        :rtype: int
+        """
+        return self.market_state.get(market_strings.liquidation_incentive, None)
+
+    def compute_position(self, user_state):
+        """Returns the market position of a storage account computed from its market local state. Makes no
+        network reads.
+
+        :param user_state: dict of market local state of the storage account
+        :type user_state: dict
+        :return: market position
+        :rtype: :class:`MarketPosition`
+        """
+        asset = self.get_asset()
+        outstanding_borrow_shares = self.get_outstanding_borrow_shares()
+
+        active_collateral_bank = user_state.get(
+            market_strings.user_active_collateral, 0
+        )
+        active_collateral_underlying = int(
+            active_collateral_bank
+            * self.get_bank_to_underlying_exchange()
+            / SCALE_FACTOR
+        )
+        active_collateral_usd = asset.to_usd(active_collateral_underlying)
+        borrow_shares = user_state.get(market_strings.user_borrow_shares, 0)
+        borrow_underlying = (
+            int(
+                self.get_underlying_borrowed()
+                * borrow_shares
+                / outstanding_borrow_shares
+            )
+            if outstanding_borrow_shares > 0
+            else 0
+        )
+        return MarketPosition(
+            active_collateral_bank,
+            active_collateral_underlying,
+            active_collateral_usd,
+            active_collateral_usd
+            * self.get_collateral_factor()
+            / PARAMETER_SCALE_FACTOR,
+            borrow_shares,
+            borrow_underlying,
+            asset.to_usd(borrow_underlying),
+        )
+
+    def compute_storage_state(self, user_state):
+        """Returns the market position of a storage account computed from its market local state, in the format
+        of :meth:`Market.get_storage_state`. Makes no network reads.
+
+        :param user_state: dict of market local state of the storage account
+        :type user_state: dict
+        :return: market local state for address
+        :rtype: dict
+        """
+        return self.compute_position(user_state).to_dict()
+
+
+class ProtocolSnapshot(Immutable):
+    __slots__ = (
+        "round",
+        "manager_app_id",
+        "manager_state",
+        "rewards_program",
+        "ordered_symbols",
+        "active_symbols",
+        "markets",
+    )
+
+    def __init__(self, round, manager_app_id, manager_state, markets):
+        """Constructor method for an immutable view of the protocol at one round. All getters, usd conversions
+        and position computations run against the snapshot without network reads.
+
+        :param round: round the snapshot is pinned to
+        :type round: int
+        :param manager_app_id: manager app id
+        :type manager_app_id: int
+        :param manager_state: dict of manager global state
+        :type manager_state: dict
+        :param markets: dict of market snapshots by symbol, in contracts.json order
+        :type markets: dict
+        """
+        set_field = partial(object.__setattr__, self)
+        set_field("round", round)
+        set_field("manager_app_id", manager_app_id)
+        set_field("manager_state", MappingProxyType(dict(manager_state)))
+        set_field(
+            "rewards_program", RewardsProgram(None, None, dict(self.manager_state))
+        )
+        set_field("ordered_symbols", tuple(markets.keys()))
+        set_field("markets", MappingProxyType(dict(markets)))
+        # shared by the UserPosition records built from this snapshot
+        set_field(
+            "active_symbols",
+            self.ordered_symbols[: self.get_supported_market_count()],
+        )
+
+    # GETTERS
+
+    def get_round(self):
+        """Returns the round the snapshot is pinned to
+
+        :return: round
+        :rtype: int
+        """
+        return self.round
+
+    def get_manager_state(self):
+        """Returns the read-only manager global state
+
+        :return: manager global state
+        :rtype: dict
+        """
+        return self.manager_state
+
+    def get_supported_market_count(self):
+        """Return the supported market count
+
+        :return: supported market count
+        :rtype: int
+        """
+        return self.manager_state.get(manager_strings.supported_market_count, None)
+
+    def get_rewards_program(self):
+        """Return the rewards program
+
+        :return: rewards program
+        :rtype: :class:`RewardsProgram`
+        """
+        return self.rewards_program
+
+    def get_market(self, symbol):
+        """Returns the market snapshot for the given symbol
+
+        :param symbol: market symbol
+        :type symbol: string
+        :return: market
+        :rtype: :class:`MarketSnapshot`
+        """
+        return self.markets[symbol]
+
+    def get_markets(self):
+        """Returns the market snapshots by symbol
+
+        :return: markets dictionary
+        :rtype: dict
+        """
+        return self.markets
+
+    def get_asset(self, symbol):
+        """Returns the asset snapshot for the given symbol
+
+        :param symbol: market symbol
+        :type symbol: string
+        :return: asset
+        :rtype: :class:`AssetSnapshot`
+        """
+        return self.markets[symbol].get_asset()
+
+    def get_raw_prices(self):
+        """Returns a dictionary of raw oracle prices by symbol
+
+        :return: dictionary of int prices
+        :rtype: dict
+        """
+        return {
+            symbol: market.get_asset().get_raw_price()
+            for symbol, market in self.markets.items()
+        }
+
+    def get_prices(self):
+        """Returns a dictionary of dollarized float prices by symbol
+
+        :return: dictionary of float prices
+        :rtype: dict
+        """
+        return {
+            symbol: market.get_asset().get_price()
+            for symbol, market in self.markets.items()
+        }
+
+    def to_usd(self, symbol, amount):
+        """Return the usd value of an underlying amount (base units) of symbol
+
+        :param symbol: market symbol
+        :type symbol: string
+        :param amount: integer amount of base underlying units
+        :type amount: int
+        :return: usd value
+        :rtype: float
+        """
+        return self.markets[symbol].get_asset().to_usd(amount)
+
+    # USER FUNCTIONS
+
+    def get_active_symbols(self):
+        """Returns the symbols of the markets supported by the manager at the snapshot round
+
+        :return: list of symbols
+        :rtype: list
+        """
+        return list(self.active_symbols)
+
+    def get_position(self, account_info, include_manager=True):
+        """Returns the positions of a storage account in every active market. The account info should be fetched
+        at the snapshot round.
+
+        :param account_info: account info of the storage account as returned by the indexer ("account" field) or algod
+        :type account_info: dict
+        :param include_manager: include the manager local state, defaults to True
+        :type include_manager: bool, optional
+        :return: user position
+        :rtype: :class:`UserPosition`
+        """
+        local_states = get_local_states(account_info)
+        manager = None
+        if include_manager:
+            manager_storage_state = local_states.get(self.manager_app_id, {})
+            manager = ManagerStorageState(
+                manager_storage_state.get(
+                    manager_strings.user_global_max_borrow_in_dollars, 0
+                ),
+                manager_storage_state.get(
+                    manager_strings.user_global_borrowed_in_dollars, 0
+                ),
+            )
+        positions = []
+        for symbol in self.active_symbols:
+            market = self.markets[symbol]
+            positions.append(
+                market.compute_position(
+                    local_states.get(market.get_market_app_id(), {})
+                )
+            )
+        return UserPosition(
+            account_info.get("address", None),
+            manager,
+            self.active_symbols,
+            tuple(positions),
+        )
+
+    def get_storage_state(self, account_info, include_manager=True):
+        """Returns a dictionary with the lending market state of a storage account, in the format of
+        :meth:`Client.get_storage_state`. The account info should be fetched at the snapshot round.
+
+        :param account_info: account info of the storage account as returned by the indexer ("account" field) or algod
+        :type account_info: dict
+        :param include_manager: include the manager local state, defaults to True
+        :type include_manager: bool, optional
+        :return: state
+        :rtype: dict
+        """
+        return self.get_position(
+            account_info, include_manager=include_manager
+        ).to_dict()
+
+    def get_storage_unrealized_rewards(self, account_info, timestamp=None):
+        """Returns projected unrealized rewards of a storage account
+
+        :param account_info: account info of the storage account as returned by the indexer ("account" field) or algod
+        :type account_info: dict
+        :param timestamp: unix time to project rewards to, defaults to None (now)
+        :type timestamp: int, optional
+        :return: tuple of primary and secondary unrealized rewards
+        :rtype: (int, int)
+        """
+        local_states = get_local_states(account_info)
+        markets = [self.markets[symbol] for symbol in self.get_active_symbols()]
+        return self.rewards_program.compute_unrealized_rewards(
+            self.manager_state,
+            local_states.get(self.manager_app_id, {}),
+            markets,
+            [
+                market.compute_storage_state(
+                    local_states.get(market.get_market_app_id(), {})
+                )
+                for market in markets
+            ],
+            timestamp=timestamp,
+        )
+
+
+def make_market_snapshot(
+    market_app_id, market_state, oracle_state, underlying_decimals
+):
+    """Returns a :class:`MarketSnapshot` built from already read market and oracle global state of the same round
+
+    :param market_app_id: market app id
+    :type market_app_id: int
+    :param market_state: dict of market global state
+    :type market_state: dict
+    :param oracle_state: dict of global state of the market's oracle
+    :type oracle_state: dict
+    :param underlying_decimals: decimals of the underlying asset
+    :type underlying_decimals: int
+    :return: market snapshot
+    :rtype: :class:`MarketSnapshot`
+    """
+    oracle_app_id = market_state[market_strings.oracle_app_id]
+    oracle_price_field = market_state[market_strings.oracle_price_field]
+    if oracle_price_field not in oracle_state:
+        raise Exception("Key not found")
+    asset = AssetSnapshot(
+        market_state[market_strings.asset_id],
+        market_state[market_strings.bank_asset_id],
+        underlying_decimals,
+        oracle_app_id,
+        oracle_price_field,
+        market_state[market_strings.oracle_price_scale_factor],
+        oracle_state[oracle_price_field],
+    )
+    return MarketSnapshot(market_app_id, market_state, asset)
+
+
+def take_snapshot(
+    indexer_client: IndexerClient, manager, markets, round=None, max_workers=None
+):
+    """Returns a :class:`ProtocolSnapshot` with the manager state, the global state of every market and the price
+    of every oracle read concurrently, all pinned to the same round. Immutable asset metadata (decimals) is taken
+    from the live market assets.
+
+    :param indexer_client: a :class:`IndexerClient` supporting historical reads
+    :type indexer_client: :class:`IndexerClient`
+    :param manager: manager of the protocol
+    :type manager: :class:`Manager`
+    :param markets: dict of markets by symbol, in contracts.json order
+    :type markets: dict
+    :param round: round to pin the snapshot to, defaults to None (latest round of the indexer)
+    :type round: int, optional
+    :param max_workers: maximum number of concurrent indexer requests, defaults to DEFAULT_SNAPSHOT_MAX_WORKERS
+    :type max_workers: int, optional
+    :return: protocol snapshot
+    :rtype: :class:`ProtocolSnapshot`
+    """
+    if max_workers is None:
+        max_workers = DEFAULT_SNAPSHOT_MAX_WORKERS
+    if round is None:
+        round = indexer_client.health()["round"]
+
+    def read_state(app_id):
+        return read_global_state(indexer_client, app_id, block=round)
+
+    # wave 1: manager and market global state
+    app_ids = [manager.get_manager_app_id()] + [
+        market.get_market_app_id() for market in markets.values()
+    ]
+    states = concurrent_map(read_state, app_ids, max_workers)
+    manager_state = states[0]
+    market_states = dict(zip(markets.keys(), states[1:]))
+
+    # wave 2: oracle global state, each oracle app read once
+    oracle_app_ids = list(
+        dict.fromkeys(
+            [
+                market_state[market_strings.oracle_app_id]
+                for market_state in market_states.values()
+                if market_strings.oracle_app_id in market_state
+            ]
+        )
+    )
+    oracle_states = dict(
+        zip(oracle_app_ids, concurrent_map(read_state, oracle_app_ids, max_workers))
+    )
+
+    market_snapshots = {}
+    for symbol, market in markets.items():
+        market_state = market_states[symbol]
+        if not market_state.get(market_strings.asset_id, None):
+            continue
+        market_snapshots[symbol] = make_market_snapshot(
+            market.get_market_app_id(),
+            market_state,
+            oracle_states[market_state[market_strings.oracle_app_id]],
+            market.get_asset().get_underlying_decimals(),
+        )
+
+    return ProtocolSnapshot(
+        round, manager.get_manager_app_id(), manager_state, market_snapshots
+    )
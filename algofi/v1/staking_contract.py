@@ -17,6 +17,11 @@ class StakingContract:
         indexer_client: IndexerClient,
         historical_indexer_client: IndexerClient,
         staking_contract_info,
+        lazy=False,
+        metadata_cache=None,
+        registry=None,
+        state_backend=None,
+        price_epoch=None,
     ):
         """Constructor method for the generic client.
 
@@ -26,24 +31,44 @@ class StakingContract:
         :type historical_indexer_client: :class:`IndexerClient`
         :param staking_contract_info: dictionary of staking contract information
         :type staking_contract_info: dict
+        :param lazy: defer manager and market reads until a field is first accessed, defaults to False
+        :type lazy: bool, optional
+        :param metadata_cache: cache of immutable market and asset metadata, defaults to None
+        :type metadata_cache: :class:`MetadataCache`, optional
+        :param registry: registry to take the shared manager and market from, defaults to None
+        :type registry: :class:`AppRegistry`, optional
+        :param state_backend: backend for live and historical state reads, ignored if registry is given, defaults to reading from the indexers
+        :type state_backend: :class:`StateBackend`, optional
+        :param price_epoch: epoch deciding when the market oracle price is re-read, ignored if registry is given, defaults to None
+        :type price_epoch: :class:`PriceEpoch`, optional
         """
 
         self.indexer = indexer_client
         self.historical_indexer = historical_indexer_client
 
-        self.manager = Manager(
-            self.indexer,
-            self.historical_indexer,
-            staking_contract_info.get("managerAppId"),
-        )
-        self.market = Market(
-            self.indexer,
-            self.historical_indexer,
-            staking_contract_info.get("marketAppId"),
-        )
-
-        # read manager and market global state
-        self.update_global_state()
+        # manager and market read their global state on construction unless lazy
+        if registry is not None:
+            self.manager = registry.get_manager(
+                staking_contract_info.get("managerAppId")
+            )
+            self.market = registry.get_market(staking_contract_info.get("marketAppId"))
+        else:
+            self.manager = Manager(
+                self.indexer,
+                self.historical_indexer,
+                staking_contract_info.get("managerAppId"),
+                lazy=lazy,
+                state_backend=state_backend,
+            )
+            self.market = Market(
+                self.indexer,
+                self.historical_indexer,
+                staking_contract_info.get("marketAppId"),
+                lazy=lazy,
+                metadata_cache=metadata_cache,
+                state_backend=state_backend,
+                price_epoch=price_epoch,
+            )
 
     def update_global_state(self, block=None):
         """Method to fetch most recent staking contract global state
@@ -51,7 +76,6 @@ class StakingContract:
         :param block: block at which to get historical data
         :type block: int, optional
         """
-        indexer_client = self.historical_indexer if block else self.indexer
         self.get_manager().update_global_state(block=block)
         self.get_market().update_global_state(block=block)
 
@@ -0,0 +1,181 @@
+import os
+import json
+import base64
+from collections import OrderedDict
+from threading import Lock
+from algosdk import encoding
+from ..utils import format_state
+from ..contract_strings import algofi_manager_strings as manager_strings
+from .metadata_cache import DEFAULT_METADATA_CACHE_DIR
+
+# bump when the layout of the cache file changes, older files are then ignored
+STORAGE_ADDRESS_CACHE_VERSION = 1
+DEFAULT_STORAGE_ADDRESS_CACHE_SIZE = 100000
+
+
+class StorageAddressCache:
+    def __init__(
+        self, chain=None, path=None, max_size=DEFAULT_STORAGE_ADDRESS_CACHE_SIZE
+    ):
+        """Constructor method for a bounded LRU cache of user address to storage address, per manager app id.
+        A storage address does not change while a user stays opted in, so entries do not expire. A user which
+        closes out of the manager and opts in again gets a new storage address: call :meth:`invalidate`, or let
+        a :class:`BlockFollower` do it when it sees the opt in or close out. The cache can be shared by several
+        clients and persisted to disk when a chain is given.
+
+        :param chain: network the cached addresses belong to, required to load or save, defaults to None
+        :type chain: string e.g. 'testnet', optional
+        :param path: path of the cache file, defaults to ~/.cache/algofi-py-sdk/v1-<chain>-storage-addresses.json
+        :type path: string, optional
+        :param max_size: maximum number of cached addresses, defaults to DEFAULT_STORAGE_ADDRESS_CACHE_SIZE
+        :type max_size: int, optional
+        """
+
+        self.chain = chain
+        self.path = path
+        if not self.path and chain:
+            self.path = os.path.join(
+                DEFAULT_METADATA_CACHE_DIR, "v1-" + chain + "-storage-addresses.json"
+            )
+        self.max_size = max_size
+        self.lock = Lock()
+        self.dirty = False
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if self.path:
+            self.load()
+
+    def get_stats(self):
+        """Returns cache counters
+
+        :return: dict with hits, misses and size
+        :rtype: dict
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+    def get(self, manager_app_id, address):
+        """Returns the cached storage address of address for manager_app_id or None
+
+        :param manager_app_id: manager app id
+        :type manager_app_id: int
+        :param address: user address
+        :type address: string
+        :return: storage address
+        :rtype: string
+        """
+        key = (manager_app_id, address)
+        with self.lock:
+            storage_address = self.entries.get(key, None)
+            if storage_address is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return storage_address
+
+    def set(self, manager_app_id, address, storage_address):
+        """Caches the storage address of address for manager_app_id
+
+        :param manager_app_id: manager app id
+        :type manager_app_id: int
+        :param address: user address
+        :type address: string
+        :param storage_address: storage address
+        :type storage_address: string
+        """
+        key = (manager_app_id, address)
+        with self.lock:
+            if self.entries.get(key, None) != storage_address:
+                self.dirty = True
+            self.entries[key] = storage_address
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, manager_app_id, address):
+        """Drops the cached storage address of address, e.g. after the user closed out of the manager
+
+        :param manager_app_id: manager app id
+        :type manager_app_id: int
+        :param address: user address
+        :type address: string
+        """
+        with self.lock:
+            if self.entries.pop((manager_app_id, address), None) is not None:
+                self.dirty = True
+
+    def seed(self, manager_app_id, storage_accounts):
+        """Caches the user address of every storage account from account payloads, e.g. the pages of a
+        protocol-wide scan or :meth:`Client.get_storage_accounts` with verbose=True
+
+        :param manager_app_id: manager app id
+        :type manager_app_id: int
+        :param storage_accounts: account info dicts including apps-local-state
+        :type storage_accounts: list
+        :return: number of storage accounts cached
+        :rtype: int
+        """
+        seeded = 0
+        for account in storage_accounts:
+            for local_state in account.get("apps-local-state", []):
+                if local_state["id"] != manager_app_id:
+                    continue
+                raw_user_address = format_state(local_state.get("key-value", [])).get(
+                    manager_strings.user_address, None
+                )
+                if raw_user_address:
+                    user_address = encoding.encode_address(
+                        base64.b64decode(raw_user_address.strip())
+                    )
+                    self.set(manager_app_id, user_address, account["address"])
+                    seeded += 1
+        return seeded
+
+    def load(self):
+        """Loads the cache file from disk. Missing, unreadable, mismatched version or chain files are ignored."""
+        if not self.path:
+            raise Exception("Storage address cache has no path")
+        try:
+            with open(self.path, "r") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != STORAGE_ADDRESS_CACHE_VERSION
+            or data.get("chain") != self.chain
+        ):
+            return
+        for manager_app_id, addresses in data["addresses"].items():
+            for address, storage_address in addresses.items():
+                self.set(int(manager_app_id), address, storage_address)
+        with self.lock:
+            self.dirty = False
+
+    def save(self):
+        """Writes the cache file to disk if any entry changed since the last load or save. The file is
+        replaced atomically so concurrent readers never see a partial write.
+        """
+        if not self.path:
+            raise Exception("Storage address cache has no path")
+        with self.lock:
+            if not self.dirty:
+                return
+            addresses = {}
+            for (manager_app_id, address), storage_address in self.entries.items():
+                addresses.setdefault(str(manager_app_id), {})[address] = storage_address
+            data = {
+                "version": STORAGE_ADDRESS_CACHE_VERSION,
+                "chain": self.chain,
+                "addresses": addresses,
+            }
+            self.dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + "." + str(os.getpid()) + ".tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(data, cache_file)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,116 @@
+# This sample is provided for demonstration purposes only.
+# It is not intended for production use.
+# This example does not constitute trading advice.
+import sys
+import json
+import timeit
+from base64 import b64decode
+from algosdk.v2client.indexer import IndexerClient
+from algofi.utils import format_state, get_local_states, CONTRACTS_FPATH
+from algofi.contract_strings import algofi_market_strings as market_strings
+
+# usage:
+#   python benchmark_format_state.py        benchmark mainnet payloads read from the indexer
+#   python benchmark_format_state.py FILE   benchmark payloads saved as json: {"global-state": [...], "accounts": [...]}
+
+
+def legacy_format_state(state):
+    """format_state as implemented before the precomputed key table, for comparison"""
+    formatted = {}
+    for item in state:
+        key = item["key"]
+        value = item["value"]
+        try:
+            formatted_key = b64decode(key).decode("utf-8")
+        except:
+            formatted_key = b64decode(key)
+        if value["type"] == 1:
+            # byte string
+            try:
+                formatted_value = b64decode(value["bytes"]).decode("utf-8")
+            except:
+                formatted_value = value["bytes"]
+            formatted[formatted_key] = formatted_value
+        else:
+            # integer
+            formatted[formatted_key] = value["uint"]
+    return formatted
+
+
+def load_mainnet_payloads(account_count=200):
+    indexer = IndexerClient(
+        "",
+        "https://algoindexer.algoexplorerapi.io",
+        headers={"User-Agent": "algosdk"},
+    )
+    with open(CONTRACTS_FPATH, "r") as contracts_file:
+        config = json.load(contracts_file)["mainnet"]
+    manager_app_id = config["managerAppId"]
+    global_state = indexer.applications(manager_app_id)["application"]["params"][
+        "global-state"
+    ]
+    accounts = indexer.accounts(
+        limit=account_count, application_id=manager_app_id, exclude="assets"
+    )["accounts"]
+    return {"global-state": global_state, "accounts": accounts}
+
+
+def benchmark(name, function, number):
+    seconds = min(timeit.repeat(function, number=number, repeat=5)) / number
+    print("%-48s %10.2f us" % (name, seconds * 1e6))
+    return seconds
+
+
+if len(sys.argv) > 1:
+    with open(sys.argv[1], "r") as payload_file:
+        payloads = json.load(payload_file)
+else:
+    payloads = load_mainnet_payloads()
+
+global_state = payloads["global-state"]
+local_states = [
+    local_state.get("key-value", [])
+    for account in payloads["accounts"]
+    for local_state in account.get("apps-local-state", [])
+]
+print(
+    "manager global state keys = %d, local states = %d"
+    % (len(global_state), len(local_states))
+)
+
+# both implementations must agree before they are compared
+assert format_state(global_state) == legacy_format_state(global_state)
+for key_value in local_states:
+    assert format_state(key_value) == legacy_format_state(key_value)
+
+legacy = benchmark(
+    "legacy format_state(global state)",
+    lambda: legacy_format_state(global_state),
+    1000,
+)
+current = benchmark(
+    "format_state(global state)", lambda: format_state(global_state), 1000
+)
+print("speedup = %.1fx" % (legacy / current))
+
+legacy = benchmark(
+    "legacy format_state(all local states)",
+    lambda: [legacy_format_state(key_value) for key_value in local_states],
+    20,
+)
+current = benchmark(
+    "format_state(all local states)",
+    lambda: [format_state(key_value) for key_value in local_states],
+    20,
+)
+print("speedup = %.1fx" % (legacy / current))
+
+fields = (market_strings.user_active_collateral, market_strings.user_borrow_shares)
+current = benchmark(
+    "get_local_states(accounts, position fields)",
+    lambda: [
+        get_local_states(account, fields=fields) for account in payloads["accounts"]
+    ],
+    20,
+)
+print("speedup = %.1fx" % (legacy / current))
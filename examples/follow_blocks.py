@@ -0,0 +1,55 @@
+# This sample is provided for demonstration purposes only.
+# It is not intended for production use.
+# This example does not constitute trading advice.
+import sys
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+from algofi.v1.client import AlgofiMainnetClient
+from algofi.v1.block_follower import BlockFollower, BlockReplayClient
+from algofi.utils import AlgodStateBackend, IndexerStateBackend, CachedStateBackend
+
+# usage:
+#   python follow_blocks.py                      follow mainnet live
+#   python follow_blocks.py record FIRST LAST F  record rounds FIRST..LAST to the json file F
+#   python follow_blocks.py replay F             replay the blocks recorded in F
+
+algod = AlgodClient(
+    "", "https://node.algoexplorerapi.io", headers={"User-Agent": "algosdk"}
+)
+indexer = IndexerClient(
+    "", "https://algoindexer.algoexplorerapi.io", headers={"User-Agent": "algosdk"}
+)
+
+if len(sys.argv) > 1 and sys.argv[1] == "record":
+    first_round, last_round, path = int(sys.argv[2]), int(sys.argv[3]), sys.argv[4]
+    BlockReplayClient.record(algod, first_round, last_round).save(path)
+    sys.exit()
+
+# live state is read from algod and cached until a block touches it
+state_backend = CachedStateBackend(
+    AlgodStateBackend(algod, IndexerStateBackend(indexer)), ttl=None
+)
+client = AlgofiMainnetClient(
+    algod_client=algod, indexer_client=indexer, state_backend=state_backend
+)
+
+
+def print_update(update):
+    print(
+        "round =",
+        update["round"],
+        "algofi apps touched =",
+        sorted(update["app_ids"]),
+        "objects refreshed =",
+        update["refreshed"],
+    )
+
+
+if len(sys.argv) > 1 and sys.argv[1] == "replay":
+    replay = BlockReplayClient.load(sys.argv[2])
+    follower = BlockFollower(client, algod_client=replay, callback=print_update)
+    follower.follow(max_rounds=len(replay.rounds))
+else:
+    follower = BlockFollower(client, callback=print_update)
+    follower.follow()
+print(state_backend.get_stats())
@@ -0,0 +1,43 @@
+# This sample is provided for demonstration purposes only.
+# It is not intended for production use.
+# This example does not constitute trading advice.
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+from algofi.v1.client import AlgofiMainnetClient
+from algofi.v1.block_follower import BlockFollower
+from algofi.v1.liquidation_scanner import LiquidationScanner
+
+algod = AlgodClient(
+    "", "https://node.algoexplorerapi.io", headers={"User-Agent": "algosdk"}
+)
+indexer = IndexerClient(
+    "", "https://algoindexer.algoexplorerapi.io", headers={"User-Agent": "algosdk"}
+)
+client = AlgofiMainnetClient(algod_client=algod, indexer_client=indexer)
+
+# every storage account is loaded once, then kept current block by block
+scanner = LiquidationScanner(client)
+print(
+    "storage accounts =",
+    scanner.get_account_count(),
+    "borrowing =",
+    scanner.get_queued_count(),
+)
+
+
+def print_candidates(update):
+    revalued = scanner.process_update(update)
+    print("round =", update["round"], "accounts revalued =", revalued)
+    for health in scanner.top_candidates(5):
+        print(
+            "  %s utilization = %.4f shortfall = %.2f seize = %s"
+            % (
+                health.get_storage_address(),
+                health.get_borrow_utilization(),
+                health.get_shortfall_usd(),
+                ",".join(health.get_seizable_symbols()),
+            )
+        )
+
+
+BlockFollower(client, callback=print_candidates).follow()
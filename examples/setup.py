@@ -31,9 +31,10 @@ for passphrase in ["mnemonic"]:
 
     # Opting primary account into the available assets
     assets = client.get_active_asset_ids() + client.get_active_bank_asset_ids()
+    account_view = client.get_account_view(sender)
     for i in range(len(assets)):
         asset_id = assets[i]
-        if asset_id != 1 and not client.is_opted_into_asset(asset_id, sender):
+        if asset_id != 1 and not account_view.is_opted_into_asset(asset_id):
             print("Opting into asa: ", asset_id)
             txn = prepare_asset_optin_transactions(
                 asset_id, sender, client.get_default_params()
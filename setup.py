@@ -18,6 +18,7 @@ setuptools.setup(
     },
     packages=setuptools.find_packages(),
     python_requires=">=3.8",
+    extras_require={"numpy": ["numpy"]},
     package_data={"algofi.v1": ["contracts.json"]},
     include_package_data=True,
 )
@@ -0,0 +1,325 @@
+import base64
+import collections
+import hashlib
+import json
+import os
+import pytest
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.transaction import SuggestedParams
+from algosdk.v2client.algod import AlgodClient
+from algofi.utils import AlgodStateBackend
+from algofi.v1.client import Client
+from algofi.contract_strings import algofi_manager_strings as manager_strings
+from algofi.contract_strings import algofi_market_strings as market_strings
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+CHAIN = "mainnet"
+CONFIG = json.load(
+    open(
+        os.path.join(os.path.dirname(__file__), "..", "algofi", "v1", "contracts.json")
+    )
+)[CHAIN]
+GENESIS_HASH = "wGHE2Pwdvd7S12BL5FaOP20EGYesN73ktiC1qzkkit8="
+FIRST_ORACLE_APP_ID = 9000
+ORACLE_COUNT = 4
+START_ROUND = 1000
+
+
+def make_address(seed):
+    """Returns a deterministic address for seed, with public key bytes that are not utf-8 like real ones"""
+    public_key = hashlib.sha256(str(seed).encode()).digest()
+    while True:
+        try:
+            public_key.decode("utf-8")
+        except UnicodeDecodeError:
+            return encoding.encode_address(public_key)
+        public_key = hashlib.sha256(public_key).digest()
+
+
+def key_value(key, value):
+    """Returns a global or local state entry as returned by the indexer and algod"""
+    key = key if isinstance(key, bytes) else key.encode()
+    if isinstance(value, int):
+        encoded = {"type": 2, "uint": value, "bytes": ""}
+    else:
+        value = value if isinstance(value, bytes) else value.encode()
+        encoded = {"type": 1, "uint": 0, "bytes": base64.b64encode(value).decode()}
+    return {"key": base64.b64encode(key).decode(), "value": encoded}
+
+
+def get_oracle_app_id(index):
+    """Returns the oracle app id of the market with the given index, four oracles are shared by the markets"""
+    return FIRST_ORACLE_APP_ID + index % ORACLE_COUNT
+
+
+class Network:
+    """In memory state of the applications, assets and accounts of one chain, served by :class:`Indexer` and
+    :class:`Algod`. Counts the requests made against it.
+    """
+
+    def __init__(self):
+        self.round = START_ROUND
+        self.requests = collections.Counter()
+        self.apps = {}
+        self.assets = {}
+        self.accounts = {}
+        manager_app_id = CONFIG["managerAppId"]
+        manager_state = [
+            key_value(
+                manager_strings.supported_market_count, CONFIG["supportedMarketCount"]
+            ),
+            key_value(manager_strings.n_rewards_programs, 1),
+            key_value(manager_strings.rewards_amount, 10**9),
+            key_value(manager_strings.rewards_per_second, 100),
+            key_value(manager_strings.rewards_asset_id, 555),
+            key_value(manager_strings.rewards_secondary_ratio, 500),
+            key_value(manager_strings.rewards_secondary_asset_id, 0),
+            key_value(manager_strings.rewards_bitmap, 0b1111111),
+            key_value(manager_strings.rewards_dist_by_market, 0x1111111),
+            key_value(manager_strings.latest_rewards_time, 1),
+        ]
+        for index, symbol in enumerate(CONFIG["SYMBOLS"]):
+            info = CONFIG["SYMBOL_INFO"][symbol]
+            manager_state.append(
+                key_value(
+                    info["marketCounter"].to_bytes(8, "big")
+                    + manager_strings.counter_indexed_rewards_coefficient.encode(),
+                    10**12,
+                )
+            )
+            self.set_market(info, get_oracle_app_id(index))
+        self.apps[manager_app_id] = manager_state
+        for staking_contract in CONFIG["STAKING_CONTRACTS"].values():
+            self.apps[staking_contract["managerAppId"]] = list(manager_state)
+            self.set_market(
+                dict(staking_contract, marketCounter=1), FIRST_ORACLE_APP_ID
+            )
+        for index in range(ORACLE_COUNT):
+            self.set_oracle_price(FIRST_ORACLE_APP_ID + index, (index + 1) * 10**6)
+
+    def set_market(self, info, oracle_app_id, **balances):
+        """Sets the global state of the market of info, balances are keyword arguments named after
+        :mod:`algofi_market_strings` fields
+        """
+        if "underlyingAssetId" not in info:
+            self.apps[info["marketAppId"]] = [
+                key_value(
+                    market_strings.manager_market_counter_var, info["marketCounter"]
+                )
+            ]
+            return
+        state = {
+            market_strings.manager_market_counter_var: info["marketCounter"],
+            market_strings.asset_id: info["underlyingAssetId"],
+            market_strings.bank_asset_id: info["bankAssetId"],
+            market_strings.oracle_app_id: oracle_app_id,
+            market_strings.oracle_price_field: "price",
+            market_strings.oracle_price_scale_factor: 1000,
+            market_strings.collateral_factor: 800,
+            market_strings.liquidation_incentive: 100,
+            market_strings.reserve_factor: 100,
+            market_strings.active_collateral: 10**10,
+            market_strings.bank_circulation: 10**10,
+            market_strings.bank_to_underlying_exchange: 2 * 10**9,
+            market_strings.underlying_borrowed: 5 * 10**9,
+            market_strings.outstanding_borrow_shares: 10**9,
+            market_strings.underlying_cash: 10**10,
+            market_strings.underlying_reserves: 10**6,
+            market_strings.total_borrow_interest_rate: 5,
+        }
+        for name, value in balances.items():
+            state[getattr(market_strings, name)] = value
+        self.apps[info["marketAppId"]] = [
+            key_value(key, value) for key, value in state.items()
+        ]
+        for asset_id in (info["underlyingAssetId"], info["bankAssetId"]):
+            self.assets[asset_id] = {"decimals": 6, "name": "A" + str(asset_id)}
+
+    def set_market_state(self, symbol, **balances):
+        index = CONFIG["SYMBOLS"].index(symbol)
+        self.set_market(
+            CONFIG["SYMBOL_INFO"][symbol], get_oracle_app_id(index), **balances
+        )
+
+    def set_oracle_price(self, oracle_app_id, raw_price):
+        self.apps[oracle_app_id] = [key_value("price", raw_price)]
+
+    def add_user(self, user_address, storage_address, positions):
+        """Opts user_address in with storage_address holding positions, a dict of symbol to (active collateral
+        bank, borrow shares). Every storage account is opted into the first market, which account scans page.
+        """
+        manager_app_id = CONFIG["managerAppId"]
+        self.accounts[user_address] = {
+            "address": user_address,
+            "amount": 10**6,
+            "apps-local-state": [
+                {
+                    "id": manager_app_id,
+                    "key-value": [
+                        key_value(
+                            manager_strings.user_storage_address,
+                            encoding.decode_address(storage_address),
+                        )
+                    ],
+                }
+            ],
+        }
+        positions = dict(positions)
+        positions.setdefault(CONFIG["SYMBOLS"][0], (0, 0))
+        local_states = [
+            {
+                "id": manager_app_id,
+                "key-value": [
+                    key_value(
+                        manager_strings.user_address,
+                        encoding.decode_address(user_address),
+                    ),
+                    key_value(manager_strings.user_global_max_borrow_in_dollars, 0),
+                    key_value(manager_strings.user_global_borrowed_in_dollars, 0),
+                ],
+            }
+        ]
+        for symbol, (collateral_bank, borrow_shares) in positions.items():
+            local_states.append(
+                {
+                    "id": CONFIG["SYMBOL_INFO"][symbol]["marketAppId"],
+                    "key-value": [
+                        key_value(
+                            market_strings.user_active_collateral, collateral_bank
+                        ),
+                        key_value(market_strings.user_borrow_shares, borrow_shares),
+                    ],
+                }
+            )
+        self.accounts[storage_address] = {
+            "address": storage_address,
+            "amount": 10**7,
+            "apps-local-state": local_states,
+        }
+
+
+class Indexer:
+    def __init__(self, network):
+        self.network = network
+
+    def health(self):
+        self.network.requests["health"] += 1
+        return {"round": self.network.round}
+
+    def applications(self, application_id, round_num=None):
+        self.network.requests["applications"] += 1
+        if application_id not in self.network.apps:
+            raise Exception("no application " + str(application_id))
+        return {
+            "application": {
+                "id": application_id,
+                "created-at-round": 1,
+                "params": {"global-state": self.network.apps[application_id]},
+            },
+            "current-round": self.network.round,
+        }
+
+    def asset_info(self, asset_id):
+        self.network.requests["asset_info"] += 1
+        return {"asset": {"index": asset_id, "params": self.network.assets[asset_id]}}
+
+    def account_info(self, address, round_num=None):
+        self.network.requests["account_info"] += 1
+        if address not in self.network.accounts:
+            raise Exception("no account " + address)
+        return {
+            "account": self.network.accounts[address],
+            "current-round": self.network.round,
+        }
+
+    def accounts(
+        self, limit=None, next_page=None, application_id=None, round_num=None, **kwargs
+    ):
+        self.network.requests["accounts"] += 1
+        accounts = [
+            account
+            for account in self.network.accounts.values()
+            if any(
+                local_state["id"] == application_id
+                for local_state in account.get("apps-local-state", [])
+            )
+        ]
+        start = int(next_page) if next_page else 0
+        page = {
+            "accounts": accounts[start : start + limit],
+            "current-round": self.network.round,
+        }
+        if start + limit < len(accounts):
+            page["next-token"] = str(start + limit)
+        return page
+
+
+class Algod(AlgodClient):
+    def __init__(self, network):
+        self.network = network
+
+    def status(self):
+        self.network.requests["status"] += 1
+        return {"last-round": self.network.round}
+
+    def suggested_params(self):
+        self.network.requests["suggested_params"] += 1
+        return SuggestedParams(
+            1000,
+            self.network.round,
+            self.network.round + 1000,
+            GENESIS_HASH,
+            "mainnet-v1.0",
+            flat_fee=True,
+        )
+
+    def application_info(self, application_id):
+        self.network.requests["application_info"] += 1
+        return {
+            "id": application_id,
+            "params": {"global-state": self.network.apps[application_id]},
+        }
+
+    def account_info(self, address, **kwargs):
+        self.network.requests["algod_account_info"] += 1
+        return dict(self.network.accounts[address], round=self.network.round)
+
+    def account_application_info(self, address, application_id):
+        self.network.requests["account_application_info"] += 1
+        for local_state in self.network.accounts[address].get("apps-local-state", []):
+            if local_state["id"] == application_id:
+                return {
+                    "round": self.network.round,
+                    "app-local-state": local_state,
+                }
+        raise AlgodHTTPError("account application info not found", 404)
+
+
+@pytest.fixture
+def network():
+    return Network()
+
+
+@pytest.fixture
+def client(network):
+    return Client(
+        Algod(network),
+        Indexer(network),
+        Indexer(network),
+        make_address(1),
+        CHAIN,
+    )
+
+
+@pytest.fixture
+def algod_client(network):
+    algod = Algod(network)
+    return Client(
+        algod,
+        Indexer(network),
+        Indexer(network),
+        make_address(1),
+        CHAIN,
+        state_backend=AlgodStateBackend(algod),
+    )
@@ -0,0 +1,198 @@
+import os
+from algosdk import encoding
+from algofi.utils import CachedStateBackend, IndexerStateBackend
+from algofi.v1.block_follower import (
+    BlockFollower,
+    BlockReplayClient,
+    get_block_opt_ins,
+    get_block_references,
+)
+from algofi.v1.client import Client
+from conftest import (
+    CHAIN,
+    CONFIG,
+    FIXTURES_DIR,
+    Algod,
+    Indexer,
+    get_oracle_app_id,
+    make_address,
+)
+
+# hand-written blocks in the algod json format, not recorded from a node: round 1001 calls the manager and the
+# USDC market with the user storage account, round 1002 calls an oracle from an inner transaction of an unrelated
+# app and round 1003 is empty
+BLOCKS_PATH = os.path.join(FIXTURES_DIR, "synthetic_blocks.json")
+MANAGER_APP_ID = CONFIG["managerAppId"]
+USDC_APP_ID = CONFIG["SYMBOL_INFO"]["USDC"]["marketAppId"]
+USER_ADDRESS = make_address(1)
+STORAGE_ADDRESS = make_address(2)
+RECEIVER_ADDRESS = make_address(3)
+MARKET_ADDRESS = make_address(4)
+ORACLE_ADDRESS = make_address(5)
+# the oracle called from the inner transaction of round 1002, shared by the USDC and vALGO markets
+USDC_ORACLE_APP_ID = get_oracle_app_id(CONFIG["SYMBOLS"].index("USDC"))
+
+
+def replay(client, **kwargs):
+    updates = []
+    follower = BlockFollower(
+        client,
+        algod_client=BlockReplayClient.load(BLOCKS_PATH),
+        callback=updates.append,
+        **kwargs
+    )
+    follower.follow(round=1000, max_rounds=3)
+    assert follower.get_round() == 1003
+    return updates
+
+
+def test_replay_reports_touched_apps_and_addresses(network, client):
+    network.add_user(USER_ADDRESS, STORAGE_ADDRESS, {"USDC": (10**6, 10**5)})
+    client.get_prices()
+    client.get_user_state()
+
+    updates = replay(client)
+
+    assert [update["round"] for update in updates] == [1001, 1002, 1003]
+    # the manager and USDC market calls, with the accounts of the payment, the call and its inner transfer
+    assert updates[0]["app_ids"] == {MANAGER_APP_ID, USDC_APP_ID}
+    assert updates[0]["addresses"] == {
+        USER_ADDRESS,
+        STORAGE_ADDRESS,
+        RECEIVER_ADDRESS,
+        MARKET_ADDRESS,
+    }
+    assert updates[0]["refreshed"] == 2
+    # app 777 is not algofi, the oracle it calls from an inner transaction prices two loaded assets
+    assert updates[1]["app_ids"] == {USDC_ORACLE_APP_ID}
+    assert updates[1]["addresses"] == {RECEIVER_ADDRESS, ORACLE_ADDRESS}
+    assert updates[1]["refreshed"] == 2
+    assert updates[2] == {
+        "round": 1003,
+        "app_ids": set(),
+        "addresses": set(),
+        "refreshed": 0,
+    }
+
+
+def get_held_raw_price(client, symbol):
+    return client.get_market(symbol).get_asset().get_raw_price(update=False)
+
+
+def test_replay_refreshes_only_touched_state(network, client):
+    client.get_prices()
+    usdc_borrowed = client.get_market("USDC").get_underlying_borrowed()
+    gobtc_borrowed = client.get_market("goBTC").get_underlying_borrowed()
+    algo_raw_price = get_held_raw_price(client, "ALGO")
+
+    network.set_market_state("USDC", underlying_borrowed=usdc_borrowed + 1)
+    network.set_market_state("goBTC", underlying_borrowed=gobtc_borrowed + 1)
+    network.set_oracle_price(USDC_ORACLE_APP_ID, 3 * 10**6)
+    network.set_oracle_price(get_oracle_app_id(0), 7 * 10**6)
+
+    replay(client)
+
+    assert client.get_market("USDC").get_underlying_borrowed() == usdc_borrowed + 1
+    assert client.get_market("goBTC").get_underlying_borrowed() == gobtc_borrowed
+    # held raw prices, get_prices would read every oracle again without a price epoch
+    assert get_held_raw_price(client, "USDC") == 3 * 10**6
+    assert get_held_raw_price(client, "vALGO") == 3 * 10**6
+    assert get_held_raw_price(client, "ALGO") == algo_raw_price
+
+
+def test_replay_invalidates_referenced_accounts(network):
+    indexer = Indexer(network)
+    state_backend = CachedStateBackend(IndexerStateBackend(indexer), ttl=None)
+    client = Client(
+        Algod(network),
+        indexer,
+        indexer,
+        USER_ADDRESS,
+        CHAIN,
+        state_backend=state_backend,
+    )
+    network.add_user(USER_ADDRESS, STORAGE_ADDRESS, {"USDC": (10**6, 10**5)})
+    # an account outside the manager and the markets called in the replayed blocks
+    other_market_app_id = CONFIG["SYMBOL_INFO"]["goBTC"]["marketAppId"]
+    network.accounts[make_address(7)] = {
+        "address": make_address(7),
+        "amount": 10**6,
+        "apps-local-state": [{"id": other_market_app_id, "key-value": []}],
+    }
+    for address in (STORAGE_ADDRESS, make_address(7)):
+        state_backend.read_account(address)
+    account_reads = network.requests["account_info"]
+
+    replay(client)
+
+    # the storage account referenced in round 1001 is read again, the other account stays cached
+    state_backend.read_account(STORAGE_ADDRESS)
+    state_backend.read_account(make_address(7))
+    assert network.requests["account_info"] == account_reads + 1
+
+
+def test_block_references_decode_raw_addresses():
+    # msgpack blocks carry raw public keys instead of encoded addresses
+    raw_sender = encoding.decode_address(USER_ADDRESS)
+    raw_account = encoding.decode_address(STORAGE_ADDRESS)
+    block = {
+        "txns": [
+            {
+                "txn": {
+                    "type": "appl",
+                    "snd": raw_sender,
+                    "apid": USDC_APP_ID,
+                    "apat": [raw_account],
+                }
+            },
+            {"txn": {"type": "appl", "snd": raw_sender}},
+        ]
+    }
+    assert get_block_references(block) == (
+        {USDC_APP_ID},
+        {USER_ADDRESS, STORAGE_ADDRESS},
+    )
+
+
+def test_opt_ins_and_close_outs_drop_cached_storage_addresses(network, client):
+    cache = client.storage_address_cache
+    closing_address = make_address(8)
+    cache.set(MANAGER_APP_ID, USER_ADDRESS, STORAGE_ADDRESS)
+    cache.set(MANAGER_APP_ID, closing_address, make_address(9))
+    # the inner close out of app 777 on behalf of another user
+    block = {
+        "txns": [
+            {"txn": {"type": "appl", "snd": USER_ADDRESS, "apid": MANAGER_APP_ID}},
+            {
+                "txn": {"type": "appl", "snd": RECEIVER_ADDRESS, "apid": 777},
+                "dt": {
+                    "itx": [
+                        {
+                            "txn": {
+                                "type": "appl",
+                                "snd": closing_address,
+                                "apid": MANAGER_APP_ID,
+                                "apan": 2,
+                            }
+                        }
+                    ]
+                },
+            },
+        ]
+    }
+    assert get_block_opt_ins(block) == {(MANAGER_APP_ID, closing_address)}
+
+    follower = BlockFollower(client, algod_client=BlockReplayClient({1001: block}))
+    follower.follow(round=1000, max_rounds=1)
+
+    assert cache.get(MANAGER_APP_ID, closing_address) is None
+    assert cache.get(MANAGER_APP_ID, USER_ADDRESS) == STORAGE_ADDRESS
+
+
+def test_prepared_opt_in_drops_cached_storage_address(network, client):
+    client.storage_address_cache.set(MANAGER_APP_ID, USER_ADDRESS, STORAGE_ADDRESS)
+    network.add_user(USER_ADDRESS, make_address(9), {})
+
+    client.prepare_optin_transactions(make_address(9))
+
+    assert client.manager.get_storage_address(USER_ADDRESS) == make_address(9)
@@ -0,0 +1,146 @@
+import math
+import pytest
+from algofi.v1 import client as client_module
+from algofi.v1.client import Client
+from conftest import (
+    CHAIN,
+    CONFIG,
+    START_ROUND,
+    Algod,
+    Indexer,
+    get_oracle_app_id,
+    make_address,
+)
+
+STORAGE_ADDRESS = make_address(2)
+ALGO_ORACLE_APP_ID = get_oracle_app_id(CONFIG["SYMBOLS"].index("ALGO"))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(client_module, "monotonic", clock)
+    return clock
+
+
+def add_borrower(network, user_seed=1, storage_address=STORAGE_ADDRESS):
+    # ALGO collateral against a USDC borrow, each priced by its own oracle
+    network.add_user(
+        make_address(user_seed),
+        storage_address,
+        {"ALGO": (10**7, 0), "USDC": (0, 10**6)},
+    )
+
+
+def test_health_matches_storage_state(network, client):
+    add_borrower(network)
+    snapshot = client.snapshot()
+    expected = snapshot.get_storage_state(
+        network.accounts[STORAGE_ADDRESS], include_manager=False
+    )
+    max_borrow_usd = sum(
+        state["active_collateral_max_borrow_usd"] for state in expected.values()
+    )
+    borrow_usd = sum(state["borrow_usd"] for state in expected.values())
+
+    health = client.get_health(STORAGE_ADDRESS, snapshot=snapshot)
+
+    assert health.get_storage_address() == STORAGE_ADDRESS
+    assert health.get_round() == snapshot.get_round() == START_ROUND
+    assert health.max_borrow_usd == pytest.approx(max_borrow_usd)
+    assert health.borrow_usd == pytest.approx(borrow_usd)
+    assert health.get_borrow_utilization() == pytest.approx(borrow_usd / max_borrow_usd)
+    assert health.get_shortfall_usd() == 0
+    assert not health.is_liquidatable()
+    assert health.get_seizable_symbols() == ("ALGO",)
+    assert health.borrowed_symbols == ("USDC",)
+
+
+def test_health_of_empty_and_uncollateralized_accounts(network, client):
+    network.add_user(make_address(1), STORAGE_ADDRESS, {})
+    network.add_user(make_address(3), make_address(4), {"USDC": (0, 10**6)})
+
+    empty = client.get_health(STORAGE_ADDRESS)
+    uncollateralized = client.get_health(make_address(4))
+
+    assert empty.get_borrow_utilization() == 0
+    assert empty.get_seizable_symbols() == ()
+    assert uncollateralized.get_borrow_utilization() == math.inf
+    assert uncollateralized.get_shortfall_usd() == uncollateralized.borrow_usd > 0
+    assert uncollateralized.is_liquidatable()
+
+
+def test_compute_health_keeps_the_given_round(network, client):
+    add_borrower(network)
+    snapshot = client.snapshot()
+    position = snapshot.get_position(
+        network.accounts[STORAGE_ADDRESS], include_manager=False
+    )
+
+    assert position.compute_health().get_round() is None
+    assert position.compute_health(round=1234).get_round() == 1234
+    assert position.compute_health(round=1234).to_dict() == dict(
+        position.compute_health().to_dict(), round=1234
+    )
+
+
+def test_healths_match_health(network, client):
+    add_borrower(network)
+    network.add_user(make_address(3), make_address(4), {"USDC": (0, 10**6)})
+    snapshot = client.snapshot()
+
+    scanned = dict(client.get_healths(snapshot=snapshot))
+    read = dict(
+        client.get_healths([STORAGE_ADDRESS, make_address(4)], snapshot=snapshot)
+    )
+
+    assert scanned == read
+    for storage_address, health in read.items():
+        assert health == client.get_health(storage_address, snapshot=snapshot)
+
+
+def test_cached_snapshot_is_taken_again_once_too_old(network, client, clock):
+    add_borrower(network)
+    healthy = client.get_health(STORAGE_ADDRESS)
+    assert not healthy.is_liquidatable()
+    # the collateral price crashes a few rounds later
+    network.round += 5
+    network.set_oracle_price(ALGO_ORACLE_APP_ID, 1)
+
+    clock.now = client.snapshot_max_age
+    assert client.get_health(STORAGE_ADDRESS) == healthy
+
+    clock.now = client.snapshot_max_age + 1
+    health = client.get_health(STORAGE_ADDRESS)
+    assert health.get_round() == START_ROUND + 5
+    assert health.is_liquidatable()
+    assert health.get_shortfall_usd() > 0
+    assert [health for _, health in client.get_healths([STORAGE_ADDRESS])] == [health]
+
+
+def test_cached_snapshot_without_max_age_is_kept(network, clock):
+    indexer = Indexer(network)
+    client = Client(
+        Algod(network),
+        indexer,
+        indexer,
+        make_address(1),
+        CHAIN,
+        snapshot_max_age=None,
+    )
+    add_borrower(network)
+    snapshot = client.get_cached_snapshot()
+    network.round += 5
+
+    clock.now = 10**6
+    assert client.get_cached_snapshot() is snapshot
+    assert client.get_health(STORAGE_ADDRESS).get_round() == START_ROUND
+    assert client.refresh_snapshot().get_round() == START_ROUND + 5
@@ -0,0 +1,158 @@
+import random
+import pytest
+from algofi.v1.liquidation_price_index import LiquidationPriceIndex
+from algofi.v1.position_table import PositionTable
+from conftest import make_address
+
+np = pytest.importorskip("numpy")
+
+STORAGE_ADDRESS = make_address(2)
+
+
+@pytest.fixture
+def snapshot(client):
+    return client.snapshot()
+
+
+def get_oracle_app_id(snapshot, symbol):
+    return snapshot.get_asset(symbol).get_oracle_app_id()
+
+
+def brute_force_liquidatable(table, raw_prices):
+    """Returns the accounts liquidatable at raw_prices by revaluing the whole table"""
+    snapshot = table.snapshot
+    assets = [snapshot.get_asset(symbol) for symbol in table.get_symbols()]
+    prices = np.array(
+        [
+            raw_prices[asset.get_oracle_app_id()]
+            * 10 ** asset.get_underlying_decimals()
+            / (asset.get_oracle_price_scale_factor() * 1e3)
+            for asset in assets
+        ]
+    )
+    health = table.compute_health(prices)
+    liquidatable = (health["borrow_usd"] > health["max_borrow_usd"]) & (
+        health["borrow_usd"] > 0
+    )
+    return set(np.array(table.get_storage_addresses())[liquidatable])
+
+
+def test_thresholds_of_one_account(network, client):
+    # ALGO collateral against a USDC borrow, each priced by its own oracle
+    network.add_user(
+        make_address(1), STORAGE_ADDRESS, {"ALGO": (10**7, 0), "USDC": (0, 10**6)}
+    )
+    snapshot = client.snapshot()
+    table = client.get_position_table(snapshot=snapshot)
+    index = LiquidationPriceIndex(table)
+    algo_oracle_app_id = get_oracle_app_id(snapshot, "ALGO")
+    usdc_oracle_app_id = get_oracle_app_id(snapshot, "USDC")
+    assert algo_oracle_app_id != usdc_oracle_app_id
+
+    health = table.compute_health()
+    max_borrow_usd = health["max_borrow_usd"][0]
+    borrow_usd = health["borrow_usd"][0]
+    assert 0 < borrow_usd < max_borrow_usd
+    raw_prices = index.get_raw_prices()
+    # max borrow is linear in the ALGO price and borrow in the USDC price
+    algo_threshold = raw_prices[algo_oracle_app_id] * borrow_usd / max_borrow_usd
+    usdc_threshold = raw_prices[usdc_oracle_app_id] * max_borrow_usd / borrow_usd
+
+    algo_thresholds = index.get_thresholds(algo_oracle_app_id)
+    assert algo_thresholds["up"] == []
+    assert [address for _, address in algo_thresholds["down"]] == [STORAGE_ADDRESS]
+    assert algo_thresholds["down"][0][0] == pytest.approx(algo_threshold)
+    usdc_thresholds = index.get_thresholds(usdc_oracle_app_id)
+    assert usdc_thresholds["down"] == []
+    assert usdc_thresholds["up"][0][0] == pytest.approx(usdc_threshold)
+
+    no_crossings = {"liquidatable": [], "recovered": []}
+    assert index.move(algo_oracle_app_id, int(algo_threshold * 1.01)) == no_crossings
+    assert index.get_liquidatable() == []
+    assert index.move(algo_oracle_app_id, int(algo_threshold * 0.99)) == {
+        "liquidatable": [STORAGE_ADDRESS],
+        "recovered": [],
+    }
+    assert index.get_liquidatable() == [STORAGE_ADDRESS]
+    # the ALGO move shifts the USDC threshold, which now lies below the current USDC price
+    assert index.move(usdc_oracle_app_id, raw_prices[usdc_oracle_app_id] // 2) == {
+        "liquidatable": [],
+        "recovered": [STORAGE_ADDRESS],
+    }
+    assert index.get_liquidatable() == []
+
+
+def test_oracles_reporting_a_zero_price(network, client):
+    # goBTC collateral against a USDC borrow, while the goBTC oracle reports no price
+    network.add_user(
+        make_address(1), STORAGE_ADDRESS, {"goBTC": (10**7, 0), "USDC": (0, 10**6)}
+    )
+    gobtc_oracle_app_id = get_oracle_app_id(client.snapshot(), "goBTC")
+    network.set_oracle_price(gobtc_oracle_app_id, 0)
+    table = client.get_position_table()
+    index = LiquidationPriceIndex(table)
+    raw_prices = index.get_raw_prices()
+    assert raw_prices[gobtc_oracle_app_id] == 0
+
+    assert index.get_liquidatable() == [STORAGE_ADDRESS]
+    assert index.get_liquidatable() == list(brute_force_liquidatable(table, raw_prices))
+    [(threshold, address)] = index.get_thresholds(gobtc_oracle_app_id)["down"]
+    assert address == STORAGE_ADDRESS and threshold > 0
+    assert index.move(gobtc_oracle_app_id, int(threshold * 1.01)) == {
+        "liquidatable": [],
+        "recovered": [STORAGE_ADDRESS],
+    }
+    raw_prices[gobtc_oracle_app_id] = int(threshold * 1.01)
+    assert brute_force_liquidatable(table, raw_prices) == set()
+
+
+def test_accounts_without_borrows_are_not_indexed(snapshot):
+    columns = len(snapshot.get_active_symbols())
+    table = PositionTable(
+        snapshot,
+        [STORAGE_ADDRESS],
+        np.full((1, columns), 10**6),
+        np.zeros((1, columns)),
+    )
+    index = LiquidationPriceIndex(table)
+    for oracle_app_id in index.get_oracle_app_ids():
+        assert index.get_thresholds(oracle_app_id) == {"up": [], "down": []}
+        assert index.move(oracle_app_id, 1) == {"liquidatable": [], "recovered": []}
+    assert index.get_liquidatable() == []
+
+
+def test_crossings_match_brute_force(snapshot):
+    generator = np.random.default_rng(24)
+    shape = (2000, len(snapshot.get_active_symbols()))
+    collateral_bank = generator.integers(0, 10**9, shape) * (
+        generator.random(shape) < 0.4
+    )
+    borrow_shares = generator.integers(0, 10**8, shape) * (
+        generator.random(shape) < 0.3
+    )
+    table = PositionTable(
+        snapshot,
+        [make_address(index) for index in range(shape[0])],
+        collateral_bank,
+        borrow_shares,
+    )
+    index = LiquidationPriceIndex(table)
+    raw_prices = index.get_raw_prices()
+    liquidatable = brute_force_liquidatable(table, raw_prices)
+    assert set(index.get_liquidatable()) == liquidatable
+
+    moves = random.Random(24)
+    crossing_count = 0
+    for _ in range(40):
+        oracle_app_id = moves.choice(index.get_oracle_app_ids())
+        raw_price = int(raw_prices[oracle_app_id] * moves.uniform(0.7, 1.4))
+        crossings = index.move(oracle_app_id, raw_price)
+        raw_prices[oracle_app_id] = raw_price
+        moved_liquidatable = brute_force_liquidatable(table, raw_prices)
+        assert set(crossings["liquidatable"]) == moved_liquidatable - liquidatable
+        assert set(crossings["recovered"]) == liquidatable - moved_liquidatable
+        assert set(index.get_liquidatable()) == moved_liquidatable
+        crossing_count += len(crossings["liquidatable"]) + len(crossings["recovered"])
+        liquidatable = moved_liquidatable
+    assert crossing_count > 0
+    assert index.get_raw_prices() == raw_prices
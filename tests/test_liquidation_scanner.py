@@ -0,0 +1,252 @@
+import os
+import random
+import pytest
+from algofi.utils import PARAMETER_SCALE_FACTOR
+from algofi.v1.block_follower import BlockFollower, BlockReplayClient
+from algofi.v1.liquidation_scanner import LiquidationScanner
+from conftest import CONFIG, FIXTURES_DIR, get_oracle_app_id, make_address
+
+SYMBOLS = ("ALGO", "USDC", "goBTC", "goETH", "STBL")
+ACCOUNT_COUNT = 400
+# the storage account referenced in round 1001 of the replayed blocks and the oracle called in round 1002
+BLOCKS_PATH = os.path.join(FIXTURES_DIR, "synthetic_blocks.json")
+REPLAYED_STORAGE_ADDRESS = make_address(2)
+USDC_ORACLE_APP_ID = get_oracle_app_id(CONFIG["SYMBOLS"].index("USDC"))
+
+
+@pytest.fixture
+def accounts(network):
+    """Storage accounts with random collateral and borrows, around a third of them liquidatable"""
+    generator = random.Random(23)
+    storage_addresses = []
+    for index in range(ACCOUNT_COUNT):
+        positions = {}
+        for symbol in generator.sample(SYMBOLS, 3):
+            positions[symbol] = (
+                generator.randrange(10**8),
+                generator.randrange(4 * 10**7) if generator.random() < 0.5 else 0,
+            )
+        storage_addresses.append(make_address(1000 + index))
+        network.add_user(make_address(3000 + index), storage_addresses[-1], positions)
+    return storage_addresses
+
+
+def get_utilizations(snapshot, network, storage_addresses, prices=None):
+    """Returns the borrow utilization of every borrowing account, revalued from its account info at prices"""
+    if prices is None:
+        prices = {}
+    utilizations = {}
+    for storage_address in storage_addresses:
+        position = snapshot.get_position(
+            network.accounts[storage_address], include_manager=False
+        )
+        max_borrow_usd = 0.0
+        borrow_usd = 0.0
+        for symbol, market_position in zip(position.symbols, position.positions):
+            asset = snapshot.get_asset(symbol)
+            usd_per_unit = prices.get(symbol, asset.get_price()) / 10 ** (
+                asset.get_underlying_decimals()
+            )
+            collateral_factor = (
+                snapshot.get_market(symbol).get_collateral_factor()
+                / PARAMETER_SCALE_FACTOR
+            )
+            max_borrow_usd += (
+                market_position.active_collateral_underlying
+                * usd_per_unit
+                * collateral_factor
+            )
+            borrow_usd += market_position.borrow_underlying * usd_per_unit
+        if any(
+            market_position.borrow_shares > 0 for market_position in position.positions
+        ):
+            utilizations[storage_address] = (
+                borrow_usd / max_borrow_usd if max_borrow_usd > 0 else float("inf")
+            )
+    return utilizations
+
+
+def assert_matches(scanner, utilizations):
+    expected = sorted(utilizations.values(), reverse=True)
+    candidates = scanner.top_candidates(50)
+    assert [health.get_borrow_utilization() for health in candidates] == pytest.approx(
+        expected[:50]
+    )
+    for health in candidates:
+        assert health.get_borrow_utilization() == pytest.approx(
+            utilizations[health.get_storage_address()]
+        )
+    liquidatable = {
+        storage_address
+        for storage_address, utilization in utilizations.items()
+        if utilization > 1
+    }
+    assert {
+        health.get_storage_address() for health in scanner.get_liquidatable()
+    } == liquidatable
+    return liquidatable
+
+
+def test_queue_matches_brute_force_before_and_after_price_moves(
+    network, client, accounts
+):
+    snapshot = client.snapshot()
+    scanner = LiquidationScanner(client, snapshot=snapshot)
+    assert scanner.get_account_count() == ACCOUNT_COUNT
+    utilizations = get_utilizations(snapshot, network, accounts)
+    assert scanner.get_queued_count() == len(utilizations)
+    liquidatable = assert_matches(scanner, utilizations)
+    assert 0 < len(liquidatable) < len(utilizations)
+
+    prices = scanner.get_prices()
+    moved = {"ALGO": prices["ALGO"] * 0.6, "goBTC": prices["goBTC"] * 1.3}
+    exposed = {
+        storage_address
+        for storage_address in accounts
+        if any(
+            symbol in moved and (bank > 0 or shares > 0)
+            for symbol, (bank, shares) in get_balances(network, storage_address).items()
+        )
+        and storage_address in utilizations
+    }
+    assert scanner.update_prices(moved) == len(exposed)
+    moved_liquidatable = assert_matches(
+        scanner, get_utilizations(snapshot, network, accounts, moved)
+    )
+    assert moved_liquidatable != liquidatable
+    # unchanged prices revalue nothing
+    assert scanner.update_prices(moved) == 0
+
+
+def get_balances(network, storage_address):
+    """Returns the (active collateral bank, borrow shares) of storage_address by symbol"""
+    balances = {}
+    for local_state in network.accounts[storage_address]["apps-local-state"]:
+        for symbol in SYMBOLS:
+            if CONFIG["SYMBOL_INFO"][symbol]["marketAppId"] == local_state["id"]:
+                values = [entry["value"]["uint"] for entry in local_state["key-value"]]
+                balances[symbol] = tuple(values)
+    return balances
+
+
+def test_stale_entries_are_skipped_and_compacted(network, client, accounts):
+    snapshot = client.snapshot()
+    scanner = LiquidationScanner(client, snapshot=snapshot)
+    queued = scanner.get_queued_count()
+    prices = scanner.get_prices()
+    # each move pushes a new entry per exposed account, the old ones stay in the heap until it is compacted
+    assert scanner.update_prices({"ALGO": prices["ALGO"] * 1.1}) > 0
+    assert len(scanner.heap) > queued
+    heap_sizes = []
+    for step in range(20):
+        scanner.update_prices({"ALGO": prices["ALGO"] * (1 + (step % 2) / 10)})
+        heap_sizes.append(len(scanner.heap))
+    assert max(heap_sizes) <= 2 * queued + 64
+    assert any(size < previous for previous, size in zip(heap_sizes, heap_sizes[1:]))
+    assert_matches(
+        scanner,
+        get_utilizations(snapshot, network, accounts, {"ALGO": prices["ALGO"] * 1.1}),
+    )
+
+    top = scanner.top_candidates(1)[0].get_storage_address()
+    scanner.remove_account(top)
+    # an account which repaid its borrows is tracked but no longer queued
+    repaid = scanner.top_candidates(1)[0].get_storage_address()
+    position = scanner.positions[repaid]
+    network.add_user(make_address(1), repaid, {"ALGO": (10**6, 0)})
+    scanner.refresh_accounts([repaid])
+    assert scanner.positions[repaid] is not position
+
+    candidates = scanner.top_candidates(queued)
+    assert len(candidates) == queued - 2
+    assert {top, repaid}.isdisjoint(
+        health.get_storage_address() for health in candidates
+    )
+    assert scanner.get_account_count() == ACCOUNT_COUNT - 1
+    assert scanner.get_queued_count() == queued - 2
+    # the entries of the removed and the repaid account are skipped, then dropped by the next compaction
+    generator = random.Random(23)
+    for _ in range(5):
+        scanner.update_prices({"ALGO": prices["ALGO"] * generator.uniform(0.5, 1.5)})
+        assert len(scanner.heap) <= 2 * scanner.get_queued_count() + 64
+
+
+def test_process_update_applies_a_replayed_block(network, client, accounts):
+    network.add_user(
+        make_address(1),
+        REPLAYED_STORAGE_ADDRESS,
+        {"ALGO": (10**8, 0), "USDC": (0, 10**6)},
+    )
+    snapshot = client.snapshot()
+    scanner = LiquidationScanner(client, snapshot=snapshot)
+    assert not scanner.get_health(REPLAYED_STORAGE_ADDRESS).is_liquidatable()
+    # the replayed account borrows more and the USDC oracle doubles its price
+    network.add_user(
+        make_address(1),
+        REPLAYED_STORAGE_ADDRESS,
+        {"ALGO": (10**8, 0), "USDC": (0, 10**7)},
+    )
+    raw_price = snapshot.get_asset("USDC").get_raw_price()
+    network.set_oracle_price(USDC_ORACLE_APP_ID, 2 * raw_price)
+    updates = []
+
+    def callback(update):
+        updates.append(scanner.process_update(update))
+
+    follower = BlockFollower(
+        client, algod_client=BlockReplayClient.load(BLOCKS_PATH), callback=callback
+    )
+    follower.follow(round=1000, max_rounds=3)
+
+    prices = {
+        symbol: client.get_market(symbol).get_asset().get_price(update=False)
+        for symbol in ("USDC", "vALGO")
+    }
+    assert prices["USDC"] == pytest.approx(2 * snapshot.get_asset("USDC").get_price())
+    assert scanner.get_prices()["USDC"] == prices["USDC"]
+    # round 1001 only rereads the account, round 1002 revalues the accounts exposed to USDC or vALGO
+    assert updates[0] == 0 and updates[1] > 0 and updates[2] == 0
+    utilizations = get_utilizations(
+        snapshot, network, accounts + [REPLAYED_STORAGE_ADDRESS], prices
+    )
+    assert scanner.get_health(
+        REPLAYED_STORAGE_ADDRESS
+    ).get_borrow_utilization() == pytest.approx(utilizations[REPLAYED_STORAGE_ADDRESS])
+    assert_matches(scanner, utilizations)
+
+
+class FailingBackend:
+    """State backend wrapper whose account reads fail for the addresses in failing"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.failing = set()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def read_account(self, address, block=None):
+        if address in self.failing:
+            raise Exception("Account does not exist.")
+        return self.backend.read_account(address, block=block)
+
+
+def test_failed_account_reads_are_retried(network, client, accounts):
+    scanner = LiquidationScanner(client)
+    backend = FailingBackend(client.state_backend)
+    client.state_backend = backend
+    failing, other = accounts[:2]
+    backend.failing.add(failing)
+    for storage_address in (failing, other):
+        network.add_user(make_address(1), storage_address, {"USDC": (0, 10**6)})
+
+    assert scanner.refresh_accounts([failing, other]) == [failing]
+    assert scanner.get_unread() == {failing}
+    assert scanner.get_health(other).get_borrow_utilization() == float("inf")
+    assert scanner.get_health(failing).get_borrow_utilization() != float("inf")
+
+    # the next update reads it again, even when the round does not reference it
+    backend.failing.clear()
+    scanner.process_update({"round": 1001, "app_ids": set(), "addresses": set()})
+    assert scanner.get_unread() == set()
+    assert scanner.get_health(failing).get_borrow_utilization() == float("inf")
@@ -0,0 +1,117 @@
+from copy import copy
+import pytest
+from algosdk import encoding
+from algosdk.transaction import PaymentTxn, calculate_group_id
+from algofi.v1 import liquidation_templates, prepend
+from algofi.v1.liquidation_templates import (
+    DEFAULT_LIQUIDATION_VALIDITY_WINDOW,
+    LIQUIDATE_AMOUNT_TXN_INDEX,
+    LiquidationTemplateCache,
+)
+from conftest import make_address
+
+LIQUIDATOR_ADDRESS = make_address(1)
+TARGET_STORAGE_ADDRESS = make_address(4)
+
+
+@pytest.fixture
+def template_cache(network, client):
+    network.add_user(LIQUIDATOR_ADDRESS, make_address(2), {})
+    return LiquidationTemplateCache(client)
+
+
+def get_group_id(transactions):
+    ungrouped = []
+    for txn in transactions:
+        txn = copy(txn)
+        txn.group = None
+        ungrouped.append(txn)
+    return calculate_group_id(ungrouped)
+
+
+@pytest.mark.parametrize("borrow_symbol", ["USDC", "ALGO"])
+@pytest.mark.parametrize("amount", [0, 1, 123456789])
+def test_group_id_matches_calculate_group_id(template_cache, borrow_symbol, amount):
+    group = template_cache.build(
+        TARGET_STORAGE_ADDRESS, borrow_symbol, amount, "goBTC", 5000
+    )
+    transactions = group.transactions
+
+    assert {txn.group for txn in transactions} == {get_group_id(transactions)}
+    repay_txn = transactions[LIQUIDATE_AMOUNT_TXN_INDEX]
+    if borrow_symbol == "ALGO":
+        assert isinstance(repay_txn, PaymentTxn)
+        assert repay_txn.amt == amount
+    else:
+        assert repay_txn.amount == amount
+    for txn in transactions:
+        assert txn.first_valid_round == 5000
+        assert txn.last_valid_round == 5000 + DEFAULT_LIQUIDATION_VALIDITY_WINDOW
+
+
+def test_builds_with_distinct_notes_have_distinct_group_ids(template_cache):
+    group_ids = {
+        template_cache.build(TARGET_STORAGE_ADDRESS, "USDC", 10, "goBTC", 5000)
+        .transactions[0]
+        .group
+        for _ in range(5)
+    }
+    assert len(group_ids) > 1
+
+
+@pytest.mark.parametrize(
+    "borrow_symbol,collateral_symbol",
+    [("USDC", "goBTC"), ("ALGO", "USDC"), ("STBL", "vALGO")],
+)
+def test_build_matches_client_group(
+    monkeypatch, network, client, template_cache, borrow_symbol, collateral_symbol
+):
+    # the init transaction note is random, fix it in both builders
+    note = lambda low, high: 42
+    monkeypatch.setattr(prepend, "randint", note)
+    monkeypatch.setattr(liquidation_templates, "randint", note)
+    expected = client.prepare_liquidate_transactions(
+        TARGET_STORAGE_ADDRESS, borrow_symbol, 10**6, collateral_symbol
+    )
+    params = client.get_default_params()
+
+    group = template_cache.build(
+        TARGET_STORAGE_ADDRESS,
+        borrow_symbol,
+        10**6,
+        collateral_symbol,
+        params.first,
+        params.last,
+    )
+
+    assert [encoding.msgpack_encode(txn) for txn in group.transactions] == [
+        encoding.msgpack_encode(txn) for txn in expected.transactions
+    ]
+
+
+def test_builds_read_nothing_once_prepared(network, template_cache):
+    template_cache.prepare(TARGET_STORAGE_ADDRESS, "USDC", "goBTC")
+    requests = network.requests.copy()
+
+    template_cache.build(TARGET_STORAGE_ADDRESS, "USDC", 10, "goBTC", 5000)
+
+    assert network.requests == requests
+    assert template_cache.get_stats() == {"size": 1, "hits": 1, "misses": 0}
+
+
+def test_least_recently_used_templates_are_evicted(network, client):
+    network.add_user(LIQUIDATOR_ADDRESS, make_address(2), {})
+    template_cache = LiquidationTemplateCache(client, max_size=2)
+    first, second, third = (make_address(10 + index) for index in range(3))
+
+    template_cache.prepare(first, "USDC", "goBTC")
+    template_cache.prepare(second, "USDC", "goBTC")
+    assert template_cache.get_template(first, "USDC", "goBTC") is not None
+    template_cache.prepare(third, "USDC", "goBTC")
+
+    assert template_cache.get_size() == 2
+    assert template_cache.get_template(second, "USDC", "goBTC") is None
+    assert template_cache.get_template(first, "USDC", "goBTC") is not None
+    template_cache.build(second, "USDC", 10, "goBTC", 5000)
+    assert template_cache.get_stats() == {"size": 2, "hits": 0, "misses": 1}
+    assert template_cache.get_template(third, "USDC", "goBTC") is None
@@ -0,0 +1,149 @@
+import random
+import pytest
+from conftest import CONFIG, make_address
+
+np = pytest.importorskip("numpy")
+
+MAX_UINT64 = 2**64 - 1
+SYMBOLS = ("ALGO", "USDC", "goBTC", "goETH", "STBL")
+INTEGER_FIELDS = (
+    "active_collateral_bank",
+    "active_collateral_underlying",
+    "borrow_shares",
+    "borrow_underlying",
+)
+
+
+@pytest.fixture
+def accounts(network):
+    """Storage accounts with random positions, one holding the largest uint64 balances, in markets whose
+    exchange rates and borrow indexes do not divide evenly
+    """
+    network.set_market_state(
+        "USDC",
+        bank_to_underlying_exchange=1234567891,
+        underlying_borrowed=987654321987,
+        outstanding_borrow_shares=123456789,
+    )
+    network.set_market_state(
+        "goBTC",
+        bank_to_underlying_exchange=3 * 10**9 + 7,
+        underlying_borrowed=10**15 + 3,
+        outstanding_borrow_shares=7 * 10**14 + 1,
+    )
+    # no borrows outstanding, borrow shares are worth nothing
+    network.set_market_state("STBL", underlying_borrowed=0, outstanding_borrow_shares=0)
+    generator = random.Random(16)
+    storage_addresses = []
+    for index in range(40):
+        positions = {
+            symbol: (generator.randrange(10**12), generator.randrange(10**10))
+            for symbol in generator.sample(SYMBOLS, 3)
+        }
+        storage_addresses.append(make_address(1000 + index))
+        network.add_user(make_address(index), storage_addresses[-1], positions)
+    storage_addresses.append(make_address(2000))
+    network.add_user(
+        make_address(100),
+        storage_addresses[-1],
+        {symbol: (MAX_UINT64, MAX_UINT64) for symbol in SYMBOLS},
+    )
+    return storage_addresses
+
+
+def test_positions_match_snapshot_exactly(network, client, accounts):
+    snapshot = client.snapshot()
+    table = client.get_position_table(snapshot=snapshot)
+    usd = table.compute_usd()
+
+    assert sorted(table.get_storage_addresses()) == sorted(accounts)
+    assert table.get_symbols() == snapshot.get_active_symbols()
+    for storage_address in accounts:
+        index = table.get_index(storage_address)
+        expected = snapshot.get_storage_state(
+            network.accounts[storage_address], include_manager=False
+        )
+        for column, symbol in enumerate(table.get_symbols()):
+            row = {
+                "active_collateral_bank": table.collateral_bank[index, column],
+                "active_collateral_underlying": table.active_collateral_underlying[
+                    index, column
+                ],
+                "borrow_shares": table.borrow_shares[index, column],
+                "borrow_underlying": table.borrow_underlying[index, column],
+            }
+            for field in INTEGER_FIELDS:
+                assert int(row[field]) == expected[symbol][field], (
+                    storage_address,
+                    symbol,
+                    field,
+                )
+            for field in ("active_collateral_usd", "borrow_usd"):
+                assert usd[field][index, column] == pytest.approx(
+                    expected[symbol][field]
+                )
+
+
+def test_max_uint64_balances_are_kept_exactly(client, accounts):
+    table = client.get_position_table()
+    index = table.get_index(accounts[-1])
+    assert table.collateral_bank.dtype == np.uint64
+    for symbol in SYMBOLS:
+        column = table.get_symbols().index(symbol)
+        assert int(table.collateral_bank[index, column]) == MAX_UINT64
+        assert int(table.borrow_shares[index, column]) == MAX_UINT64
+
+
+def test_compute_health_matches_storage_states(network, client, accounts):
+    snapshot = client.snapshot()
+    table = client.get_position_table(snapshot=snapshot)
+    health = table.compute_health()
+
+    for storage_address in accounts:
+        index = table.get_index(storage_address)
+        expected = snapshot.get_storage_state(
+            network.accounts[storage_address], include_manager=False
+        )
+        max_borrow_usd = sum(
+            state["active_collateral_max_borrow_usd"] for state in expected.values()
+        )
+        borrow_usd = sum(state["borrow_usd"] for state in expected.values())
+        assert health["max_borrow_usd"][index] == pytest.approx(max_borrow_usd)
+        assert health["borrow_usd"][index] == pytest.approx(borrow_usd)
+        assert health["borrow_ratio"][index] == pytest.approx(
+            borrow_usd / max_borrow_usd
+        )
+
+
+def test_compute_health_at_moved_prices(client, accounts):
+    table = client.get_position_table()
+    # value the table at other prices, as a liquidation scanner does when prices move
+    prices = table.get_prices() * np.linspace(0.5, 1.5, len(table.get_symbols()))
+    health = table.compute_health(prices)
+    usd = table.compute_usd(prices)
+
+    np.testing.assert_allclose(
+        health["max_borrow_usd"], usd["active_collateral_max_borrow_usd"].sum(axis=1)
+    )
+    np.testing.assert_allclose(health["borrow_usd"], usd["borrow_usd"].sum(axis=1))
+    np.testing.assert_allclose(
+        health["borrow_ratio"], health["borrow_usd"] / health["max_borrow_usd"]
+    )
+
+
+def test_compute_health_of_empty_and_uncollateralized_accounts(network, client):
+    network.add_user(make_address(1), make_address(2), {})
+    borrow_symbol = CONFIG["SYMBOLS"][1]
+    network.add_user(make_address(3), make_address(4), {borrow_symbol: (0, 10**6)})
+    table = client.get_position_table()
+    health = table.compute_health()
+
+    assert health["borrow_ratio"][table.get_index(make_address(2))] == 0
+    assert health["borrow_ratio"][table.get_index(make_address(4))] == np.inf
+
+
+def test_set_snapshot_rejects_other_markets(client, accounts):
+    table = client.get_position_table()
+    table.collateral_bank = table.collateral_bank[:, 1:]
+    with pytest.raises(Exception):
+        table.set_snapshot(client.snapshot())
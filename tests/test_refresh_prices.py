@@ -0,0 +1,115 @@
+import pytest
+from algofi.utils import CachedStateBackend, IndexerStateBackend
+from algofi.v1.client import REFRESH_PRICES_MAX_ATTEMPTS, Client
+from algofi.v1.price_epoch import PriceEpoch, PRICE_POLICY_EXPLICIT
+from conftest import CHAIN, START_ROUND, Algod, Indexer, make_address
+
+
+class AdvancingIndexer(Indexer):
+    """Indexer whose round advances during the first `advances` oracle reads"""
+
+    def __init__(self, network, oracle_app_ids, advances):
+        super().__init__(network)
+        self.oracle_app_ids = oracle_app_ids
+        self.advances = advances
+
+    def applications(self, application_id, round_num=None):
+        if application_id in self.oracle_app_ids and self.advances > 0:
+            self.advances -= 1
+            self.network.round += 1
+        return super().applications(application_id, round_num=round_num)
+
+
+def make_client(network, indexer, state_backend=None):
+    return Client(
+        Algod(network),
+        indexer,
+        indexer,
+        make_address(1),
+        CHAIN,
+        state_backend=state_backend,
+        price_epoch=PriceEpoch(PRICE_POLICY_EXPLICIT),
+    )
+
+
+def get_oracle_app_ids(client):
+    return {
+        symbol: market.get_asset().get_oracle_app_id()
+        for symbol, market in client.get_active_markets().items()
+    }
+
+
+def test_shared_oracles_are_read_once(network, client):
+    oracle_app_ids = get_oracle_app_ids(client)
+    distinct = set(oracle_app_ids.values())
+    assert len(distinct) < len(oracle_app_ids)
+    for index, oracle_app_id in enumerate(sorted(distinct)):
+        network.set_oracle_price(oracle_app_id, (index + 2) * 10**6)
+    client = make_client(network, Indexer(network))
+    reads = network.requests["applications"]
+    stats = client.get_price_epoch().get_stats()
+
+    price_map = client.refresh_prices()
+
+    assert network.requests["applications"] == reads + len(distinct)
+    assert price_map.get_round() == START_ROUND
+    for symbol, oracle_app_id in oracle_app_ids.items():
+        asset = client.get_market(symbol).get_asset()
+        raw_price = (sorted(distinct).index(oracle_app_id) + 2) * 10**6
+        assert price_map.get_raw_prices()[symbol] == raw_price
+        assert price_map.get_prices()[symbol] == asset.get_price(update=False)
+    refreshed_stats = client.get_price_epoch().get_stats()
+    assert refreshed_stats["round"] == START_ROUND
+    assert refreshed_stats["oracle_reads"] - stats["oracle_reads"] == len(distinct)
+    assert refreshed_stats["oracle_reads_avoided"] - stats[
+        "oracle_reads_avoided"
+    ] == len(oracle_app_ids) - len(distinct)
+
+
+def test_cached_oracle_states_are_read_again(network, client):
+    oracle_app_id = get_oracle_app_ids(client)["ALGO"]
+    indexer = Indexer(network)
+    state_backend = CachedStateBackend(IndexerStateBackend(indexer), ttl=None)
+    client = make_client(network, indexer, state_backend=state_backend)
+    client.refresh_prices()
+
+    network.round += 1
+    network.set_oracle_price(oracle_app_id, 5 * 10**6)
+    price_map = client.refresh_prices()
+
+    assert price_map.get_round() == START_ROUND + 1
+    assert price_map.get_raw_prices()["ALGO"] == 5 * 10**6
+
+
+def test_prices_are_read_again_when_the_round_advances(network, client):
+    oracle_app_ids = set(get_oracle_app_ids(client).values())
+    indexer = AdvancingIndexer(network, oracle_app_ids, 0)
+    client = make_client(network, indexer)
+    reads = network.requests["applications"]
+    oracle_reads = client.get_price_epoch().get_stats()["oracle_reads"]
+    indexer.advances = 1
+
+    price_map = client.refresh_prices()
+
+    assert price_map.get_round() == START_ROUND + 1
+    assert network.requests["applications"] == reads + 2 * len(oracle_app_ids)
+    assert client.get_price_epoch().get_stats()[
+        "oracle_reads"
+    ] == oracle_reads + 2 * len(oracle_app_ids)
+
+
+def test_prices_are_not_stamped_while_the_round_keeps_advancing(network, client):
+    oracle_app_ids = set(get_oracle_app_ids(client).values())
+    indexer = AdvancingIndexer(network, oracle_app_ids, 0)
+    client = make_client(network, indexer)
+    # every pass reads an oracle after the round advanced
+    indexer.advances = len(oracle_app_ids) * REFRESH_PRICES_MAX_ATTEMPTS
+
+    with pytest.raises(Exception, match="Round advanced"):
+        client.refresh_prices()
+
+
+def test_historical_prices_are_stamped_with_their_round(network, client):
+    price_map = client.refresh_prices(round=START_ROUND - 10)
+
+    assert price_map.get_round() == START_ROUND - 10
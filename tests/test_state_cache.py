@@ -0,0 +1,153 @@
+import pytest
+from algofi.utils import CachedStateBackend, StateBackend
+
+MARKET_APP_ID = 1
+OTHER_APP_ID = 2
+ADDRESS = "A"
+
+
+class CountingBackend(StateBackend):
+    def __init__(self):
+        self.reads = 0
+        self.global_states = {MARKET_APP_ID: {"p": 1}, OTHER_APP_ID: {"p": 2}}
+        self.accounts = {
+            ADDRESS: {
+                "address": ADDRESS,
+                "apps-local-state": [{"id": MARKET_APP_ID, "key-value": []}],
+            }
+        }
+
+    def read_global_state(self, app_id, block=None):
+        self.reads += 1
+        return dict(self.global_states[app_id])
+
+    def read_account(self, address, block=None):
+        self.reads += 1
+        return dict(self.accounts[address])
+
+    def read_round(self):
+        return 1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_live_reads_expire_after_ttl():
+    backend = CountingBackend()
+    clock = Clock()
+    cache = CachedStateBackend(backend, ttl=2.0, clock=clock)
+    cache.read_global_state(MARKET_APP_ID)
+    cache.read_global_state(MARKET_APP_ID)
+    assert backend.reads == 1
+    clock.now = 2.0
+    cache.read_global_state(MARKET_APP_ID)
+    assert backend.reads == 2
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_historical_reads_outlive_invalidation():
+    backend = CountingBackend()
+    cache = CachedStateBackend(backend, ttl=0)
+    cache.read_global_state(MARKET_APP_ID, block=10)
+    cache.invalidate_all()
+    cache.read_global_state(MARKET_APP_ID, block=10)
+    assert backend.reads == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    backend = CountingBackend()
+    cache = CachedStateBackend(backend, max_size=1, ttl=None)
+    cache.read_global_state(MARKET_APP_ID)
+    cache.read_global_state(OTHER_APP_ID)
+    cache.read_global_state(MARKET_APP_ID)
+    assert backend.reads == 3
+    assert cache.get_stats()["evictions"] == 2
+
+
+def test_invalidate_app_drops_global_and_opted_in_accounts():
+    backend = CountingBackend()
+    cache = CachedStateBackend(backend, ttl=None)
+    cache.read_global_state(MARKET_APP_ID)
+    cache.read_global_state(OTHER_APP_ID)
+    cache.read_local_state(ADDRESS, MARKET_APP_ID)
+    cache.read_account(ADDRESS)
+    assert backend.reads == 4
+
+    # the account is opted into the market, its cached local state and account info must be read again
+    backend.accounts[ADDRESS]["apps-local-state"] = [
+        {
+            "id": MARKET_APP_ID,
+            "key-value": [{"key": "dWFj", "value": {"type": 2, "uint": 5}}],
+        }
+    ]
+    cache.invalidate_app(MARKET_APP_ID)
+    assert cache.read_local_state(ADDRESS, MARKET_APP_ID) == {"uac": 5}
+    assert (
+        cache.read_account(ADDRESS)["apps-local-state"]
+        == backend.accounts[ADDRESS]["apps-local-state"]
+    )
+    cache.read_global_state(MARKET_APP_ID)
+    assert backend.reads == 7
+    # the other application and accounts not opted into it are kept
+    cache.invalidate_app(OTHER_APP_ID)
+    cache.read_global_state(MARKET_APP_ID)
+    cache.read_local_state(ADDRESS, MARKET_APP_ID)
+    cache.read_account(ADDRESS)
+    assert backend.reads == 7
+
+
+def test_invalidate_address_keeps_global_state():
+    backend = CountingBackend()
+    cache = CachedStateBackend(backend, ttl=None)
+    cache.read_global_state(MARKET_APP_ID)
+    cache.read_account(ADDRESS)
+    cache.invalidate_address(ADDRESS)
+    cache.read_global_state(MARKET_APP_ID)
+    cache.read_account(ADDRESS)
+    assert backend.reads == 3
+
+
+def test_advance_round_drops_live_reads_once_per_round():
+    backend = CountingBackend()
+    cache = CachedStateBackend(backend, ttl=None)
+    cache.read_global_state(MARKET_APP_ID)
+    cache.advance_round(5)
+    cache.read_global_state(MARKET_APP_ID)
+    cache.advance_round(5)
+    cache.read_global_state(MARKET_APP_ID)
+    assert backend.reads == 2
+    assert cache.get_round() == 5
+
+
+def test_incomplete_backends_fail_at_construction():
+    class GlobalStateBackend(StateBackend):
+        def read_global_state(self, app_id, block=None):
+            return {}
+
+    with pytest.raises(TypeError):
+        GlobalStateBackend()
+
+
+def test_reads_in_flight_during_invalidation_are_not_cached():
+    backend = CountingBackend()
+    cache = CachedStateBackend(backend, ttl=None)
+    read_global_state = backend.read_global_state
+
+    def read_then_change(app_id, block=None):
+        # the value is read, then the app changes and is invalidated before the read returns
+        value = read_global_state(app_id, block=block)
+        backend.global_states[MARKET_APP_ID] = {"p": 3}
+        cache.invalidate_app(MARKET_APP_ID)
+        return value
+
+    backend.read_global_state = read_then_change
+    assert cache.read_global_state(MARKET_APP_ID) == {"p": 1}
+    backend.read_global_state = read_global_state
+    assert cache.read_global_state(MARKET_APP_ID) == {"p": 3}
+    assert backend.reads == 2
+    assert cache.get_stats()["size"] == 1